@@ -3,18 +3,28 @@
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.core.principal_cache import Principal, principal_cache
+from app.db import session as db_session
 from app.security import decode_access_token
 from app import crud
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Principal:
     payload = decode_access_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid authentication credentials")
-    user = crud.get_user_by_email(db, payload["sub"])
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return user
+    subject = payload["sub"]
+    principal = principal_cache.get(subject)
+    if principal is None:
+        # solo se abre sesión si el usuario no está en el cache
+        async with db_session.AsyncSessionLocal() as db:
+            user = await crud.get_user_by_email_async(db, subject)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        principal = Principal.from_user(user)
+        principal_cache.put(subject, principal)
+    if not principal.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Inactive user")
+    return principal
@@ -0,0 +1,335 @@
+# File: app/api/router.py
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app import crud, schemas
+from app.db import search_index
+from app.db.translation_schema import ensure_translation_schema
+from app.db.session import async_engine, get_async_db, get_db
+from app.api.deps import get_current_user
+from app.core.principal_cache import Principal, principal_cache
+from app.core.room_tickets import create_room_tickets
+from app.security import PasswordHashBusy, create_access_token, shutdown_hash_pool, start_hash_pool
+from datetime import timedelta
+from app.core.config import settings
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from pydantic import BaseModel
+import base64
+import os
+
+# Importamos los servicios de Azure
+from app.services.azure_utils import speech_to_text, translate_text, text_to_speech
+from app.services import translation_worker as worker_module
+
+
+# Modelo de respuesta para el frontend
+class TranslationResponse(BaseModel):
+    transcribed_text: str
+    translated_text: str
+    detected_language: str
+    target_language: str
+    translated_audio_base64: str
+
+
+router = APIRouter()
+
+# Worker en proceso que completa las traducciones pendientes (arranca con la app que incluya este router)
+translation_worker = worker_module.create_translation_worker()
+# tope del long-poll de GET /translations/{id}?wait=N
+MAX_WAIT_SECONDS = 30
+# tope de items por POST /translations/bulk
+BULK_MAX_ITEMS = int(os.getenv("TRANSLATION_BULK_MAX_ITEMS", "5000"))
+# emisor de tickets de sala; los nodos de salas los verifican con el mismo ROOM_TICKET_SECRET
+room_tickets = create_room_tickets()
+
+
+@router.on_event("startup")
+async def start_translation_worker():
+    # columnas e índices nuevos de translations/projects: create_all no los agrega a una base existente
+    async with async_engine.begin() as conn:
+        schema_ok = await conn.run_sync(ensure_translation_schema)
+    if not worker_module.ENABLED:
+        return
+    if not schema_ok:
+        # con el esquema viejo cada vuelta fallaría igual: no arrancar
+        print("⚠️ Worker de traducciones no arranca: la tabla translations tiene el esquema viejo")
+        return
+    # la tabla de reservas es nueva: crearla si la base ya existía
+    async with async_engine.begin() as conn:
+        await conn.run_sync(crud.models.TranslationClaim.__table__.create, checkfirst=True)
+    await translation_worker.start()
+
+
+@router.on_event("shutdown")
+async def stop_translation_worker():
+    await translation_worker.stop()
+
+
+@router.on_event("startup")
+async def ensure_room_history_tables():
+    # las leen /rooms/{room_id}/utterances y /search aunque este proceso no escriba historial (ROOM_HISTORY_ENABLED=0)
+    async with async_engine.begin() as conn:
+        for model in (crud.models.IdSequence, crud.models.RoomUtterance, crud.models.RoomUtteranceTranslation):
+            await conn.run_sync(model.__table__.create, checkfirst=True)
+        # índice FTS5 de /search (solo SQLite); si es nuevo se llena con el historial existente
+        await conn.run_sync(search_index.ensure_search_index)
+
+
+@router.on_event("startup")
+async def start_password_hash_pool():
+    await start_hash_pool()
+
+
+@router.on_event("shutdown")
+async def stop_password_hash_pool():
+    shutdown_hash_pool()
+
+
+def _hash_busy():
+    # pico de logins: mejor que el cliente reintente que dejarlo esperando sin límite
+    return HTTPException(status_code=503, detail='Too many logins in progress, retry shortly',
+                         headers={"Retry-After": "2"})
+
+# -------------------------------
+# AUTH
+# -------------------------------
+# bcrypt corre en el pool de procesos de app.security: estas rutas no ocupan el threadpool
+@router.post('/auth/register', response_model=schemas.UserOut)
+async def register(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing = await crud.get_user_by_email_async(db, user_in.email)
+    if existing:
+        raise HTTPException(status_code=400, detail='Email already registered')
+    try:
+        user = await crud.create_user_async(db, user_in)
+    except PasswordHashBusy:
+        raise _hash_busy()
+    return user
+
+
+@router.post('/auth/login', response_model=schemas.Token)
+async def login(form_data: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await crud.authenticate_user_async(db, form_data.email, form_data.password)
+    except PasswordHashBusy:
+        raise _hash_busy()
+    if not user:
+        raise HTTPException(status_code=401, detail='Incorrect email or password')
+    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    token = create_access_token(data={"sub": user.email}, expires_delta=access_token_expires)
+    # ya tenemos el usuario: la primera petición con el token no va a la base
+    principal_cache.put(user.email, Principal.from_user(user))
+    return {"access_token": token, "token_type": "bearer"}
+
+
+@router.post('/auth/deactivate', status_code=204)
+async def deactivate_account(current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    # invalida el cache de usuarios: los tokens ya emitidos dejan de servir al instante en este proceso
+    await crud.set_user_active_async(db, current_user.id, False)
+
+
+# -------------------------------
+# ROOM TICKETS
+# -------------------------------
+@router.post('/rooms/{room_id}/tickets', response_model=schemas.RoomTicketOut)
+async def issue_room_ticket(room_id: str, ticket_in: schemas.RoomTicketRequest, current_user=Depends(get_current_user)):
+    # la autenticación se paga aquí, una vez; el WebSocket solo verifica la firma
+    if not room_tickets.enforced:
+        raise HTTPException(status_code=503, detail='Room tickets are not configured')
+    # el orador manda en la sala (micrófono, configuración): solo operadores de ROOM_TICKET_SPEAKERS
+    if ticket_in.role == "speaker" and not room_tickets.may_speak(current_user.email):
+        raise HTTPException(status_code=403, detail='Not allowed to speak in rooms')
+    ticket, expires_at = room_tickets.issue(room_id, ticket_in.role, ticket_in.langs)
+    return {"ticket": ticket, "room_id": room_id, "role": ticket_in.role, "expires_at": expires_at}
+
+
+@router.get('/rooms/{room_id}/utterances', response_model=schemas.RoomUtterancePage)
+async def list_room_utterances(room_id: str, cursor: str | None = None,
+                               limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+                               current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Historial de frases de una sala en vivo (lo guarda main.py en lotes), de la más nueva a la más vieja."""
+    try:
+        items, next_cursor = await crud.list_room_utterances_async(db, room_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "items": [{
+            "id": u.id,
+            "room_id": u.room_id,
+            "source_lang": u.source_lang,
+            "original_text": u.original_text,
+            "created_at": u.created_at,
+            "translations": {t.lang: t.translated_text for t in u.translations},
+        } for u in items],
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get('/search', response_model=schemas.SearchPage)
+async def search_utterances(q: str = Query(..., min_length=1, max_length=500), lang: str | None = None,
+                            room_id: str | None = None, cursor: str | None = None,
+                            limit: int = Query(20, ge=1, le=100),
+                            current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """
+    Búsqueda de texto completo en el historial de salas (originales y
+    traducciones), de lo más nuevo a lo más viejo. q admite palabras, "frases
+    exactas" y prefijos (tradu*); todas deben aparecer.
+    """
+    if not search_index.supported(db.bind.dialect.name):
+        raise HTTPException(status_code=501, detail='Search requires the SQLite FTS5 index')
+    try:
+        rows, next_cursor = await crud.search_utterances_async(db, q, lang, room_id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OperationalError as e:
+        # índice no creado (el router corre en una app sin su arranque)
+        if "no such table" not in str(e):
+            raise
+        raise HTTPException(status_code=503, detail='Search index is not available')
+    return {
+        "items": [{
+            "utterance_id": r.utterance_id,
+            "room_id": r.room_id,
+            "lang": r.lang,
+            "kind": r.kind,
+            "created_at": r.created_at,
+            "snippet": search_index.highlight(r.snippet),
+        } for r in rows],
+        "next_cursor": next_cursor,
+    }
+
+
+# -------------------------------
+# PROJECTS
+# -------------------------------
+@router.post('/projects', response_model=schemas.ProjectOut)
+def create_project(project_in: schemas.ProjectCreate, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+    return crud.create_project(db, current_user.id, project_in)
+
+
+# Listados paginados por cursor: pasar next_cursor de la respuesta como ?cursor= para la página siguiente
+@router.get('/projects', response_model=schemas.ProjectPage)
+def list_projects(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+                  current_user=Depends(get_current_user), db: Session = Depends(get_db)):
+    try:
+        items, next_cursor = crud.list_projects(db, current_user.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# -------------------------------
+# TRANSLATIONS
+# -------------------------------
+# Rutas async con AsyncSession: las escrituras concurrentes no ocupan hilos del threadpool
+@router.post('/translations', response_model=schemas.TranslationOut)
+async def create_translation(translation_in: schemas.TranslationCreate, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if translation_in.project_id is not None and await crud.foreign_project_ids_async(
+            db, current_user.id, {translation_in.project_id}):
+        raise HTTPException(status_code=404, detail='Project not found')
+    tr = await crud.create_translation_async(db, translation_in, current_user.id)
+    # el worker en proceso la toma en su próximo lote; notify() evita esperar el sondeo
+    translation_worker.notify()
+    return tr
+
+
+@router.post('/translations/bulk', response_model=schemas.TranslationBulkOut)
+async def create_translations_bulk(bulk_in: schemas.TranslationBulkCreate, current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Miles de traducciones en una petición: un INSERT en lote y un commit. Los ids vuelven en el orden de items."""
+    if len(bulk_in.items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f'At most {BULK_MAX_ITEMS} items per request')
+    # todos los proyectos referenciados se validan juntos: o entra el lote entero o nada
+    foreign = await crud.foreign_project_ids_async(
+        db, current_user.id, {item.project_id for item in bulk_in.items if item.project_id is not None})
+    if foreign:
+        raise HTTPException(status_code=404, detail=f'Projects not found: {sorted(foreign)}')
+    ids = await crud.create_translations_bulk_async(db, bulk_in.items, current_user.id)
+    translation_worker.notify()
+    return {"ids": ids}
+
+
+@router.get('/translations', response_model=schemas.TranslationPage)
+async def list_translations(cursor: str | None = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+                            status: str | None = None, project_id: int | None = None,
+                            target_lang: str | None = None, source_lang: str | None = None,
+                            current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    if project_id is not None:
+        project = await crud.get_project_async(db, project_id)
+        if not project or project.owner_id != current_user.id:
+            raise HTTPException(status_code=404, detail='Project not found')
+    try:
+        items, next_cursor = await crud.list_translations_async(
+            db, current_user.id, cursor, limit, status=status, project_id=project_id, target_lang=target_lang,
+            source_lang=source_lang)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@router.get('/translations/{translation_id}', response_model=schemas.TranslationOut)
+async def get_translation(translation_id: int, wait: float = Query(0, ge=0, le=MAX_WAIT_SECONDS),
+                          current_user=Depends(get_current_user), db: AsyncSession = Depends(get_async_db)):
+    """Con ?wait=N (segundos) espera a que deje de estar pendiente en vez de obligar a sondear."""
+    # la de otro usuario responde igual que una inexistente
+    tr = await crud.get_owned_translation_async(db, current_user.id, translation_id)
+    if tr and tr.status == "pending" and wait > 0:
+        # soltar la conexión de esta sesión: la espera usa sesiones cortas
+        await db.close()
+        tr = await translation_worker.wait_for_completion(translation_id, wait)
+    if not tr:
+        raise HTTPException(status_code=404, detail='Not found')
+    return tr
+
+
+# -------------------------------
+# TRANSLATE AUDIO ENDPOINT
+# -------------------------------
+@router.post("/translate-audio/", response_model=TranslationResponse)
+async def translate_audio_endpoint(audio_file: UploadFile = File(...)):
+    """
+    Endpoint que recibe un archivo de audio, lo transcribe (Speech-to-Text),
+    lo traduce (Translator) y devuelve el texto traducido + audio (Text-to-Speech).
+    """
+    try:
+        audio_content = await audio_file.read()
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error al leer el archivo de audio: {e}")
+
+    # 1. Transcribir con Azure Speech-to-Text
+    try:
+        transcribed_text, detected_language = await speech_to_text(audio_content)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la transcripción: {e}")
+
+    # 2. Determinar idioma objetivo
+    if detected_language.startswith("es"):
+        target_language = "en"
+    elif detected_language.startswith("en"):
+        target_language = "es"
+    else:
+        raise HTTPException(status_code=400, detail="Idioma no soportado (solo español/inglés)")
+
+    # 3. Traducir con Azure Translator
+    try:
+        translated_text = await translate_text(transcribed_text, target_language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la traducción: {e}")
+
+    # 4. Convertir traducción a audio con Azure Text-to-Speech
+    try:
+        translated_audio_bytes = await text_to_speech(translated_text, target_language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error en la generación de audio: {e}")
+
+    # 5. Codificar audio en base64
+    translated_audio_base64 = base64.b64encode(translated_audio_bytes).decode("utf-8")
+
+    # 6. Respuesta al frontend
+    return TranslationResponse(
+        transcribed_text=transcribed_text,
+        translated_text=translated_text,
+        detected_language=detected_language,
+        target_language=target_language,
+        translated_audio_base64=translated_audio_base64
+    )
@@ -1,31 +1,52 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.translation_record import TranslationRecord
+from fastapi import APIRouter, HTTPException
+from app import models
+from app.db.session import async_engine
+from app.services.translation_recorder import RecorderStopped, create_translation_recorder
 
 router = APIRouter(tags=["translate"])
 
+# write-behind: los registros se guardan en group commits desde una tarea de fondo
+recorder = create_translation_recorder()
+
+
+@router.on_event("startup")
+async def start_recorder():
+    # tablas nuevas: crearlas si la base ya existía
+    async with async_engine.begin() as conn:
+        for table in (models.IdSequence.__table__, models.TranslationRecord.__table__):
+            await conn.run_sync(table.create, checkfirst=True)
+    await recorder.start()
+
+
+@router.on_event("shutdown")
+async def stop_recorder():
+    # guarda lo que quede en el buffer antes de salir
+    await recorder.stop()
+
+
 @router.get("/translate")
-def translate_text(q: str, db: Session = Depends(get_db)):
+async def translate_text(q: str):
     """
     Endpoint demo: recibe un texto (?q=hola) y devuelve su "traducción".
     Ahora mismo solo invierte el texto, pero aquí irá la integración con Azure Translator.
     """
     translated = q[::-1]  # 🚧 DEMO: texto invertido
 
-    record = TranslationRecord(
-        source_lang="auto",
-        target_lang="es",
-        source_text=q,
-        translated_text=translated
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+    # id y created_at se asignan aquí; el commit llega en el próximo flush del recorder
+    try:
+        record = await recorder.record(
+            source_lang="auto",
+            target_lang="es",
+            source_text=q,
+            translated_text=translated
+        )
+    except RecorderStopped:
+        # apagándose: mejor que el cliente reintente en otro worker que perder el registro
+        raise HTTPException(status_code=503, detail="Shutting down, retry shortly", headers={"Retry-After": "1"})
 
     return {
-        "id": record.id,
+        "id": record["id"],
         "original": q,
         "translated": translated,
-        "created_at": record.created_at
+        "created_at": record["created_at"]
     }
@@ -0,0 +1,60 @@
+# File: app/core/audio_clock.py
+
+"""
+Reloj de ingesta de audio del orador.
+
+El recognizer informa offset/duration en ticks de 100 ns relativos al inicio
+del push stream. AudioClock guarda marcas (hasta qué byte de audio llegamos,
+a qué hora de pared) para traducir esos ticks a la hora en que el audio
+entró al servidor. El orador marca una vez por lote de trozos, no por trozo:
+dentro de un lote la hora se interpola entre la marca anterior y la
+siguiente (el orador manda audio a tiempo real, así que el error es chico).
+La conversión a ticks se hace al consultar.
+"""
+
+import bisect
+import time
+
+TICKS_PER_SECOND = 10_000_000
+
+
+class AudioClock:
+    def __init__(self, bytes_per_second: int = 32000, max_marks: int = 4096):
+        self.bytes_per_second = bytes_per_second
+        self.max_marks = max_marks
+        self.bytes_pushed = 0
+        self._marks = []  # bytes empujados hasta cada trozo
+        self._walls = []
+        self._trim_at = 2 * max_marks
+
+    @property
+    def ticks_pushed(self) -> int:
+        return self.bytes_pushed * TICKS_PER_SECOND // self.bytes_per_second
+
+    def on_push(self, nbytes: int, wall: float = None) -> None:
+        self.bytes_pushed += nbytes
+        self._marks.append(self.bytes_pushed)
+        self._walls.append(wall or time.time())
+        if len(self._marks) > self._trim_at:
+            # recorte amortizado: solo interesa el audio reciente
+            del self._marks[:self.max_marks]
+            del self._walls[:self.max_marks]
+
+    def wall_time_at(self, ticks: int):
+        """
+        Hora de pared en que terminó de ingerirse el audio hasta `ticks`,
+        interpolada entre las dos marcas que lo rodean. Si ese audio ya salió
+        de la ventana recordada, devuelve la marca más antigua (cota inferior
+        de la latencia); si aún no llegó, la más nueva.
+        """
+        if not self._marks:
+            return None
+        # redondeo hacia arriba, como antes con ticks
+        position = -(-ticks * self.bytes_per_second // TICKS_PER_SECOND)
+        idx = bisect.bisect_left(self._marks, position)
+        if idx >= len(self._marks):
+            return self._walls[-1]
+        if idx == 0:
+            return self._walls[0]
+        start, end = self._marks[idx - 1], self._marks[idx]
+        return self._walls[idx - 1] + (self._walls[idx] - self._walls[idx - 1]) * (position - start) / (end - start)
@@ -0,0 +1,88 @@
+# File: app/core/audio_formats.py
+
+"""
+Formatos de salida del TTS que puede pedir un cliente.
+
+El PCM sin comprimir a 16 kHz son ~256 kbit/s por oyente; con cientos de
+teléfonos en el mismo Wi-Fi de una sala eso pesa. El cliente elige por
+nombre (?format=opus en el WebSocket, campo "format" o cabecera Accept en
+la exportación) y el servicio de Azure entrega el audio ya codificado: el
+servidor no transcodifica, solo reenvía bytes.
+
+El formato es parte de la clave del pool de sintetizadores (voz, formato),
+así que dos clientes con formatos distintos nunca comparten síntesis.
+
+  nombre     formato del SDK                kbit/s   media type
+  wav-16k    Riff16Khz16BitMonoPcm          256      audio/wav   (por defecto)
+  wav-8k     Riff8Khz16BitMonoPcm           128      audio/wav
+  mp3        Audio16Khz32KBitRateMonoMp3     32      audio/mpeg
+  mp3-hq     Audio24Khz48KBitRateMonoMp3     48      audio/mpeg
+  opus       Ogg16Khz16BitMonoOpus          ~16      audio/ogg
+  opus-24k   Ogg24Khz16BitMonoOpus          ~24      audio/ogg
+  webm       Webm16Khz16BitMonoOpus         ~16      audio/webm  (MediaSource en navegadores)
+
+Los kbit/s de Opus son aproximados (bitrate variable del servicio).
+"""
+
+import os
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    sdk_name: str  # speechsdk.SpeechSynthesisOutputFormat
+    media_type: str
+    extension: str
+    kbps: int  # aproximado, para estimar ancho de banda
+    sample_rate: int
+
+    @property
+    def riff(self) -> bool:
+        return self.sdk_name.startswith("Riff")
+
+
+FORMATS = {f.name: f for f in (
+    AudioFormat("wav-16k", "Riff16Khz16BitMonoPcm", "audio/wav", "wav", 256, 16000),
+    AudioFormat("wav-8k", "Riff8Khz16BitMonoPcm", "audio/wav", "wav", 128, 8000),
+    AudioFormat("mp3", "Audio16Khz32KBitRateMonoMp3", "audio/mpeg", "mp3", 32, 16000),
+    AudioFormat("mp3-hq", "Audio24Khz48KBitRateMonoMp3", "audio/mpeg", "mp3", 48, 24000),
+    AudioFormat("opus", "Ogg16Khz16BitMonoOpus", "audio/ogg", "ogg", 16, 16000),
+    AudioFormat("opus-24k", "Ogg24Khz16BitMonoOpus", "audio/ogg", "ogg", 24, 24000),
+    AudioFormat("webm", "Webm16Khz16BitMonoOpus", "audio/webm", "webm", 16, 16000),
+)}
+_BY_SDK_NAME = {f.sdk_name.lower(): f for f in FORMATS.values()}
+# media types de Accept que no coinciden tal cual con ninguno de la tabla
+_MEDIA_ALIASES = {"audio/x-wav": "wav-16k", "audio/wave": "wav-16k", "audio/mp3": "mp3", "audio/opus": "opus"}
+
+DEFAULT_FORMAT = os.getenv("TTS_DEFAULT_FORMAT", "wav-16k")
+if DEFAULT_FORMAT not in FORMATS:
+    print(f"⚠️ TTS_DEFAULT_FORMAT desconocido: {DEFAULT_FORMAT}, se usa wav-16k")
+    DEFAULT_FORMAT = "wav-16k"
+
+
+def get_format(name: str):
+    """Por nombre de la tabla o por nombre del SDK (sin distinguir mayúsculas). None si no existe."""
+    if not name:
+        return None
+    key = name.strip().lower()
+    return FORMATS.get(key) or _BY_SDK_NAME.get(key)
+
+
+def negotiate(requested: str = None, accept: str = None, default: str = DEFAULT_FORMAT):
+    """
+    Formato para un cliente. Un nombre pedido explícitamente manda: si no
+    existe devuelve None y el llamador rechaza el pedido. Si no, la cabecera
+    Accept (se toma el primer media type de audio que conozcamos, en el orden
+    de la cabecera) y por último el formato por defecto.
+    """
+    if requested:
+        return get_format(requested)
+    for item in (accept or "").split(","):
+        media_type = item.split(";")[0].strip().lower()
+        if media_type in _MEDIA_ALIASES:
+            return FORMATS[_MEDIA_ALIASES[media_type]]
+        for audio_format in FORMATS.values():
+            if audio_format.media_type == media_type:
+                return audio_format
+    return FORMATS.get(default) or FORMATS[DEFAULT_FORMAT]
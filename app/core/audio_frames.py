@@ -0,0 +1,33 @@
+# File: app/core/audio_frames.py
+
+"""
+Trozos de audio TTS como frames binarios de WebSocket.
+
+Cada frame lleva una cabecera fija de 9 bytes (big endian) y después el
+audio tal cual lo entrega el sintetizador:
+
+  utterance_id  uint32  frase a la que pertenece el audio
+  seq           uint32  posición del trozo dentro de la frase, desde 0
+  flags         uint8   FLAG_LAST: último frame de la frase (puede venir vacío)
+
+Los frames de una frase salen en orden por el mismo socket. El cliente
+concatena los payloads por utterance_id y puede empezar a reproducir con el
+primero. En formatos RIFF la cabecera WAV viaja en el primer trozo.
+"""
+
+import struct
+
+HEADER = struct.Struct("!IIB")
+FLAG_LAST = 0x01
+
+
+def pack_audio_frame(utterance_id: int, seq: int, payload: bytes, last: bool = False) -> bytes:
+    return HEADER.pack(utterance_id & 0xFFFFFFFF, seq, FLAG_LAST if last else 0) + payload
+
+
+def unpack_audio_frame(frame: bytes):
+    """Devuelve (utterance_id, seq, last, payload)."""
+    if len(frame) < HEADER.size:
+        raise ValueError(f"Frame de audio demasiado corto: {len(frame)} bytes")
+    utterance_id, seq, flags = HEADER.unpack_from(frame)
+    return utterance_id, seq, bool(flags & FLAG_LAST), frame[HEADER.size:]
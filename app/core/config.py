@@ -10,10 +10,16 @@ class Settings(BaseSettings):
     # Speech
     SPEECH_KEY: str | None = None
     SPEECH_REGION: str | None = None
+    # los usa app.services.azure_utils (AZURE_REGION también vale como región del Translator)
+    AZURE_SPEECH_KEY: str | None = None
+    AZURE_REGION: str | None = None
 
-    # Translator
+    # Translator (app.core.translator). Las variables extra del .env no se leen como
+    # atributos (pydantic las guarda en minúsculas): todo lo que se usa va declarado aquí.
     TRANSLATOR_KEY: str | None = None
     TRANSLATOR_REGION: str | None = None
+    AZURE_TRANSLATOR_KEY: str | None = None  # alternativa a TRANSLATOR_KEY
+    AZURE_TRANSLATOR_ENDPOINT: str = "https://api.cognitive.microsofttranslator.com"
 
     class Config:
         env_file = ".env"
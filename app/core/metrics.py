@@ -0,0 +1,294 @@
+# File: app/core/metrics.py
+
+"""
+Métricas en formato de texto de Prometheus, sin dependencias externas.
+
+Uso (mismo estilo que prometheus_client):
+    SPEAKER_BYTES = counter("vortext_speaker_audio_bytes_total", "...", ["room"])
+    SPEAKER_BYTES.labels(room_label(room_id)).inc(len(data))
+
+Las etiquetas de sala e idioma pasan por room_label()/lang_label(), que
+limitan la cardinalidad: a partir de METRICS_MAX_ROOMS salas (o
+METRICS_MAX_LANGS idiomas) distintas, el resto se agrupa como "_other".
+
+METRICS_ENABLED=0 desactiva la instrumentación (inc/observe no hacen nada).
+Cada worker de uvicorn expone sus propias métricas.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+OVERFLOW_LABEL = "_other"
+
+# Buckets en segundos pensados para latencias de voz/traducción
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def set_enabled(enabled: bool) -> None:
+    global ENABLED
+    ENABLED = enabled
+
+
+class LabelLimiter:
+    """Admite los primeros max_values valores distintos; el resto es OVERFLOW_LABEL."""
+
+    def __init__(self, max_values: int):
+        self.max_values = max_values
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __call__(self, value) -> str:
+        value = str(value)
+        if value in self._seen:
+            return value
+        with self._lock:
+            if len(self._seen) < self.max_values:
+                self._seen.add(value)
+                return value
+        return OVERFLOW_LABEL
+
+    def release(self, value) -> bool:
+        """Libera el lugar de un valor que ya no se usará (p. ej. una sala eliminada)."""
+        with self._lock:
+            try:
+                self._seen.remove(str(value))
+                return True
+            except KeyError:
+                return False
+
+
+room_label = LabelLimiter(int(os.getenv("METRICS_MAX_ROOMS", "200")))
+lang_label = LabelLimiter(int(os.getenv("METRICS_MAX_LANGS", "32")))
+voice_label = LabelLimiter(int(os.getenv("METRICS_MAX_VOICES", "32")))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value):
+        if ENABLED:
+            self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not ENABLED:
+            return
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[idx] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._collect_fn = None
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            key = tuple(map(str, values))
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def remove(self, *values):
+        self._children.pop(tuple(map(str, values)), None)
+
+    def remove_matching(self, labelname: str, value: str):
+        """Quita todas las series cuya etiqueta labelname vale value."""
+        if labelname not in self.labelnames:
+            return
+        idx = self.labelnames.index(labelname)
+        with self._lock:
+            for key in [k for k in self._children if k[idx] == value]:
+                del self._children[key]
+
+    # atajos para métricas sin etiquetas
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, fn):
+        """fn() -> {tuple(label_values): valor}; se evalúa en cada scrape."""
+        self._collect_fn = fn
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        if self._collect_fn is not None:
+            try:
+                for key, value in self._collect_fn().items():
+                    lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+            except Exception as e:
+                print(f"Error recolectando {self.name}: {e}")
+            return lines
+        for key, child in list(self._children.items()):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key, child) -> list:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, key, child) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # idempotente: varios módulos pueden declarar la misma métrica
+        return self._metrics.setdefault(metric.name, metric)
+
+    def remove_label_value(self, labelname: str, value: str):
+        for metric in list(self._metrics.values()):
+            metric.remove_matching(labelname, value)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames=()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames=()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def forget_room(room_id) -> None:
+    """Borra las series de una sala eliminada y libera su etiqueta (las agrupadas en _other quedan)."""
+    if room_label.release(room_id):
+        REGISTRY.remove_label_value("room", str(room_id))
+
+
+# --- Métricas compartidas entre módulos ---
+TRANSLATION_SECONDS = histogram(
+    "vortext_translation_call_seconds", "Latencia de llamadas de traducción de texto", ["target"])
+TTS_SECONDS = histogram(
+    "vortext_tts_call_seconds", "Latencia de síntesis de voz", ["voice"])
+DB_QUERY_SECONDS = histogram(
+    "vortext_db_query_seconds", "Duración de consultas a la base de datos", ["statement"])
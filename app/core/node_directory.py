@@ -0,0 +1,169 @@
+# File: app/core/node_directory.py
+
+"""
+Directorio de nodos: asigna cada room_id a un nodo dueño por hashing
+consistente con nodos virtuales. Solo el dueño corre el recognizer de la
+sala; los oyentes pueden conectarse a cualquier nodo (les llega todo por el
+bus de salas).
+
+Configuración:
+  CLUSTER_NODES       "a=http://10.0.0.1:8000,b=http://10.0.0.2:8000"
+  CLUSTER_NODES_FILE  alternativa: JSON {"a": "http://...", ...}, se relee en caliente
+  NODE_ID             id de este nodo dentro de la lista
+  CLUSTER_VNODES      nodos virtuales por nodo (por defecto 128)
+  CLUSTER_SECRET      clave compartida entre nodos para firmar los reenvíos de
+                      oradores (cabecera x-vortext-forwarded). Sin ella solo
+                      se acepta un id de nodo de la lista, que cualquiera que
+                      conozca la configuración podría imitar.
+
+Sin CLUSTER_NODES ni CLUSTER_NODES_FILE todo es local (un solo nodo).
+"""
+
+import bisect
+import hashlib
+import hmac
+import json
+import os
+import time
+
+# vida de la firma de un reenvío: solo cuenta al abrir la conexión con el dueño
+FORWARD_TTL = 60
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, nodes: dict = None, vnodes: int = 128):
+        self.vnodes = vnodes
+        self.nodes = {}
+        self._keys = []
+        self._owners = []
+        for node_id, url in (nodes or {}).items():
+            self.nodes[node_id] = url
+        self._rebuild()
+
+    def _rebuild(self):
+        points = []
+        for node_id in self.nodes:
+            for i in range(self.vnodes):
+                points.append((_hash(f"{node_id}#{i}"), node_id))
+        points.sort()
+        self._keys = [p[0] for p in points]
+        self._owners = [p[1] for p in points]
+
+    def add_node(self, node_id: str, url: str):
+        self.nodes[node_id] = url
+        self._rebuild()
+
+    def remove_node(self, node_id: str):
+        self.nodes.pop(node_id, None)
+        self._rebuild()
+
+    def owner(self, room_id: str):
+        if not self._keys:
+            return None
+        idx = bisect.bisect(self._keys, _hash(room_id)) % len(self._keys)
+        return self._owners[idx]
+
+
+def parse_nodes(spec: str) -> dict:
+    nodes = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        node_id, _, url = item.partition("=")
+        nodes[node_id.strip()] = url.strip().rstrip("/")
+    return nodes
+
+
+class NodeDirectory:
+    def __init__(self, node_id: str, nodes: dict = None, vnodes: int = 128, nodes_file: str = None,
+                 secret: str = None):
+        self.node_id = node_id
+        self.nodes_file = nodes_file
+        self._secret = secret.encode() if secret else None
+        self._file_mtime = None
+        self.ring = HashRing(nodes, vnodes=vnodes)
+
+    @property
+    def clustered(self) -> bool:
+        return len(self.ring.nodes) > 1
+
+    def owner(self, room_id: str) -> str:
+        return self.ring.owner(room_id) or self.node_id
+
+    def is_local(self, room_id: str) -> bool:
+        return not self.clustered or self.owner(room_id) == self.node_id
+
+    def owner_url(self, room_id: str) -> str:
+        return self.ring.nodes.get(self.owner(room_id), "")
+
+    def _forward_signature(self, node_id: str, room_id: str, expires_at: int) -> str:
+        return hmac.new(self._secret, f"{node_id}|{room_id}|{expires_at}".encode(), hashlib.sha256).hexdigest()
+
+    def forward_token(self, room_id: str) -> str:
+        """Valor de la cabecera de reenvío que este nodo manda al dueño de la sala."""
+        if self._secret is None:
+            return self.node_id
+        expires_at = int(time.time() + FORWARD_TTL)
+        return f"{self.node_id}.{expires_at}.{self._forward_signature(self.node_id, room_id, expires_at)}"
+
+    def verify_forwarded(self, token: str, room_id: str) -> bool:
+        """
+        Si la cabecera de reenvío viene de otro nodo del cluster. Un cliente
+        que la invente no se salta el ruteo al dueño.
+        """
+        if not token:
+            return False
+        node_id, _, rest = token.partition(".")
+        if node_id == self.node_id or node_id not in self.ring.nodes:
+            return False
+        if self._secret is None:
+            return not rest
+        expires_at, _, signature = rest.partition(".")
+        try:
+            if time.time() > int(expires_at):
+                return False
+        except ValueError:
+            return False
+        return hmac.compare_digest(signature, self._forward_signature(node_id, room_id, int(expires_at)))
+
+    def update_nodes(self, nodes: dict) -> None:
+        if nodes == self.ring.nodes:
+            return
+        added = sorted(set(nodes) - set(self.ring.nodes))
+        removed = sorted(set(self.ring.nodes) - set(nodes))
+        self.ring = HashRing(nodes, vnodes=self.ring.vnodes)
+        print(f"Directorio de nodos actualizado: +{added} -{removed}")
+
+    def reload(self) -> None:
+        """Relee CLUSTER_NODES_FILE si cambió (altas/bajas de nodos sin reiniciar)."""
+        if not self.nodes_file:
+            return
+        try:
+            mtime = os.path.getmtime(self.nodes_file)
+            if mtime == self._file_mtime:
+                return
+            with open(self.nodes_file) as f:
+                nodes = {k: v.rstrip("/") for k, v in json.load(f).items()}
+            self._file_mtime = mtime
+            self.update_nodes(nodes)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo leer {self.nodes_file}: {e}")
+
+
+def create_node_directory() -> NodeDirectory:
+    directory = NodeDirectory(
+        node_id=os.getenv("NODE_ID", "local"),
+        nodes=parse_nodes(os.getenv("CLUSTER_NODES", "")),
+        vnodes=int(os.getenv("CLUSTER_VNODES", "128")),
+        nodes_file=os.getenv("CLUSTER_NODES_FILE"),
+        secret=os.getenv("CLUSTER_SECRET"),
+    )
+    if directory.clustered and directory._secret is None:
+        print("⚠️ CLUSTER_SECRET no configurado: los reenvíos entre nodos no van firmados")
+    directory.reload()
+    return directory
@@ -0,0 +1,59 @@
+# File: app/core/pagination.py
+
+"""
+Paginación por cursor (keyset) sobre (created_at, id), de lo más nuevo a lo
+más viejo.
+
+En vez de OFFSET (que recorre y descarta todas las filas anteriores), cada
+página pide las filas "después" de la última devuelta, así que cuesta lo
+mismo la página 1 que la 100.000 si hay un índice que termina en created_at.
+El cursor es opaco para el cliente: base64url de created_at e id.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """Devuelve (created_at, id). ValueError si el cursor no es válido."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor!r}") from e
+
+
+def keyset_page(stmt, model, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    """
+    Ordena stmt por (created_at, id) descendente, aplica el cursor y pide una
+    fila de más para saber si hay otra página.
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # created_at <= c primero: es el rango que usa el índice; el OR solo desempata
+        stmt = stmt.where(and_(
+            model.created_at <= created_at,
+            or_(model.created_at < created_at, model.id < row_id),
+        ))
+    return stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def split_page(rows: list, limit: int):
+    """(items, next_cursor) a partir de las limit+1 filas de keyset_page."""
+    if len(rows) <= limit:
+        return rows, None
+    items = rows[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
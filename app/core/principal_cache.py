@@ -0,0 +1,92 @@
+# File: app/core/principal_cache.py
+
+"""
+Cache en memoria del usuario autenticado, por subject del token (el email).
+
+get_current_user lo consulta antes de ir a la base: en las rutas calientes
+(listar y hacer polling de traducciones) la resolución del usuario queda en
+un dict. Las entradas vencen a los PRINCIPAL_CACHE_TTL segundos y se
+invalidan explícitamente al desactivar un usuario (invalidate()); como el
+cache es por proceso, con varios workers el TTL acota cuánto tarda en verse
+el cambio en los demás. PRINCIPAL_CACHE_TTL=0 lo desactiva.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.metrics import counter, gauge
+
+CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX", "10000"))
+
+LOOKUPS = counter("vortext_principal_cache_lookups_total", "Resoluciones de usuario por resultado del cache",
+                  ["result"])
+INVALIDATIONS = counter("vortext_principal_cache_invalidations_total", "Usuarios quitados del cache a mano")
+SIZE = gauge("vortext_principal_cache_entries", "Usuarios en el cache")
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Lo que las rutas necesitan del usuario, sin atarse a una sesión de SQLAlchemy."""
+    id: int
+    email: str
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user) -> "Principal":
+        return cls(id=user.id, email=user.email, is_active=bool(user.is_active))
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float = CACHE_TTL, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # subject -> (principal, vence); orden LRU para acotar la memoria
+        self._entries = OrderedDict()
+        # las rutas síncronas resuelven el usuario desde el threadpool
+        self._lock = threading.Lock()
+
+    def get(self, subject: str):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                LOOKUPS.labels("miss").inc()
+                return None
+            principal, expires_at = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[subject]
+                LOOKUPS.labels("expired").inc()
+                return None
+            self._entries.move_to_end(subject)
+        LOOKUPS.labels("hit").inc()
+        return principal
+
+    def put(self, subject: str, principal: Principal):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, subject: str):
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                INVALIDATIONS.inc()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache()
+SIZE.set_function(lambda: {(): len(principal_cache)})
@@ -0,0 +1,286 @@
+# File: app/core/room_bus.py
+
+"""
+Bus pub/sub de salas para poder correr varios workers de uvicorn.
+
+Cada worker conserva su propio estado local (oyentes conectados, recognizer
+del orador), pero los eventos de sala viajan por el bus:
+  - "utterance": frase reconocida + traducciones (la publica el worker del orador)
+  - "presence":  cuántos oradores/oyentes tiene un worker en la sala
+  - "config":    cambios de /configure/{room_id}
+
+Implementaciones:
+  - InProcessRoomBus: un solo proceso (comportamiento original)
+  - BrokerRoomBus:    broker local por unix socket o TCP; el primer worker que
+                      consigue hacer bind lo aloja, los demás se conectan
+
+Se elige con ROOM_BUS_URL: "memory" (por defecto), "unix:///tmp/vortext-rooms.sock"
+o "tcp://127.0.0.1:7070".
+"""
+
+import asyncio
+import json
+import os
+import socket
+
+ALL_ROOMS = "*"
+
+# límite por línea y buffer máximo pendiente por cliente del broker
+_LINE_LIMIT = 16 * 1024 * 1024
+_MAX_PENDING_BYTES = 8 * 1024 * 1024
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class RoomBus:
+    """Interfaz común. Los handlers son corutinas handler(room_id, event)."""
+
+    def __init__(self):
+        self._handlers = {}  # room_id (o "*") -> [handler]
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def subscribe(self, room_id: str, handler):
+        self._handlers.setdefault(room_id, []).append(handler)
+
+    def unsubscribe(self, room_id: str, handler):
+        handlers = self._handlers.get(room_id, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(room_id, None)
+
+    async def publish(self, room_id: str, event: dict):
+        raise NotImplementedError
+
+    async def _dispatch(self, room_id: str, event: dict):
+        handlers = self._handlers.get(room_id, []) + self._handlers.get(ALL_ROOMS, [])
+        for handler in handlers:
+            try:
+                await handler(room_id, event)
+            except Exception as e:
+                print(f"Error en handler del bus (sala {room_id}): {e}")
+
+
+class InProcessRoomBus(RoomBus):
+    async def publish(self, room_id: str, event: dict):
+        await self._dispatch(room_id, event)
+
+
+def _parse_address(url: str):
+    if url.startswith("unix://"):
+        return "unix", url[len("unix://"):]
+    if url.startswith("tcp://"):
+        host, _, port = url[len("tcp://"):].rpartition(":")
+        return "tcp", (host or "127.0.0.1", int(port))
+    raise ValueError(f"Dirección de bus no soportada: {url}")
+
+
+class RoomBusBroker:
+    """
+    Reenvía cada "pub" a los demás clientes suscritos a la sala (o a "*").
+    Protocolo: una línea JSON por mensaje.
+      {"op": "sub", "room": "Sala1"} / {"op": "unsub", "room": ...}
+      {"op": "pub", "room": "Sala1", "event": {...}}
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._server = None
+        self._clients = {}  # writer -> set(rooms)
+
+    async def start(self):
+        kind, address = _parse_address(self.url)
+        if kind == "unix":
+            # si el socket existe pero nadie escucha, es un resto de un proceso muerto
+            if os.path.exists(address) and not await _unix_socket_alive(address):
+                os.unlink(address)
+            self._server = await asyncio.start_unix_server(self._handle_client, path=address, limit=_LINE_LIMIT)
+        else:
+            host, port = address
+            self._server = await asyncio.start_server(self._handle_client, host, port, limit=_LINE_LIMIT)
+        print(f"Broker de salas escuchando en {self.url}")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self._clients):
+            writer.close()
+        self._clients.clear()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle_client(self, reader, writer):
+        subscriptions = set()
+        self._clients[writer] = subscriptions
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                op = message.get("op")
+                if op == "sub":
+                    subscriptions.add(message["room"])
+                elif op == "unsub":
+                    subscriptions.discard(message["room"])
+                elif op == "pub":
+                    self._forward(writer, message["room"], line)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            print(f"Cliente del broker desconectado: {e}")
+        finally:
+            self._clients.pop(writer, None)
+            writer.close()
+
+    def _forward(self, sender, room_id: str, line: bytes):
+        for writer, rooms in list(self._clients.items()):
+            if writer is sender or not (room_id in rooms or ALL_ROOMS in rooms):
+                continue
+            if writer.transport.get_write_buffer_size() > _MAX_PENDING_BYTES:
+                # un worker que no consume no debe frenar a los demás
+                print("Broker: cliente lento desconectado")
+                self._clients.pop(writer, None)
+                writer.close()
+                continue
+            writer.write(line)
+
+
+async def _unix_socket_alive(path: str) -> bool:
+    try:
+        _, writer = await asyncio.open_unix_connection(path)
+    except (ConnectionError, FileNotFoundError, OSError):
+        return False
+    writer.close()
+    return True
+
+
+class BrokerRoomBus(RoomBus):
+    """
+    Cliente del broker. Entrega los eventos propios localmente sin pasar por
+    el broker; el broker solo reenvía a los otros workers. Si el broker cae,
+    reintenta conectar (o alojarlo, si embed_broker=True) y se re-suscribe.
+    """
+
+    def __init__(self, url: str, embed_broker: bool = True, reconnect_delay: float = 0.5):
+        super().__init__()
+        self.url = url
+        self.embed_broker = embed_broker
+        self.reconnect_delay = reconnect_delay
+        self._writer = None
+        self._broker = None
+        self._task = None
+        self._connected = asyncio.Event()
+        self._closing = False
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            print(f"Bus de salas: sin conexión a {self.url}, se reintentará en segundo plano")
+
+    async def close(self):
+        self._closing = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._writer is not None:
+            self._writer.close()
+        if self._broker is not None:
+            await self._broker.close()
+
+    def subscribe(self, room_id: str, handler):
+        first = room_id not in self._handlers
+        super().subscribe(room_id, handler)
+        if first:
+            self._send({"op": "sub", "room": room_id})
+
+    def unsubscribe(self, room_id: str, handler):
+        super().unsubscribe(room_id, handler)
+        if room_id not in self._handlers:
+            self._send({"op": "unsub", "room": room_id})
+
+    async def publish(self, room_id: str, event: dict):
+        self._send({"op": "pub", "room": room_id, "event": event})
+        await self._dispatch(room_id, event)
+
+    def _send(self, message: dict):
+        if self._writer is None:
+            return
+        try:
+            self._writer.write(json.dumps(message).encode("utf-8") + b"\n")
+        except Exception as e:
+            print(f"Bus de salas: error enviando al broker: {e}")
+
+    async def _open(self):
+        kind, address = _parse_address(self.url)
+        if kind == "unix":
+            return await asyncio.open_unix_connection(address, limit=_LINE_LIMIT)
+        host, port = address
+        return await asyncio.open_connection(host, port, limit=_LINE_LIMIT)
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                reader, writer = await self._open()
+            except (ConnectionError, FileNotFoundError, OSError):
+                if self.embed_broker and self._broker is None:
+                    await self._try_embed_broker()
+                    continue
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+
+            self._writer = writer
+            for room_id in self._handlers:
+                self._send({"op": "sub", "room": room_id})
+            self._connected.set()
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    message = json.loads(line)
+                    await self._dispatch(message["room"], message["event"])
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+                print(f"Bus de salas: conexión perdida: {e}")
+            finally:
+                self._writer = None
+                self._connected.clear()
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _try_embed_broker(self):
+        broker = RoomBusBroker(self.url)
+        try:
+            await broker.start()
+            self._broker = broker
+        except OSError:
+            # otro worker ganó la carrera por el bind
+            await asyncio.sleep(self.reconnect_delay)
+
+
+def create_room_bus(url: str = None) -> RoomBus:
+    url = url or os.getenv("ROOM_BUS_URL", "memory")
+    if url == "memory":
+        return InProcessRoomBus()
+    return BrokerRoomBus(url, embed_broker=os.getenv("ROOM_BUS_EMBED_BROKER", "1") == "1")
+
+
+if __name__ == "__main__":
+    # Broker independiente: python -m app.core.room_bus tcp://0.0.0.0:7070
+    import sys
+    asyncio.run(RoomBusBroker(sys.argv[1] if len(sys.argv) > 1 else "unix:///tmp/vortext-rooms.sock").serve_forever())
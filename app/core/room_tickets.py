@@ -0,0 +1,115 @@
+# File: app/core/room_tickets.py
+
+"""
+Tickets firmados (HMAC-SHA256) para entrar por WebSocket a una sala.
+
+La API autenticada emite un ticket de vida corta que dice sala, rol
+("listener" o "speaker") y, opcionalmente, los idiomas permitidos. Los
+WebSockets lo verifican al aceptar sin consultar base de datos ni red:
+solo la firma y el vencimiento. Así pueden entrar miles de oyentes a la vez
+sin cargar la base, y una conexión rechazada nunca llega a crear la sala.
+
+Formato (va en ?ticket=..., los navegadores no dejan poner cabeceras):
+    base64url(json {"r": sala, "role": rol, "langs": [...], "exp": unix}) "." base64url(hmac)
+
+Configuración:
+  ROOM_TICKET_SECRET           clave compartida por la API y los nodos de salas.
+                               Si está vacía no se exigen tickets (como antes).
+  ROOM_TICKET_PREVIOUS_SECRET  clave anterior, aceptada durante una rotación
+  ROOM_TICKET_TTL              vida del ticket en segundos (300); solo cuenta
+                               al conectar, no corta conexiones ya abiertas
+  ROOM_TICKET_SPEAKERS         emails (coma separados) de los operadores que
+                               pueden pedir tickets de orador; "*" = cualquier
+                               usuario. Vacío: solo se emiten tickets de oyente.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+ROLES = ("listener", "speaker")
+DEFAULT_TTL = float(os.getenv("ROOM_TICKET_TTL", "300"))
+# margen para relojes algo desfasados entre la API y los nodos
+CLOCK_SKEW = 30
+
+
+class TicketError(ValueError):
+    """Ticket ausente, mal formado, vencido o para otra sala/rol. reason es apto para métricas."""
+
+    def __init__(self, reason: str, message: str = None):
+        super().__init__(message or reason)
+        self.reason = reason
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class RoomTickets:
+    def __init__(self, secret: str = None, previous_secret: str = None, ttl: float = DEFAULT_TTL, speakers=()):
+        self._keys = [s.encode() for s in (secret, previous_secret) if s]
+        self.ttl = ttl
+        self.speakers = {email.strip().lower() for email in speakers if email.strip()}
+
+    @property
+    def enforced(self) -> bool:
+        return bool(self._keys)
+
+    def may_speak(self, email: str) -> bool:
+        """Si ese usuario puede pedir tickets de orador (abrir el micrófono de cualquier sala)."""
+        return "*" in self.speakers or (email or "").lower() in self.speakers
+
+    def _sign(self, key: bytes, body: str) -> str:
+        return _b64encode(hmac.new(key, body.encode(), hashlib.sha256).digest())
+
+    def issue(self, room_id: str, role: str, langs=None, ttl: float = None) -> tuple:
+        """Devuelve (ticket, vencimiento unix). Firma siempre con la clave actual."""
+        if not self.enforced:
+            raise RuntimeError("ROOM_TICKET_SECRET no configurado")
+        if role not in ROLES:
+            raise ValueError(f"Rol inválido: {role}")
+        expires_at = int(time.time() + (ttl or self.ttl))
+        payload = {"r": room_id, "role": role, "exp": expires_at}
+        if langs:
+            payload["langs"] = sorted(set(langs))
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        return f"{body}.{self._sign(self._keys[0], body)}", expires_at
+
+    def verify(self, ticket: str, room_id: str, role: str, lang: str = None) -> dict:
+        """Devuelve el payload del ticket o lanza TicketError."""
+        if not ticket:
+            raise TicketError("missing", "Falta el ticket")
+        body, _, signature = ticket.partition(".")
+        if not signature or not any(hmac.compare_digest(signature, self._sign(key, body)) for key in self._keys):
+            raise TicketError("invalid", "Firma inválida")
+        try:
+            payload = json.loads(_b64decode(body))
+            expires_at = float(payload["exp"])
+        except (ValueError, TypeError, KeyError) as e:
+            # firmado por nosotros pero ilegible: no debería pasar
+            raise TicketError("invalid", f"Ticket mal formado: {e}") from e
+        if time.time() > expires_at + CLOCK_SKEW:
+            raise TicketError("expired", "Ticket vencido")
+        if payload.get("r") != room_id:
+            raise TicketError("wrong_room", "El ticket es de otra sala")
+        if payload.get("role") != role:
+            raise TicketError("wrong_role", f"El ticket no es de {role}")
+        langs = payload.get("langs")
+        if lang is not None and langs and lang not in langs:
+            raise TicketError("lang", f"Idioma {lang} no permitido por el ticket")
+        return payload
+
+
+def create_room_tickets() -> RoomTickets:
+    tickets = RoomTickets(os.getenv("ROOM_TICKET_SECRET"), os.getenv("ROOM_TICKET_PREVIOUS_SECRET"),
+                          speakers=os.getenv("ROOM_TICKET_SPEAKERS", "").split(","))
+    if not tickets.enforced:
+        print("⚠️ ROOM_TICKET_SECRET no configurado: los WebSockets de salas no exigen ticket")
+    return tickets
@@ -0,0 +1,116 @@
+# File: app/core/stats_hub.py
+
+"""
+Estadísticas de salas mantenidas de forma incremental y empujadas a los
+paneles de operador.
+
+Cada cambio (conexión/desconexión, presencia de otros workers, frase,
+configuración) marca solo esa sala como sucia; su entrada se recalcula una
+vez y se reutiliza en:
+  - GET /stats: snapshot cacheado (se reconstruye solo si hubo cambios o
+    pasó STATS_SNAPSHOT_TTL segundos, por el contador de tiempo)
+  - /ws/stats: primero un snapshot completo y luego deltas con las salas
+    cambiadas, como mucho uno cada STATS_PUSH_INTERVAL segundos por operador
+"""
+
+import asyncio
+import os
+import time
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+PUSH_INTERVAL = float(os.getenv("STATS_PUSH_INTERVAL", "1.0"))
+SNAPSHOT_TTL = float(os.getenv("STATS_SNAPSHOT_TTL", "1.0"))
+
+
+class _Subscriber:
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.pending = set()
+        self.wakeup = asyncio.Event()
+
+    def notify(self, room_id: str):
+        self.pending.add(room_id)
+        self.wakeup.set()
+
+
+class StatsHub:
+    def __init__(self, build_entry, push_interval: float = PUSH_INTERVAL, snapshot_ttl: float = SNAPSHOT_TTL):
+        """build_entry(room_id) -> dict con "sala", "oradores", "oyentes", "inicio"."""
+        self.build_entry = build_entry
+        self.push_interval = push_interval
+        self.snapshot_ttl = snapshot_ttl
+        self._entries = {}
+        self._dirty = set()
+        self._subscribers = set()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+
+    def mark_dirty(self, room_id: str):
+        self._dirty.add(room_id)
+        self._snapshot = None
+        for subscriber in self._subscribers:
+            subscriber.notify(room_id)
+
+    def remove_room(self, room_id: str):
+        self._entries.pop(room_id, None)
+        self._dirty.discard(room_id)
+        self._snapshot = None
+        for subscriber in self._subscribers:
+            subscriber.notify(room_id)
+
+    def _refresh(self):
+        for room_id in self._dirty:
+            entry = self.build_entry(room_id)
+            if entry is not None:
+                self._entries[room_id] = entry
+        self._dirty.clear()
+
+    def _with_elapsed(self, entry: dict, now: float) -> dict:
+        return dict(entry, tiempo_segundos=int(now - entry["inicio"]))
+
+    def snapshot(self) -> list:
+        now = time.time()
+        if self._snapshot is None or now - self._snapshot_at >= self.snapshot_ttl:
+            self._refresh()
+            self._snapshot = [self._with_elapsed(entry, now) for entry in self._entries.values()]
+            self._snapshot_at = now
+        return self._snapshot
+
+    async def serve(self, websocket: WebSocket):
+        """Atiende un panel de operador hasta que se desconecta."""
+        await websocket.accept()
+        subscriber = _Subscriber(websocket)
+        self._subscribers.add(subscriber)
+        try:
+            await websocket.send_json({"type": "snapshot", "rooms": self.snapshot()})
+            sender = asyncio.create_task(self._push_deltas(subscriber))
+            try:
+                # el panel no manda nada útil; esperamos para detectar el cierre
+                while True:
+                    await websocket.receive_text()
+            finally:
+                sender.cancel()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._subscribers.discard(subscriber)
+
+    async def _push_deltas(self, subscriber: _Subscriber):
+        while True:
+            await subscriber.wakeup.wait()
+            subscriber.wakeup.clear()
+            changed, subscriber.pending = subscriber.pending, set()
+            self._refresh()
+            now = time.time()
+            delta = {
+                "type": "delta",
+                "rooms": [self._with_elapsed(self._entries[r], now) for r in changed if r in self._entries],
+                "removed": [r for r in changed if r not in self._entries],
+            }
+            try:
+                await subscriber.websocket.send_json(delta)
+            except Exception:
+                return
+            # límite por operador: los cambios que lleguen mientras tanto se agrupan
+            await asyncio.sleep(self.push_interval)
@@ -0,0 +1,170 @@
+# File: app/core/tracing.py
+
+"""
+Trazas por frase (utterance): desde que el audio entra al servidor hasta
+que cada oyente terminó de recibir la traducción.
+
+Tramos de una traza:
+  audio_ingest   ingesta del audio de la frase (offset..offset+duration del recognizer)
+  recognition    fin del audio -> callback del SDK
+  loop_handoff   callback del SDK -> handler en el event loop (incluye el bus)
+  serialize      armado y serialización de los mensajes por idioma
+  fanout         envío a los oyentes locales (eventos con cada envío completado)
+
+Solo se traza una fracción de las frases (TRACE_SAMPLE_RATE). Las trazas
+muestreadas van a un ring en memoria (TRACE_RING_SIZE, visible en /traces)
+y, si TRACE_OTLP_FILE está definido, a un archivo JSON-lines en formato
+OTLP/JSON que se puede importar en cualquier backend compatible.
+"""
+
+import json
+import os
+import queue
+import random
+import secrets
+import threading
+from collections import deque
+
+# como mucho se adjuntan estos envíos individuales como eventos del span fanout
+MAX_SEND_EVENTS = 100
+
+
+def new_trace_id() -> str:
+    return secrets.token_hex(16)
+
+
+def _new_span_id() -> str:
+    return secrets.token_hex(8)
+
+
+def _nanos(ts: float) -> str:
+    return str(int(ts * 1_000_000_000))
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    out = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            out.append({"key": key, "value": {"boolValue": value}})
+        elif isinstance(value, int):
+            out.append({"key": key, "value": {"intValue": str(value)}})
+        elif isinstance(value, float):
+            out.append({"key": key, "value": {"doubleValue": value}})
+        else:
+            out.append({"key": key, "value": {"stringValue": str(value)}})
+    return out
+
+
+class Span:
+    __slots__ = ("name", "start", "end", "span_id", "parent_id", "attributes", "events")
+
+    def __init__(self, name: str, start: float, end: float, parent_id: str = None, attributes: dict = None):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.span_id = _new_span_id()
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.events = []  # (nombre, timestamp, atributos)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+class UtteranceTrace:
+    def __init__(self, trace_id: str, room_id: str, worker: str = ""):
+        self.trace_id = trace_id
+        self.room_id = room_id
+        self.worker = worker
+        self.spans = []
+        self.root = None
+
+    def add_span(self, name: str, start: float, end: float, **attributes) -> Span:
+        span = Span(name, start, end, self.root.span_id if self.root else None, attributes)
+        self.spans.append(span)
+        return span
+
+    def finish(self, start: float, end: float, **attributes) -> Span:
+        """Crea el span raíz "utterance" que cubre toda la traza."""
+        self.root = Span("utterance", start, end, None, attributes)
+        for span in self.spans:
+            span.parent_id = self.root.span_id
+        return self.root
+
+    def summary(self) -> dict:
+        return {
+            "trace_id": self.trace_id,
+            "room_id": self.room_id,
+            "worker": self.worker,
+            "total_seconds": round(self.root.duration, 4) if self.root else None,
+            "spans": {span.name: round(span.duration, 4) for span in self.spans},
+            "attributes": self.root.attributes if self.root else {},
+        }
+
+    def to_otlp(self) -> dict:
+        spans = []
+        for span in ([self.root] if self.root else []) + self.spans:
+            item = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": _nanos(span.start),
+                "endTimeUnixNano": _nanos(span.end),
+                "attributes": _otlp_attributes(dict(span.attributes, room_id=self.room_id)),
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            if span.events:
+                item["events"] = [
+                    {"name": name, "timeUnixNano": _nanos(ts), "attributes": _otlp_attributes(attrs)}
+                    for name, ts, attrs in span.events
+                ]
+            spans.append(item)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": "vortext", "worker": self.worker})},
+                "scopeSpans": [{"scope": {"name": "vortext.utterance"}, "spans": spans}],
+            }]
+        }
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, ring_size: int = 256, otlp_path: str = None):
+        self.sample_rate = sample_rate
+        self.ring = deque(maxlen=ring_size)
+        self.otlp_path = otlp_path
+        self._queue = None
+        if otlp_path:
+            # el archivo se escribe en un hilo propio: nunca en el event loop ni en el callback del SDK
+            self._queue = queue.SimpleQueue()
+            threading.Thread(target=self._writer, daemon=True, name="trace-exporter").start()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def export(self, trace: UtteranceTrace) -> None:
+        self.ring.append(trace)
+        if self._queue is not None:
+            self._queue.put(trace)
+
+    def recent(self, limit: int = 50) -> list:
+        return [trace.summary() for trace in list(self.ring)[-limit:]]
+
+    def _writer(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                with open(self.otlp_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_otlp()) + "\n")
+            except OSError as e:
+                print(f"No se pudo exportar la traza {trace.trace_id}: {e}")
+
+
+def create_tracer() -> Tracer:
+    return Tracer(
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+        ring_size=int(os.getenv("TRACE_RING_SIZE", "256")),
+        otlp_path=os.getenv("TRACE_OTLP_FILE") or None,
+    )
@@ -1,18 +1,277 @@
+"""
+Traducción de texto con backends intercambiables.
+
+Backends (TRANSLATOR_BACKEND):
+  - "azure": Azure Translator v3 por REST (TRANSLATOR_KEY o
+    AZURE_TRANSLATOR_KEY; TRANSLATOR_REGION o AZURE_REGION;
+    AZURE_TRANSLATOR_ENDPOINT, por defecto el global), con conexión keep-alive
+  - "stub":  local y determinista (invierte el texto); sin red, para
+    desarrollo y benchmarks. TRANSLATOR_STUB_LATENCY_MS simula la demora
+    de una API
+  - "auto" (por defecto): azure si hay clave, si no stub
+CachingBackend envuelve a cualquiera de ellos con un LRU por (origen,
+destino, texto) de TRANSLATOR_CACHE_SIZE entradas (0 lo desactiva): solo
+los textos que faltan llegan al backend.
+
+Los backends son bloqueantes y corren en un pool propio (TRANSLATE_WORKERS)
+que no compite con el executor por defecto y acota cuántas llamadas hay en
+vuelo en el proceso.
+
+translate_text() no llama al backend directamente: MicroBatcher junta las
+llamadas concurrentes (de todos los sockets que comparten el Translator) que
+van al mismo idioma durante TRANSLATOR_BATCH_WINDOW_MS y las manda en una
+sola petición, hasta TRANSLATOR_MAX_ITEMS textos o TRANSLATOR_MAX_CHARS
+caracteres. Con la ventana en 0 cada texto es una petición.
+"""
+
 import asyncio
-import requests
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
+import requests
+
+from app.core.config import settings
+from app.core.metrics import TRANSLATION_SECONDS, counter, histogram, lang_label
+
+# pool propio para las llamadas externas: no compite con el executor por defecto
+# (to_thread, SDK) y acota cuántas traducciones corren a la vez en el proceso
+TRANSLATE_WORKERS = int(os.getenv("TRANSLATE_WORKERS", "16"))
+BACKEND = os.getenv("TRANSLATOR_BACKEND", "auto")
+STUB_LATENCY = float(os.getenv("TRANSLATOR_STUB_LATENCY_MS", "0")) / 1000
+CACHE_SIZE = int(os.getenv("TRANSLATOR_CACHE_SIZE", "10000"))
+BATCH_WINDOW = float(os.getenv("TRANSLATOR_BATCH_WINDOW_MS", "5")) / 1000
+# límites de Translator v3 por petición: 1000 textos y 50.000 caracteres en total
+MAX_ITEMS = int(os.getenv("TRANSLATOR_MAX_ITEMS", "100"))
+MAX_CHARS = int(os.getenv("TRANSLATOR_MAX_CHARS", "50000"))
+REQUEST_TIMEOUT = 10
+
+BACKEND_REQUESTS = counter("vortext_translator_backend_requests_total",
+                           "Llamadas a los backends de traducción (caché incluida)", ["backend", "result"])
+BATCH_TEXTS = histogram("vortext_translator_batch_texts", "Textos por petición del micro-batcher",
+                        buckets=(1, 2, 5, 10, 25, 50, 100))
+CACHE_LOOKUPS = counter("vortext_translator_cache_lookups_total", "Búsquedas en la caché de traducciones",
+                        ["result"])
+
+_translate_pool = None
+
+
+def get_translate_pool() -> ThreadPoolExecutor:
+    """Pool compartido por todos los Translator (se crea en el primer uso)."""
+    global _translate_pool
+    if _translate_pool is None:
+        _translate_pool = ThreadPoolExecutor(max_workers=TRANSLATE_WORKERS, thread_name_prefix="translate")
+    return _translate_pool
+
+
+def translator_chunks(texts: list, max_items: int = MAX_ITEMS, max_chars: int = MAX_CHARS):
+    """Parte la lista en tandas que respetan los límites por petición."""
+    chunk, chars = [], 0
+    for text in texts:
+        if chunk and (len(chunk) >= max_items or chars + len(text) > max_chars):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(text)
+        chars += len(text)
+    if chunk:
+        yield chunk
+
+
+# --- Backends ---
+class TranslatorBackend:
+    """translate_batch(texts, target, source) -> traducciones en el mismo orden. Bloqueante."""
+
+    name = "base"
+
+    def translate_batch(self, texts: list, target: str, source: Optional[str] = None) -> list:
+        raise NotImplementedError
+
+
+class AzureTranslatorBackend(TranslatorBackend):
+    name = "azure"
+
+    def __init__(self, endpoint: str, key: str, region: str = None, timeout: float = REQUEST_TIMEOUT):
+        self.url = endpoint.rstrip("/") + "/translate"
+        self.headers = {"Ocp-Apim-Subscription-Key": key, "Content-type": "application/json"}
+        if region:
+            self.headers["Ocp-Apim-Subscription-Region"] = region
+        self.timeout = timeout
+        # una Session por hilo del pool: reutiliza la conexión TLS entre peticiones
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def translate_batch(self, texts: list, target: str, source: Optional[str] = None) -> list:
+        params = {"api-version": "3.0", "to": target}
+        if source and source != "auto":
+            params["from"] = source
+        results = []
+        for chunk in translator_chunks(texts):
+            response = self._session().post(self.url, params=params, headers=self.headers,
+                                            json=[{"text": text} for text in chunk], timeout=self.timeout)
+            response.raise_for_status()
+            results.extend(item["translations"][0]["text"] for item in response.json())
+        return results
+
+
+class StubTranslatorBackend(TranslatorBackend):
+    """Sin red y determinista: devuelve el texto invertido (el comportamiento de demostración)."""
+
+    name = "stub"
+
+    def __init__(self, latency: float = STUB_LATENCY):
+        self.latency = latency
+
+    def translate_batch(self, texts: list, target: str, source: Optional[str] = None) -> list:
+        if self.latency:
+            time.sleep(self.latency)  # una petición, como la API real, sin importar cuántos textos lleve
+        return [text[::-1] for text in texts]
+
+
+class CachingBackend(TranslatorBackend):
+    """LRU delante de otro backend; solo le pide los textos que no tiene."""
+
+    def __init__(self, inner: TranslatorBackend, max_entries: int = CACHE_SIZE):
+        self.inner = inner
+        self.name = inner.name
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def translate_batch(self, texts: list, target: str, source: Optional[str] = None) -> list:
+        results = [None] * len(texts)
+        missing = {}  # texto -> posiciones; los repetidos en el lote se piden una vez
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (source or "auto", target, text)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    results[i] = self._entries[key]
+                else:
+                    missing.setdefault(text, []).append(i)
+        hits = len(texts) - sum(len(positions) for positions in missing.values())
+        if hits:
+            CACHE_LOOKUPS.labels("hit").inc(hits)
+        if not missing:
+            return results
+        CACHE_LOOKUPS.labels("miss").inc(len(texts) - hits)
+        pending = list(missing)
+        translated = self.inner.translate_batch(pending, target, source)
+        with self._lock:
+            for text, value in zip(pending, translated):
+                for i in missing[text]:
+                    results[i] = value
+                key = (source or "auto", target, text)
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return results
+
+
+def create_backend(name: str = BACKEND) -> TranslatorBackend:
+    endpoint = settings.AZURE_TRANSLATOR_ENDPOINT
+    key = settings.TRANSLATOR_KEY or settings.AZURE_TRANSLATOR_KEY
+    if name == "auto":
+        name = "azure" if endpoint and key else "stub"
+    if name == "azure":
+        if not (endpoint and key):
+            raise ValueError("Azure Translator no configurado (TRANSLATOR_KEY / AZURE_TRANSLATOR_ENDPOINT)")
+        backend = AzureTranslatorBackend(endpoint, key, settings.TRANSLATOR_REGION or settings.AZURE_REGION)
+    elif name == "stub":
+        backend = StubTranslatorBackend()
+    else:
+        raise ValueError(f"TRANSLATOR_BACKEND desconocido: {name!r}")
+    return CachingBackend(backend) if CACHE_SIZE > 0 else backend
+
+
+# --- Micro-batching ---
+class MicroBatcher:
+    """
+    Junta los translate_text concurrentes por (destino, origen) durante
+    `window` segundos y los resuelve con una sola petición al backend.
+    """
+
+    def __init__(self, call_backend, window: float = BATCH_WINDOW, max_items: int = MAX_ITEMS,
+                 max_chars: int = MAX_CHARS):
+        self.call_backend = call_backend
+        self.window = window
+        self.max_items = max_items
+        self.max_chars = max_chars
+        # (destino, origen) -> [textos, futures, caracteres, timer]
+        self._pending = {}
+        self._tasks = set()
+
+    async def translate(self, text: str, target: str, source: Optional[str] = None) -> str:
+        key = (target, source)
+        batch = self._pending.get(key)
+        if batch is not None and batch[2] + len(text) > self.max_chars:
+            self._flush(key)
+            batch = None
+        if batch is None:
+            timer = asyncio.get_running_loop().call_later(self.window, self._flush, key)
+            batch = self._pending[key] = [[], [], 0, timer]
+        future = asyncio.get_running_loop().create_future()
+        batch[0].append(text)
+        batch[1].append(future)
+        batch[2] += len(text)
+        if len(batch[0]) >= self.max_items:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        texts, futures, _, timer = batch
+        timer.cancel()
+        BATCH_TEXTS.observe(len(texts))
+        task = asyncio.create_task(self._resolve(texts, futures, *key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, texts: list, futures: list, target: str, source: Optional[str]):
+        try:
+            results = await self.call_backend(texts, target, source)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future, result in zip(futures, results):
+            # el que esperaba pudo haberse ido (socket cerrado): su future está cancelado
+            if not future.done():
+                future.set_result(result)
+
+
 class Translator:
-    def __init__(self, api_url=None, api_key=None):
-        self.api_url = api_url
-        self.api_key = api_key
-
-    async def translate_text(self, text: str, target: str) -> str:
-        # synchronous call in thread to external API for demo:
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self._call_external, text, target)
-
-    def _call_external(self, text, target):
-        # Aquí colocas la integración real (Google Translate API, DeepL, OpenAI, etc.)
-        # Placeholder: reverse text to mark transformation (BORRAR en producción)
-        return text[::-1]  # demo: devuelve texto invertido
+    def __init__(self, backend: TranslatorBackend = None, batch_window: float = BATCH_WINDOW):
+        self.backend = backend or create_backend()
+        self.batcher = MicroBatcher(self.translate_batch, window=batch_window) if batch_window > 0 else None
+
+    async def translate_text(self, text: str, target: str, source: Optional[str] = None) -> str:
+        if self.batcher is None:
+            return (await self.translate_batch([text], target, source))[0]
+        return await self.batcher.translate(text, target, source)
+
+    async def translate_batch(self, texts: list, target: str, source: Optional[str] = None) -> list:
+        """Varios textos al mismo idioma en una sola llamada externa."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(get_translate_pool(), self.backend.translate_batch, texts, target,
+                                                 source)
+        except Exception:
+            BACKEND_REQUESTS.labels(self.backend.name, "error").inc()
+            raise
+        finally:
+            TRANSLATION_SECONDS.labels(lang_label(target)).observe(time.perf_counter() - started)
+        BACKEND_REQUESTS.labels(self.backend.name, "ok").inc()
+        return results
@@ -1,11 +1,44 @@
+"""
+WebSocket de traducción de texto: el cliente manda {"type": "text", "text",
+"target"} y recibe {"type": "translation", "original", "translated"}.
+
+serve() atiende cada socket en tubería: sigue leyendo mensajes mientras se
+traducen los anteriores, con hasta WS_PIPELINE_WINDOW pendientes por socket
+(recibidos y todavía sin responder). Con la ventana llena deja de leer, así
+que un cliente que manda de más queda frenado por TCP en vez de acumular
+trabajo en el servidor.
+
+Orden de las respuestas:
+  - mensajes sin "id": se responden en el mismo orden en que llegaron
+  - mensajes con "id": la respuesta lleva el mismo "id" y sale en cuanto está
+    lista, aunque se adelante a otras
+Si se mezclan, una respuesta con "id" puede esperar detrás de una sin "id"
+que todavía se está traduciendo.
+
+Las traducciones corren en el pool propio del Translator (TRANSLATE_WORKERS),
+que acota la concurrencia total del proceso.
+"""
+
+import asyncio
+import json
+import os
 from typing import Dict
-from fastapi import WebSocket
+from fastapi import WebSocket, WebSocketDisconnect
+from app.core.metrics import counter, gauge
 from .translator import Translator
 
+PIPELINE_WINDOW = int(os.getenv("WS_PIPELINE_WINDOW", "8"))
+
+MESSAGES = counter("vortext_ws_translate_messages_total", "Mensajes del WebSocket de traducción", ["result"])
+IN_FLIGHT = gauge("vortext_ws_translate_inflight", "Mensajes recibidos y todavía sin responder")
+
+
 class ConnectionManager:
-    def __init__(self):
+    def __init__(self, translator: Translator = None, window: int = PIPELINE_WINDOW):
         self.active: Dict[str, WebSocket] = {}
-        self.translator = Translator()
+        self.translator = translator or Translator()
+        self.window = max(1, window)
+        self.in_flight = 0
 
     async def connect(self, ws: WebSocket):
         await ws.accept()
@@ -26,3 +59,85 @@ class ConnectionManager:
             # For demo we assume client sends text only
             pass
         return None
+
+    async def serve(self, ws: WebSocket):
+        """Atiende un socket ya conectado hasta que se cierre."""
+        pipeline = _Pipeline(self.window)
+        receiver = asyncio.create_task(self._receive(ws, pipeline))
+        sender = asyncio.create_task(self._send(ws, pipeline))
+        try:
+            await asyncio.wait({receiver, sender}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            waiting = [receiver, sender, *pipeline.pending]
+            for task in waiting:
+                task.cancel()
+            await asyncio.gather(*waiting, return_exceptions=True)
+            # lo que quedó sin responder deja de contar
+            self.in_flight -= pipeline.unanswered
+            await self.disconnect(ws)
+
+    async def _receive(self, ws: WebSocket, pipeline: "_Pipeline"):
+        try:
+            while True:
+                # ventana llena: no se lee más hasta que salga una respuesta
+                await pipeline.slots.acquire()
+                raw = await ws.receive_text()
+                pipeline.unanswered += 1
+                self.in_flight += 1
+                try:
+                    message = json.loads(raw)
+                    if not isinstance(message, dict):
+                        raise ValueError("se esperaba un objeto JSON")
+                except ValueError as e:
+                    MESSAGES.labels("invalid").inc()
+                    pipeline.outbox.put_nowait({"type": "error", "error": f"Mensaje inválido: {e}"})
+                    continue
+                task = asyncio.create_task(self._reply(ws, message))
+                pipeline.pending.add(task)
+                task.add_done_callback(pipeline.pending.discard)
+                if "id" in message:
+                    # fuera de orden: entra a la cola de envío cuando termina
+                    task.add_done_callback(pipeline.outbox.put_nowait)
+                else:
+                    pipeline.outbox.put_nowait(task)
+        except WebSocketDisconnect:
+            return
+
+    async def _reply(self, ws: WebSocket, message: dict):
+        try:
+            reply = await self.handle_message(ws, message)
+            MESSAGES.labels("ok" if reply is not None else "ignored").inc()
+        except Exception as e:
+            MESSAGES.labels("error").inc()
+            reply = {"type": "error", "error": str(e)}
+        if reply is not None and "id" in message:
+            reply["id"] = message["id"]
+        return reply
+
+    async def _send(self, ws: WebSocket, pipeline: "_Pipeline"):
+        while True:
+            item = await pipeline.outbox.get()
+            reply = await item if isinstance(item, asyncio.Task) else item
+            # un solo escritor por socket: los envíos nunca se intercalan
+            if reply is not None:
+                await ws.send_text(json.dumps(reply, ensure_ascii=False))
+            pipeline.unanswered -= 1
+            self.in_flight -= 1
+            pipeline.slots.release()
+
+
+class _Pipeline:
+    """Estado de un socket en serve()."""
+
+    def __init__(self, window: int):
+        self.slots = asyncio.Semaphore(window)
+        # respuestas en orden de envío: tareas (se esperan en orden) o ya resueltas
+        self.outbox = asyncio.Queue()
+        self.pending = set()
+        self.unanswered = 0
+
+
+def create_connection_manager() -> ConnectionManager:
+    manager = ConnectionManager()
+    IN_FLIGHT.set_function(lambda: {(): manager.in_flight})
+    return manager
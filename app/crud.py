@@ -1,10 +1,17 @@
 
 # File: app/crud.py
 
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from app import models, schemas
-from app.security import hash_password, verify_password
-from datetime import datetime
+from app.core.pagination import DEFAULT_LIMIT, decode_cursor, keyset_page, split_page
+from app.core.principal_cache import principal_cache
+from app.db import search_index
+from app.db.session import async_write_lock
+from app.security import hash_password, hash_password_async, verify_password, verify_password_async
+from datetime import datetime, timedelta
 
 
 # Users
@@ -29,6 +36,60 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    return await db.scalar(select(models.User).where(models.User.email == email))
+
+
+async def create_user_async(db: AsyncSession, user: schemas.UserCreate):
+    # el hash (lo caro) va antes de tomar el lock de escritura
+    db_user = models.User(email=user.email, hashed_password=await hash_password_async(user.password))
+    db.add(db_user)
+    async with async_write_lock():
+        await db.commit()
+    return db_user
+
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str):
+    user = await get_user_by_email_async(db, email)
+    if not user:
+        return None
+    old_hash = user.hashed_password
+    valid, new_hash = await verify_password_async(password, old_hash)
+    if not valid:
+        return None
+    if new_hash:
+        # coste de bcrypt cambiado: guardar el hash nuevo, salvo que la contraseña haya cambiado entretanto
+        async with async_write_lock():
+            await db.execute(update(models.User)
+                             .where(models.User.id == user.id, models.User.hashed_password == old_hash)
+                             .values(hashed_password=new_hash)
+                             .execution_options(synchronize_session=False))
+            await db.commit()
+    return user
+
+
+def set_user_active(db: Session, user_id: int, is_active: bool):
+    user = db.get(models.User, user_id)
+    if user is None:
+        return None
+    user.is_active = is_active
+    db.commit()
+    # get_current_user no vuelve a la base mientras el usuario esté en el cache
+    principal_cache.invalidate(user.email)
+    return user
+
+
+async def set_user_active_async(db: AsyncSession, user_id: int, is_active: bool):
+    user = await db.get(models.User, user_id)
+    if user is None:
+        return None
+    user.is_active = is_active
+    async with async_write_lock():
+        await db.commit()
+    principal_cache.invalidate(user.email)
+    return user
+
+
 # Projects
 def create_project(db: Session, owner_id: int, project: schemas.ProjectCreate):
     db_project = models.Project(name=project.name, description=project.description, owner_id=owner_id)
@@ -38,37 +99,302 @@ def create_project(db: Session, owner_id: int, project: schemas.ProjectCreate):
     return db_project
 
 
+def list_projects(db: Session, owner_id: int, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    """Devuelve (proyectos, next_cursor)."""
+    stmt = keyset_page(select(models.Project).where(models.Project.owner_id == owner_id), models.Project, cursor, limit)
+    return split_page(db.scalars(stmt).all(), limit)
+
+
+def get_project(db: Session, project_id: int):
+    return db.get(models.Project, project_id)
+
+
 # Translations
-def create_translation(db: Session, translation_in: schemas.TranslationCreate):
-    db_tr = models.Translation(
-    source_text=translation_in.source_text,
-    source_lang=translation_in.source_lang,
-    target_lang=translation_in.target_lang,
-    status="pending",
-    project_id=translation_in.project_id,
+def _new_translation(translation_in: schemas.TranslationCreate, owner_id: int):
+    return models.Translation(
+        source_text=translation_in.source_text,
+        source_lang=translation_in.source_lang,
+        target_lang=translation_in.target_lang,
+        status="pending",
+        project_id=translation_in.project_id,
+        owner_id=owner_id,
     )
+
+
+def create_translation(db: Session, translation_in: schemas.TranslationCreate, owner_id: int):
+    db_tr = _new_translation(translation_in, owner_id)
     db.add(db_tr)
     db.commit()
     db.refresh(db_tr)
     return db_tr
 
 
+def _result_rows(results: dict, status: str = "completed"):
+    now = datetime.utcnow()
+    return [{"id": translation_id, "translated_text": text, "status": status, "completed_at": now}
+            for translation_id, text in results.items()]
+
+
+def set_translation_results(db: Session, results: dict):
+    """{translation_id: texto} en una sola transacción (UPDATE por clave primaria en lote)."""
+    if not results:
+        return
+    db.execute(update(models.Translation), _result_rows(results))
+    db.execute(delete(models.TranslationClaim).where(models.TranslationClaim.translation_id.in_(list(results))))
+    db.commit()
+
+
 def set_translation_result(db: Session, translation_id: int, translated_text: str):
-    tr = db.query(models.Translation).filter(models.Translation.id == translation_id).first()
-    if tr:
-        tr.translated_text = translated_text
-        tr.status = "completed"
-        tr.completed_at = datetime.utcnow()
-        db.add(tr)
-        db.commit()
-        db.refresh(tr)
-        return tr
+    set_translation_results(db, {translation_id: translated_text})
+    return get_translation(db, translation_id)
 
 
 def get_translation(db: Session, translation_id: int):
     return db.query(models.Translation).filter(models.Translation.id == translation_id).first()
 
 
-def list_translations(db: Session, skip: int = 0, limit: int = 100):
+def owned_translations(owner_id: int):
+    """
+    Traducciones visibles para owner_id: las que creó sin proyecto y las que
+    creó en proyectos suyos. Las filas viejas sin dueño no las ve nadie.
+    """
+    T, P = models.Translation, models.Project
+    return (select(T).outerjoin(P, P.id == T.project_id)
+            .where(T.owner_id == owner_id, or_(T.project_id.is_(None), P.owner_id == owner_id)))
+
+
+def translations_query(owner_id: int, cursor: str = None, limit: int = DEFAULT_LIMIT, status: str = None,
+                       project_id: int = None, target_lang: str = None, source_lang: str = None):
+    stmt = owned_translations(owner_id)
+    if project_id is not None:
+        stmt = stmt.where(models.Translation.project_id == project_id)
+    if status is not None:
+        stmt = stmt.where(models.Translation.status == status)
+    if target_lang is not None:
+        stmt = stmt.where(models.Translation.target_lang == target_lang)
+    if source_lang is not None:
+        stmt = stmt.where(models.Translation.source_lang == source_lang)
+    return keyset_page(stmt, models.Translation, cursor, limit)
+
+
+def list_translations(db: Session, owner_id: int, cursor: str = None, limit: int = DEFAULT_LIMIT, **filters):
+    """Devuelve (traducciones de owner_id, next_cursor). filters: status, project_id, target_lang, source_lang."""
+    return split_page(db.scalars(translations_query(owner_id, cursor, limit, **filters)).all(), limit)
+
+
+# Translations (async, para las rutas que usan get_async_db)
+async def create_translation_async(db: AsyncSession, translation_in: schemas.TranslationCreate, owner_id: int):
+    db_tr = _new_translation(translation_in, owner_id)
+    db.add(db_tr)
+    async with async_write_lock():
+        await db.commit()
+    # con expire_on_commit=False el id ya está cargado; no hace falta refresh
+    return db_tr
+
+
+async def create_translations_bulk_async(db: AsyncSession, items: list, owner_id: int):
+    """
+    Inserta todas las traducciones con un solo INSERT en lote y un solo commit.
+    Devuelve los ids en el mismo orden que items.
+    """
+    now = datetime.utcnow()
+    rows = [{
+        "source_text": item.source_text,
+        "source_lang": item.source_lang,
+        "target_lang": item.target_lang,
+        "status": "pending",
+        "project_id": item.project_id,
+        "owner_id": owner_id,
+        "created_at": now,
+    } for item in items]
+    # sort_by_parameter_order: RETURNING en el orden de los parámetros aunque el driver agrupe filas
+    stmt = insert(models.Translation).returning(models.Translation.id, sort_by_parameter_order=True)
+    async with async_write_lock():
+        ids = (await db.scalars(stmt, rows)).all()
+        await db.commit()
+    return ids
+
+
+async def get_translation_async(db: AsyncSession, translation_id: int):
+    return await db.get(models.Translation, translation_id)
+
+
+async def get_owned_translation_async(db: AsyncSession, owner_id: int, translation_id: int):
+    return (await db.scalars(owned_translations(owner_id).where(models.Translation.id == translation_id))).first()
+
+
+async def list_translations_async(db: AsyncSession, owner_id: int, cursor: str = None, limit: int = DEFAULT_LIMIT,
+                                  **filters):
+    result = await db.scalars(translations_query(owner_id, cursor, limit, **filters))
+    return split_page(result.all(), limit)
+
+
+async def get_project_async(db: AsyncSession, project_id: int):
+    return await db.get(models.Project, project_id)
+
+
+async def foreign_project_ids_async(db: AsyncSession, owner_id: int, project_ids: set) -> set:
+    """De project_ids, los que no existen o no son de owner_id (una sola consulta)."""
+    if not project_ids:
+        return set()
+    owned = (await db.scalars(
+        select(models.Project.id).where(models.Project.id.in_(project_ids), models.Project.owner_id == owner_id)
+    )).all()
+    return set(project_ids) - set(owned)
+
+
+def _insert_ignoring_conflicts(db: AsyncSession, model):
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"INSERT ... ON CONFLICT no soportado en {dialect}")
+
+
+# Cola de traducciones pendientes (la consume app.services.translation_worker)
+async def claim_pending_translations_async(db: AsyncSession, worker_id: str, limit: int, lease_seconds: float,
+                                           max_attempts: int):
+    """
+    Reserva hasta `limit` traducciones pendientes sin reserva vigente (las más
+    viejas primero) y devuelve sus filas (id, source_text, source_lang,
+    target_lang, created_at). Las que ya superaron max_attempts se marcan "failed".
+    Varios workers (o procesos) pueden llamarla a la vez: cada fila queda para
+    uno solo gracias a la clave primaria de translation_claims.
+    """
+    T, C = models.Translation, models.TranslationClaim
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=lease_seconds)
+    async with async_write_lock():
+        candidates = (await db.execute(
+            select(T.id, C.translation_id.label("claimed"))
+            .outerjoin(C, C.translation_id == T.id)
+            .where(T.status == "pending", or_(C.translation_id.is_(None), C.expires_at < now))
+            .order_by(T.created_at, T.id)
+            .limit(limit)
+        )).all()
+        if not candidates:
+            await db.rollback()
+            return []
+
+        attempts = {}
+        new_ids = [row.id for row in candidates if row.claimed is None]
+        if new_ids:
+            stmt = (_insert_ignoring_conflicts(db, C)
+                    .values([{"translation_id": i, "worker_id": worker_id, "claimed_at": now, "expires_at": expires_at,
+                              "attempts": 1} for i in new_ids])
+                    .on_conflict_do_nothing(index_elements=["translation_id"])
+                    .returning(C.translation_id, C.attempts))
+            attempts.update((await db.execute(stmt)).tuples().all())
+        expired_ids = [row.id for row in candidates if row.claimed is not None]
+        if expired_ids:
+            # la condición de vencimiento se repite: otro worker pudo renovarla entre el SELECT y aquí
+            stmt = (update(C)
+                    .where(C.translation_id.in_(expired_ids), C.expires_at < now)
+                    .values(worker_id=worker_id, claimed_at=now, expires_at=expires_at, attempts=C.attempts + 1)
+                    .returning(C.translation_id, C.attempts))
+            attempts.update((await db.execute(stmt)).tuples().all())
+
+        exhausted = [i for i, n in attempts.items() if n > max_attempts]
+        if exhausted:
+            await db.execute(update(T), _result_rows(dict.fromkeys(exhausted), status="failed"))
+            await db.execute(delete(C).where(C.translation_id.in_(exhausted)))
+        claimed = [i for i in attempts if i not in exhausted]
+        rows = []
+        if claimed:
+            rows = (await db.execute(
+                select(T.id, T.source_text, T.source_lang, T.target_lang, T.created_at).where(T.id.in_(claimed))
+            )).all()
+        await db.commit()
+    return rows
+
+
+async def set_translation_results_async(db: AsyncSession, results: dict):
+    """Versión async de set_translation_results: guarda el lote y libera sus reservas."""
+    if not results:
+        return
+    async with async_write_lock():
+        await db.execute(update(models.Translation), _result_rows(results))
+        await db.execute(
+            delete(models.TranslationClaim).where(models.TranslationClaim.translation_id.in_(list(results))))
+        await db.commit()
+
+
+async def release_translation_claims_async(db: AsyncSession, translation_ids: list, retry_after: float = 0.0):
+    """Devuelve reservas a la cola; se podrán tomar de nuevo pasados retry_after segundos."""
+    if not translation_ids:
+        return
+    async with async_write_lock():
+        await db.execute(
+            update(models.TranslationClaim)
+            .where(models.TranslationClaim.translation_id.in_(translation_ids))
+            .values(expires_at=datetime.utcnow() + timedelta(seconds=retry_after))
+        )
+        await db.commit()
+
+
+# Registros de /translate (los escribe app.services.translation_recorder)
+async def reserve_id_block_async(db: AsyncSession, name: str, size: int, model) -> int:
+    """
+    Reserva `size` ids consecutivos de la secuencia `name` y devuelve el
+    primero. La secuencia arranca después del mayor id que ya tenga `model`.
+    """
+    S = models.IdSequence
+    async with async_write_lock():
+        floor = await db.scalar(select(func.coalesce(func.max(model.id), 0) + 1))
+        await db.execute(_insert_ignoring_conflicts(db, S)
+                         .values(name=name, next_value=floor)
+                         .on_conflict_do_nothing(index_elements=["name"]))
+        # un solo UPDATE ... RETURNING: dos procesos nunca reciben el mismo bloque
+        end = await db.scalar(update(S).where(S.name == name)
+                              .values(next_value=S.next_value + size)
+                              .returning(S.next_value))
+        await db.commit()
+    return end - size
+
+
+async def insert_translation_records_async(db: AsyncSession, rows: list):
+    """Un INSERT en lote y un commit para todos los registros (con id ya asignado)."""
+    if not rows:
+        return
+    async with async_write_lock():
+        await db.execute(insert(models.TranslationRecord), rows)
+        await db.commit()
+
+
+# Historial de salas en vivo (lo escribe app.services.utterance_writer)
+async def insert_room_utterances_async(db: AsyncSession, utterances: list, translations: list):
+    """Frases y sus traducciones (con ids ya asignados) en una sola transacción."""
+    if not utterances:
+        return
+    async with async_write_lock():
+        await db.execute(insert(models.RoomUtterance), utterances)
+        if translations:
+            await db.execute(insert(models.RoomUtteranceTranslation), translations)
+        if search_index.supported(db.bind.dialect.name):
+            # el índice de /search se actualiza en la misma transacción
+            await db.execute(search_index.INSERT_SQL, search_index.index_rows(utterances, translations))
+        await db.commit()
+
+
+async def list_room_utterances_async(db: AsyncSession, room_id: str, cursor: str = None, limit: int = DEFAULT_LIMIT):
+    """Devuelve (frases con sus traducciones, next_cursor), de la más nueva a la más vieja."""
+    stmt = keyset_page(
+        select(models.RoomUtterance)
+        .where(models.RoomUtterance.room_id == room_id)
+        .options(selectinload(models.RoomUtterance.translations)),
+        models.RoomUtterance, cursor, limit)
+    return split_page((await db.scalars(stmt)).all(), limit)
+
 
-    return db.query(models.Translation).offset(skip).limit(limit).all()
\ No newline at end of file
+async def search_utterances_async(db: AsyncSession, query: str, lang: str = None, room_id: str = None,
+                                  cursor: str = None, limit: int = DEFAULT_LIMIT):
+    """
+    Busca en el historial de salas (originales y traducciones), de lo más nuevo
+    a lo más viejo. Devuelve (resultados, next_cursor). ValueError si la
+    búsqueda o el cursor no son válidos.
+    """
+    before = decode_cursor(cursor)[1] if cursor else None
+    stmt, params = search_index.search_statement(search_index.build_match(query, lang), lang, room_id, before, limit)
+    rows = (await db.execute(stmt, params)).all()
+    return split_page(rows, limit)
@@ -0,0 +1,152 @@
+# File: app/db/search_index.py
+
+"""
+Índice de texto completo (SQLite FTS5) sobre el historial de salas: una fila
+por frase original y por cada traducción, con sala, idioma, fecha e id de la
+frase (room_utterances.id).
+
+Lo alimenta crud.insert_room_utterances_async en la misma transacción que
+escribe las frases, así que el índice nunca queda atrás del historial.
+
+Los resultados salen de lo más nuevo a lo más viejo (rowid descendente), que
+FTS5 recorre sin ordenar todas las coincidencias: una página cuesta lo mismo
+con mil segmentos que con un millón. El idioma es también una columna
+indexada, para que el filtro por idioma lo resuelva el propio índice.
+
+En otras bases (PostgreSQL) el índice no existe y /search responde 501.
+"""
+
+import html
+import re
+
+from sqlalchemy import DateTime, Integer, String, bindparam, text
+
+SEARCH_TABLE = "utterance_search"
+
+# kind: "original" o "translation"; lang es el idioma de entrada de la sala en los originales
+CREATE_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+    body,
+    lang,
+    kind UNINDEXED,
+    room_id UNINDEXED,
+    utterance_id UNINDEXED,
+    created_at UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+INSERT_SQL = text(
+    f"INSERT INTO {SEARCH_TABLE} (body, lang, kind, room_id, utterance_id, created_at) "
+    "VALUES (:body, :lang, :kind, :room_id, :utterance_id, :created_at)"
+).bindparams(bindparam("created_at", type_=DateTime))  # mismo formato de texto que las tablas
+
+BACKFILL_SQL = f"""
+INSERT INTO {SEARCH_TABLE} (body, lang, kind, room_id, utterance_id, created_at)
+SELECT body, lang, kind, room_id, utterance_id, created_at FROM (
+    SELECT u.original_text AS body, u.source_lang AS lang, 'original' AS kind, u.room_id, u.id AS utterance_id,
+           u.created_at, 0 AS position
+    FROM room_utterances u
+    UNION ALL
+    SELECT t.translated_text, t.lang, 'translation', u.room_id, u.id, u.created_at, 1
+    FROM room_utterance_translations t JOIN room_utterances u ON u.id = t.utterance_id
+) ORDER BY utterance_id, position, lang
+"""
+
+# marcas de resaltado que no pueden venir en el texto; se cambian por <mark> después de escapar
+_HL_START, _HL_END = "\x02", "\x03"
+SNIPPET_TOKENS = 16
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+class SearchQueryError(ValueError):
+    pass
+
+
+def supported(dialect_name: str) -> bool:
+    return dialect_name == "sqlite"
+
+
+def ensure_search_index(sync_conn) -> bool:
+    """
+    Crea el índice si falta y lo llena con el historial que ya hubiera. Para
+    usar con conn.run_sync al arrancar. Devuelve False si la base no es SQLite.
+    """
+    if not supported(sync_conn.dialect.name):
+        return False
+    exists = sync_conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)).first()
+    if not exists:
+        sync_conn.exec_driver_sql(CREATE_SQL)
+        sync_conn.exec_driver_sql(BACKFILL_SQL)
+    return True
+
+
+def build_match(query: str, lang: str = None) -> str:
+    """
+    Traduce la búsqueda del usuario a una expresión MATCH segura:
+      palabra        -> "palabra"
+      "frase exacta" -> "frase exacta"
+      pref*          -> "pref" *
+    Todos los términos deben aparecer (AND). No se exponen los operadores de
+    FTS5, así que ninguna entrada produce un error de sintaxis.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(query or ""):
+        raw = phrase if phrase else word
+        prefix = not phrase and raw.endswith("*")
+        raw = raw.rstrip("*") if prefix else raw
+        # solo letras y números: el resto lo descarta el tokenizer de todos modos
+        tokens = re.findall(r"\w+", raw)
+        if not tokens:
+            continue
+        terms.append('"' + " ".join(tokens) + '"' + (" *" if prefix else ""))
+    if not terms:
+        raise SearchQueryError("La búsqueda no tiene términos")
+    match = "body : (" + " AND ".join(terms) + ")"
+    if lang:
+        lang_tokens = re.findall(r"\w+", lang)
+        if not lang_tokens:
+            raise SearchQueryError(f"Idioma inválido: {lang!r}")
+        # el índice acota por idioma; la comparación exacta (es vs es-ES) la hace el WHERE
+        match += ' AND lang : "' + " ".join(lang_tokens) + '"'
+    return match
+
+
+def search_statement(match: str, lang: str = None, room_id: str = None, before_rowid: int = None, limit: int = 20):
+    conditions = [f"{SEARCH_TABLE} MATCH :match"]
+    params = {"match": match, "limit": limit + 1}
+    if lang:
+        conditions.append("lang = :lang")
+        params["lang"] = lang
+    if room_id:
+        conditions.append("room_id = :room_id")
+        params["room_id"] = room_id
+    if before_rowid is not None:
+        conditions.append("rowid < :before")
+        params["before"] = before_rowid
+    sql = (
+        f"SELECT rowid AS id, utterance_id, room_id, lang, kind, created_at, "
+        f"snippet({SEARCH_TABLE}, 0, '{_HL_START}', '{_HL_END}', '…', {SNIPPET_TOKENS}) AS snippet "
+        f"FROM {SEARCH_TABLE} WHERE {' AND '.join(conditions)} ORDER BY rowid DESC LIMIT :limit"
+    )
+    return text(sql).columns(id=Integer, utterance_id=Integer, room_id=String, lang=String, kind=String,
+                             created_at=DateTime, snippet=String), params
+
+
+def highlight(snippet: str) -> str:
+    """Escapa el fragmento y marca las coincidencias con <mark>...</mark>."""
+    return html.escape(snippet or "").replace(_HL_START, "<mark>").replace(_HL_END, "</mark>")
+
+
+def index_rows(utterances: list, translations: list) -> list:
+    """Filas del índice para las frases recién insertadas (mismos dicts que van a las tablas)."""
+    by_id = {u["id"]: u for u in utterances}
+    rows = [{"body": u["original_text"], "lang": u["source_lang"], "kind": "original", "room_id": u["room_id"],
+             "utterance_id": u["id"], "created_at": u["created_at"]} for u in utterances]
+    for t in translations:
+        u = by_id[t["utterance_id"]]
+        rows.append({"body": t["translated_text"], "lang": t["lang"], "kind": "translation", "room_id": u["room_id"],
+                     "utterance_id": u["id"], "created_at": u["created_at"]})
+    return rows
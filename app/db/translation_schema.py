@@ -0,0 +1,55 @@
+# File: app/db/translation_schema.py
+
+"""
+Puesta al día del esquema de traducciones y proyectos en bases que ya
+existían: create_all no toca tablas existentes, así que las columnas e
+índices agregados después se crean aquí al arrancar.
+
+  - translations.owner_id: se agrega y se llena con el dueño del proyecto.
+    Las filas viejas sin proyecto quedan sin dueño y no las lista nadie.
+  - índices compuestos de Translation y Project (checkfirst).
+
+Si la tabla translations es la del esquema viejo (sin status ni project_id,
+como la del vortext.db de ejemplo) no se toca: ensure_translation_schema
+devuelve False y el llamador decide (el worker de traducciones no arranca).
+"""
+
+from sqlalchemy import inspect
+
+from app import models
+
+# columnas sin las cuales la tabla no es la de models.Translation
+REQUIRED_COLUMNS = {"status", "project_id", "completed_at"}
+
+BACKFILL_OWNER_SQL = """
+UPDATE translations SET owner_id = (SELECT owner_id FROM projects WHERE projects.id = translations.project_id)
+WHERE owner_id IS NULL AND project_id IS NOT NULL
+"""
+
+
+def missing_translation_columns(sync_conn) -> set:
+    """Columnas de REQUIRED_COLUMNS que le faltan a translations (vacío si la tabla no existe: la crea create_all)."""
+    inspector = inspect(sync_conn)
+    if not inspector.has_table(models.Translation.__tablename__):
+        return set()
+    columns = {column["name"] for column in inspector.get_columns(models.Translation.__tablename__)}
+    return REQUIRED_COLUMNS - columns
+
+
+def ensure_translation_schema(sync_conn) -> bool:
+    """Para usar con conn.run_sync al arrancar. False si translations tiene el esquema viejo."""
+    missing = missing_translation_columns(sync_conn)
+    if missing:
+        print(f"⚠️ La tabla translations no tiene {', '.join(sorted(missing))}: esquema viejo, "
+              f"no se actualiza (migrar la base)")
+        return False
+    for model in (models.User, models.Project, models.Translation):
+        model.__table__.create(sync_conn, checkfirst=True)
+    columns = {column["name"] for column in inspect(sync_conn).get_columns(models.Translation.__tablename__)}
+    if "owner_id" not in columns:
+        sync_conn.exec_driver_sql("ALTER TABLE translations ADD COLUMN owner_id INTEGER REFERENCES users (id)")
+        sync_conn.exec_driver_sql(BACKFILL_OWNER_SQL)
+    for model in (models.Project, models.Translation):
+        for index in model.__table__.indexes:
+            index.create(sync_conn, checkfirst=True)
+    return True
@@ -1,42 +0,0 @@
-
-# File: app/models.py
-
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
-from sqlalchemy.orm import relationship
-from datetime import datetime
-from app.db.session import Base
-
-
-class User(Base):
-    __tablename__ = "users"
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True, nullable=False)
-    hashed_password = Column(String, nullable=False)
-    is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    projects = relationship("Project", back_populates="owner")
-
-
-class Project(Base):
-    __tablename__ = "projects"
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, index=True)
-    description = Column(Text, nullable=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    owner = relationship("User", back_populates="projects")
-    translations = relationship("Translation", back_populates="project")
-
-
-class Translation(Base):
-    __tablename__ = "translations"
-    id = Column(Integer, primary_key=True, index=True)
-    source_text = Column(Text, nullable=False)
-    source_lang = Column(String(8), default="auto")
-    target_lang = Column(String(8), nullable=False)
-    translated_text = Column(Text, nullable=True)
-    status = Column(String(20), default="pending")
-    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    completed_at = Column(DateTime, nullable=True)
-    project = relationship("Project", back_populates="translations")
@@ -0,0 +1,107 @@
+
+# File: app/models/__init__.py
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from app.db.session import Base
+
+
+class User(Base):
+    __tablename__ = "users"
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True, nullable=False)
+    hashed_password = Column(String, nullable=False)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    projects = relationship("Project", back_populates="owner")
+
+
+class Project(Base):
+    __tablename__ = "projects"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    description = Column(Text, nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    owner = relationship("User", back_populates="projects")
+    translations = relationship("Translation", back_populates="project")
+
+    # listado por dueño paginado por (created_at, id)
+    __table_args__ = (
+        Index("ix_projects_owner_created", "owner_id", "created_at", "id"),
+    )
+
+
+class Translation(Base):
+    __tablename__ = "translations"
+    id = Column(Integer, primary_key=True, index=True)
+    source_text = Column(Text, nullable=False)
+    source_lang = Column(String(8), default="auto")
+    target_lang = Column(String(8), nullable=False)
+    translated_text = Column(Text, nullable=True)
+    status = Column(String(20), default="pending")
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    # quién la creó: dueño de las que no tienen proyecto (las de un proyecto son además del dueño del proyecto)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+    project = relationship("Project", back_populates="translations")
+
+    # un índice por cada filtro del listado, terminado en (created_at, id) para la paginación por cursor
+    __table_args__ = (
+        Index("ix_translations_created", "created_at", "id"),
+        Index("ix_translations_owner_created", "owner_id", "created_at", "id"),
+        Index("ix_translations_owner_status_created", "owner_id", "status", "created_at", "id"),
+        Index("ix_translations_project_created", "project_id", "created_at", "id"),
+        Index("ix_translations_status_created", "status", "created_at", "id"),
+    )
+
+
+class TranslationClaim(Base):
+    """Reserva de una traducción pendiente por un worker, con vencimiento (lease)."""
+    __tablename__ = "translation_claims"
+    translation_id = Column(Integer, ForeignKey("translations.id", ondelete="CASCADE"), primary_key=True)
+    worker_id = Column(String(64), nullable=False)
+    claimed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # vencido el lease, otro worker puede tomarla (el que la tenía murió o falló)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    attempts = Column(Integer, default=1, nullable=False)
+
+
+class IdSequence(Base):
+    """
+    Secuencias propias repartidas en bloques (hi/lo): cada proceso reserva
+    next_value..next_value+N-1 con un UPDATE y asigna ids sin ir a la base.
+    """
+    __tablename__ = "id_sequences"
+    name = Column(String(64), primary_key=True)
+    next_value = Column(Integer, nullable=False)
+
+
+class RoomUtterance(Base):
+    """Frase reconocida en una sala en vivo (texto original)."""
+    __tablename__ = "room_utterances"
+    id = Column(Integer, primary_key=True)
+    room_id = Column(String(128), nullable=False)
+    source_lang = Column(String(16), nullable=True)
+    original_text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    translations = relationship("RoomUtteranceTranslation", back_populates="utterance")
+
+    # historial de una sala paginado por (created_at, id)
+    __table_args__ = (
+        Index("ix_room_utterances_room_created", "room_id", "created_at", "id"),
+    )
+
+
+class RoomUtteranceTranslation(Base):
+    """Una fila por idioma de destino de cada frase."""
+    __tablename__ = "room_utterance_translations"
+    utterance_id = Column(Integer, ForeignKey("room_utterances.id", ondelete="CASCADE"), primary_key=True)
+    lang = Column(String(16), primary_key=True)
+    translated_text = Column(Text, nullable=False)
+    utterance = relationship("RoomUtterance", back_populates="translations")
+
+
+from app.models.translation_record import TranslationRecord  # noqa: E402,F401  registra la tabla
@@ -2,7 +2,8 @@ from sqlalchemy import Column, Integer, String, Text, DateTime, func
 from app.db.session import Base
 
 class TranslationRecord(Base):
-    __tablename__ = "translations"
+    # "translations" es de models.Translation; con el mismo nombre no podían convivir en Base.metadata
+    __tablename__ = "translation_records"
 
     id = Column(Integer, primary_key=True, index=True)
     source_lang = Column(String(8))
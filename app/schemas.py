@@ -1,8 +1,8 @@
 
 # File: app/schemas.py
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field
+from typing import Literal, Optional
 from datetime import datetime
 
 
@@ -54,6 +54,15 @@ class TranslationCreate(BaseModel):
     project_id: Optional[int] = None
 
 
+class TranslationBulkCreate(BaseModel):
+    # el tope se comprueba en la ruta (TRANSLATION_BULK_MAX_ITEMS)
+    items: list[TranslationCreate] = Field(..., min_length=1)
+
+
+class TranslationBulkOut(BaseModel):
+    ids: list[int]  # en el mismo orden que items
+
+
 class TranslationOut(BaseModel):
     id: int
     source_text: str
@@ -68,3 +77,55 @@ class TranslationOut(BaseModel):
 
 class Config:
     orm_mode = True
+
+
+class TranslationPage(BaseModel):
+    items: list[TranslationOut]
+    next_cursor: Optional[str] = None
+
+
+class ProjectPage(BaseModel):
+    items: list[ProjectOut]
+    next_cursor: Optional[str] = None
+
+
+class RoomTicketRequest(BaseModel):
+    role: Literal["listener", "speaker"] = "listener"
+    # idiomas que puede pedir el oyente (?lang=); vacío = cualquiera
+    langs: Optional[list[str]] = Field(None, max_length=32)
+
+
+class RoomTicketOut(BaseModel):
+    ticket: str
+    room_id: str
+    role: str
+    expires_at: int
+
+
+class RoomUtteranceOut(BaseModel):
+    id: int
+    room_id: str
+    source_lang: Optional[str]
+    original_text: str
+    created_at: datetime
+    translations: dict[str, str]
+
+
+class RoomUtterancePage(BaseModel):
+    items: list[RoomUtteranceOut]
+    next_cursor: Optional[str] = None
+
+
+class SearchHit(BaseModel):
+    utterance_id: int
+    room_id: str
+    lang: Optional[str]
+    kind: str
+    created_at: datetime
+    # fragmento con HTML escapado y las coincidencias entre <mark>...</mark>
+    snippet: str
+
+
+class SearchPage(BaseModel):
+    items: list[SearchHit]
+    next_cursor: Optional[str] = None
@@ -1,13 +1,52 @@
-
 # File: app/security.py
 
+"""
+Hash de contraseñas y tokens JWT.
+
+bcrypt es CPU puro (~0,3 s por llamada con coste 12) y retiene el GIL, así
+que las rutas async usan hash_password_async / verify_password_async, que lo
+ejecutan en un pool de procesos acotado (PASSWORD_HASH_WORKERS). Como mucho
+hay un hash por proceso del pool en vuelo; el resto espera en un semáforo,
+donde se mide el tiempo en cola, y pasado PASSWORD_HASH_MAX_PENDING se
+rechaza con PasswordHashBusy en vez de acumular esperas sin fin.
+
+Si cambia BCRYPT_ROUNDS, los hashes con otro coste se regeneran de forma
+transparente en el siguiente login correcto (verify_password_async devuelve
+el hash nuevo).
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 = sin pool de procesos: bcrypt corre en el threadpool del proceso (desarrollo)
+HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "256"))
+
+# min/max iguales al coste por defecto: needs_update() marca los hashes con cualquier otro coste
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS,
+                           bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
 
+HASH_QUEUE_SECONDS = histogram("vortext_password_hash_queue_seconds",
+                               "Espera hasta que un proceso del pool toma el hash", ["op"])
+HASH_SECONDS = histogram("vortext_password_hash_seconds", "Duración del hash/verificación bcrypt", ["op"])
+HASH_PENDING = gauge("vortext_password_hash_pending", "Hashes en cola o en ejecución")
+HASH_REJECTED = counter("vortext_password_hash_rejected_total", "Hashes rechazados por cola llena", ["op"])
+REHASHED = counter("vortext_password_rehash_total", "Contraseñas regeneradas con el coste actual al hacer login")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+class PasswordHashBusy(Exception):
+    """Hay demasiados hashes esperando; el cliente debería reintentar más tarde."""
 
 
 def hash_password(password: str) -> str:
@@ -18,14 +57,102 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+def _verify_and_update(plain: str, hashed: str):
+    """(válida, hash nuevo o None). Corre en el proceso del pool."""
+    try:
+        return pwd_context.verify_and_update(plain, hashed)
+    except ValueError:
+        # hash corrupto o de un esquema desconocido: igual que una contraseña incorrecta
+        return False, None
+
+
+# --- Pool de procesos ---
+_hash_pool = None
+_hash_slots = None
+_pending = 0
+
+HASH_PENDING.set_function(lambda: {(): _pending})
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    """Pool compartido (se crea en el primer uso)."""
+    global _hash_pool
+    if _hash_pool is None:
+        # spawn: no heredar los hilos ni el event loop del proceso web
+        _hash_pool = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+
+async def start_hash_pool():
+    """Levanta los procesos de antemano para que el primer login no pague el arranque."""
+    if HASH_WORKERS <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    await asyncio.gather(*(loop.run_in_executor(pool, os.getpid) for _ in range(HASH_WORKERS)))
+
+
+def shutdown_hash_pool():
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+async def _run_hash(op: str, fn, *args):
+    global _hash_slots, _pending
+    if _pending >= HASH_MAX_PENDING:
+        HASH_REJECTED.labels(op).inc()
+        raise PasswordHashBusy(f"{_pending} hashes de contraseña pendientes")
+    if _hash_slots is None:
+        _hash_slots = asyncio.Semaphore(max(1, HASH_WORKERS))
+
+    _pending += 1
+    queued_at = time.perf_counter()
+    try:
+        # el semáforo mantiene la cola aquí (medible) y no dentro del executor
+        async with _hash_slots:
+            started = time.perf_counter()
+            HASH_QUEUE_SECONDS.labels(op).observe(started - queued_at)
+            if HASH_WORKERS <= 0:
+                result = await asyncio.to_thread(fn, *args)
+            else:
+                try:
+                    result = await asyncio.get_running_loop().run_in_executor(get_hash_pool(), fn, *args)
+                except BrokenProcessPool:
+                    # un proceso del pool murió (OOM, kill): recrear el pool y reintentar una vez
+                    print("⚠️ Pool de hash de contraseñas roto, se recrea")
+                    shutdown_hash_pool()
+                    result = await asyncio.get_running_loop().run_in_executor(get_hash_pool(), fn, *args)
+            HASH_SECONDS.labels(op).observe(time.perf_counter() - started)
+            return result
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash("hash", hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str):
+    """
+    Devuelve (válida, hash_nuevo). hash_nuevo no es None cuando la contraseña
+    es correcta pero el hash guardado usa otro coste: hay que persistirlo.
+    """
+    valid, new_hash = await _run_hash("verify", _verify_and_update, plain, hashed)
+    if new_hash:
+        REHASHED.inc()
+    return valid, new_hash
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-        to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
@@ -0,0 +1,226 @@
+# File: app/services/audio_decoder.py
+
+"""
+Decodificación de audio comprimido del orador a PCM 16 kHz / 16-bit / mono,
+que es el formato que espera el PushAudioInputStream del reconocedor.
+
+Códecs aceptados (negociados por el cliente con ?codec=...):
+  - "pcm":  PCM crudo, se pasa tal cual (comportamiento original)
+  - "opus": un paquete Opus crudo por mensaje WebSocket
+  - "ogg":  flujo Ogg/Opus troceado arbitrariamente
+  - "webm": flujo WebM/Opus (p. ej. MediaRecorder del navegador)
+
+La decodificación corre en un pool de hilos acotado (AUDIO_DECODE_WORKERS)
+para no bloquear el event loop. PyAV libera el GIL mientras decodifica.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import av
+except ImportError:  # dependencia opcional: solo hace falta para códecs comprimidos
+    av = None
+
+
+SUPPORTED_CODECS = ("pcm", "opus", "ogg", "webm")
+TARGET_SAMPLE_RATE = 16000
+
+DECODE_WORKERS = int(os.getenv("AUDIO_DECODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_decode_pool = None
+
+
+def get_decode_pool() -> ThreadPoolExecutor:
+    """Pool compartido por todos los oradores (se crea en el primer uso)."""
+    global _decode_pool
+    if _decode_pool is None:
+        _decode_pool = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="audio-decode")
+    return _decode_pool
+
+
+# --- Demuxers ---
+class OggOpusDemuxer:
+    """Extrae paquetes Opus de un flujo Ogg que llega en trozos arbitrarios."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._partial = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        packets = []
+        while True:
+            if len(self._buffer) < 27:
+                break
+            start = self._buffer.find(b"OggS")
+            if start < 0:
+                # conservar los últimos bytes por si el capture pattern quedó cortado
+                del self._buffer[:-3]
+                break
+            if start > 0:
+                del self._buffer[:start]
+                continue
+            n_segments = self._buffer[26]
+            header_len = 27 + n_segments
+            if len(self._buffer) < header_len:
+                break
+            lacing = self._buffer[27:header_len]
+            page_len = header_len + sum(lacing)
+            if len(self._buffer) < page_len:
+                break
+
+            pos = header_len
+            for value in lacing:
+                self._partial += self._buffer[pos:pos + value]
+                pos += value
+                if value < 255:
+                    packet = bytes(self._partial)
+                    self._partial.clear()
+                    if packet and not packet.startswith((b"OpusHead", b"OpusTags")):
+                        packets.append(packet)
+            del self._buffer[:page_len]
+        return packets
+
+
+def _read_vint(buf, pos: int, keep_marker: bool):
+    """Lee un entero de longitud variable EBML. Devuelve (valor, longitud) o (None, 0)."""
+    if pos >= len(buf):
+        return None, 0
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("EBML vint inválido")
+    if pos + length > len(buf):
+        return None, 0
+    value = first if keep_marker else first & (mask - 1)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = -1  # tamaño desconocido (Segment/Cluster en streaming)
+    return value, length
+
+
+class WebmOpusDemuxer:
+    """
+    Demuxer EBML mínimo para el WebM que produce MediaRecorder: desciende en
+    Segment/Cluster/BlockGroup y devuelve el contenido de SimpleBlock/Block
+    (sin lacing, una sola pista de audio).
+    """
+
+    _MASTER_IDS = {0x18538067, 0x1F43B675, 0xA0}  # Segment, Cluster, BlockGroup
+    _BLOCK_IDS = {0xA3, 0xA1}                       # SimpleBlock, Block
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._skip = 0
+
+    def feed(self, data: bytes) -> list:
+        self._buffer += data
+        packets = []
+        while True:
+            if self._skip:
+                dropped = min(self._skip, len(self._buffer))
+                del self._buffer[:dropped]
+                self._skip -= dropped
+                if self._skip:
+                    break
+            element_id, id_len = _read_vint(self._buffer, 0, keep_marker=True)
+            if element_id is None:
+                break
+            size, size_len = _read_vint(self._buffer, id_len, keep_marker=False)
+            if size is None:
+                break
+            header_len = id_len + size_len
+
+            if element_id in self._MASTER_IDS:
+                del self._buffer[:header_len]
+                continue
+            if size < 0:
+                raise ValueError(f"Elemento EBML 0x{element_id:X} con tamaño desconocido")
+            if element_id in self._BLOCK_IDS:
+                if len(self._buffer) < header_len + size:
+                    break
+                block = self._buffer[header_len:header_len + size]
+                _, track_len = _read_vint(block, 0, keep_marker=False)
+                # track (vint) + timecode (int16) + flags (1 byte)
+                payload = bytes(block[track_len + 3:])
+                if payload:
+                    packets.append(payload)
+                del self._buffer[:header_len + size]
+                continue
+            # cualquier otro elemento (EBML header, Tracks, Cues, ...) se descarta
+            del self._buffer[:header_len]
+            self._skip = size
+        return packets
+
+
+class RawOpusDemuxer:
+    """Cada mensaje WebSocket ya es un paquete Opus."""
+
+    def feed(self, data: bytes) -> list:
+        return [bytes(data)] if data else []
+
+
+_DEMUXERS = {
+    "opus": RawOpusDemuxer,
+    "ogg": OggOpusDemuxer,
+    "webm": WebmOpusDemuxer,
+}
+
+
+# --- Decoder por orador ---
+class StreamDecoder:
+    """
+    Estado de decodificación de un orador. decode() debe llamarse en orden
+    (el receptor del WebSocket espera cada llamada antes de la siguiente),
+    pero puede ejecutarse en cualquier hilo del pool.
+    """
+
+    def __init__(self, codec: str):
+        if av is None:
+            raise RuntimeError("PyAV no está instalado: no se puede decodificar audio comprimido")
+        self.codec = codec
+        self._demuxer = _DEMUXERS[codec]()
+        self._codec_ctx = av.CodecContext.create("opus", "r")
+        self._resampler = av.AudioResampler(format="s16", layout="mono", rate=TARGET_SAMPLE_RATE)
+        # contabilidad para el benchmark / logs
+        self.cpu_seconds = 0.0
+        self.bytes_in = 0
+        self.pcm_bytes_out = 0
+
+    def decode(self, data: bytes) -> bytes:
+        started = time.thread_time()
+        self.bytes_in += len(data)
+        out = bytearray()
+        for packet in self._demuxer.feed(data):
+            try:
+                frames = self._codec_ctx.decode(av.Packet(packet))
+            except av.error.FFmpegError as e:
+                print(f"Paquete Opus descartado: {e}")
+                continue
+            for frame in frames:
+                for resampled in self._resampler.resample(frame):
+                    out += bytes(resampled.planes[0])[:resampled.samples * 2]
+        self.pcm_bytes_out += len(out)
+        self.cpu_seconds += time.thread_time() - started
+        return bytes(out)
+
+    @property
+    def audio_seconds(self) -> float:
+        return self.pcm_bytes_out / (TARGET_SAMPLE_RATE * 2)
+
+
+def create_stream_decoder(codec: str):
+    """Devuelve None para PCM (sin transformación) o un StreamDecoder."""
+    codec = (codec or "pcm").lower()
+    if codec not in SUPPORTED_CODECS:
+        raise ValueError(f"Códec no soportado: {codec}")
+    if codec == "pcm":
+        return None
+    return StreamDecoder(codec)
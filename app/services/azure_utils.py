@@ -1,8 +1,10 @@
 # File: app/services/azure_utils.py
 
+import asyncio
 import azure.cognitiveservices.speech as speechsdk
-import requests
 from app.core.config import settings
+from app.core.translator import Translator, create_backend
+from app.services.synthesizer_pool import get_synthesizer_pool
 
 
 # -------------------------------
@@ -50,26 +52,21 @@ async def speech_to_text(audio_bytes: bytes):
 # -------------------------------
 # 2. Translator
 # -------------------------------
+# un solo cliente de Azure Translator en el proceso: el de app.core.translator (sesiones, lotes, cache)
+_translator = None
+
+
+def _get_translator() -> Translator:
+    global _translator
+    if _translator is None:
+        _translator = Translator(create_backend("azure"))
+    return _translator
+
+
 async def translate_text(text: str, target_lang: str):
     """Traduce texto usando Azure Translator."""
     try:
-        endpoint = settings.AZURE_TRANSLATOR_ENDPOINT
-        path = "/translate?api-version=3.0"
-        params = f"&to={target_lang}"
-        constructed_url = endpoint + path + params
-
-        headers = {
-            "Ocp-Apim-Subscription-Key": settings.AZURE_TRANSLATOR_KEY,
-            "Ocp-Apim-Subscription-Region": settings.AZURE_REGION,
-            "Content-type": "application/json"
-        }
-
-        body = [{"text": text}]
-        response = requests.post(constructed_url, headers=headers, json=body)
-        response.raise_for_status()
-        result = response.json()
-
-        return result[0]["translations"][0]["text"]
+        return await _get_translator().translate_text(text, target_lang)
     except Exception as e:
         raise Exception(f"Azure Translator error: {e}")
 
@@ -80,21 +77,15 @@ async def translate_text(text: str, target_lang: str):
 async def text_to_speech(text: str, lang: str):
     """Convierte texto en audio usando Azure Text-to-Speech (devuelve bytes WAV)."""
     try:
-        speech_config = speechsdk.SpeechConfig(
-            subscription=settings.AZURE_SPEECH_KEY,
-            region=settings.AZURE_REGION
-        )
-
         # Seleccionar voz según idioma
         if lang.startswith("es"):
-            speech_config.speech_synthesis_voice_name = "es-ES-AlvaroNeural"
+            voice = "es-ES-AlvaroNeural"
         else:
-            speech_config.speech_synthesis_voice_name = "en-US-GuyNeural"
-
-        audio_output = speechsdk.audio.AudioOutputConfig(use_default_speaker=False)
-        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+            voice = "en-US-GuyNeural"
 
-        result = synthesizer.speak_text_async(text).get()
+        # sintetizador ya conectado del pool; la llamada del SDK es bloqueante
+        pool = get_synthesizer_pool(settings.AZURE_SPEECH_KEY, settings.AZURE_REGION)
+        result = await asyncio.to_thread(pool.synthesize, text, voice)
 
         if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
             return result.audio_data
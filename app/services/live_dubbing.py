@@ -0,0 +1,247 @@
+# File: app/services/live_dubbing.py
+
+"""
+Doblaje en vivo de las salas: cada frase reconocida se sintetiza una vez por
+idioma con oyentes de audio en este worker (voz según VOICE_MAP), y ese
+único audio se reparte a todos los oyentes de ese idioma. El costo de TTS
+crece con los idiomas activos, no con la cantidad de oyentes.
+
+El audio sale por el WebSocket del oyente como frames binarios
+(app.core.audio_frames) a medida que el sintetizador produce cada trozo. El
+utterance_id es el mismo que lleva el mensaje de texto de esa frase.
+
+Cada oyente elige el formato del audio (app.core.audio_formats: Opus, MP3,
+WAV a 16 u 8 kHz). Se sintetiza una vez por idioma y formato en uso: conviene
+que los clientes de una sala usen pocos formatos.
+
+Cada (sala, idioma, formato) tiene su propia cola y su propia tarea, así que
+un idioma lento no atrasa a los demás. Si la síntesis no da abasto, se descarta
+el audio viejo en vez de acumular retraso:
+  - cola llena (LIVE_TTS_MAX_QUEUE): sale la frase más vieja sin sintetizar
+  - frase que esperó más de LIVE_TTS_MAX_AGE segundos: se descarta
+  - sin sintetizador libre en LIVE_TTS_BORROW_TIMEOUT segundos: se descarta
+El texto siempre llega; solo se pierde el audio atrasado.
+
+Cada oyente recibe su frame por separado con un tope de LIVE_TTS_SEND_TIMEOUT
+segundos: un oyente lento atrasa su canal como mucho ese tiempo, no sin
+límite. Tras LIVE_TTS_MAX_SEND_FAILURES fallos o demoras seguidos, el oyente
+sale del doblaje (on_drop) y sigue recibiendo solo el texto.
+
+Las síntesis corren en un pool de hilos propio (LIVE_TTS_WORKERS), no en el
+executor por defecto del loop: esperar un sintetizador bloquea el hilo, y
+con muchas salas eso dejaría sin hilos a todo lo demás que usa
+run_in_executor(None, ...).
+
+Configuración: LIVE_TTS_ENABLED (valor por defecto de las salas nuevas; cada
+sala lo cambia con POST /configure), LIVE_TTS_MAX_QUEUE, LIVE_TTS_MAX_AGE,
+LIVE_TTS_WORKERS, LIVE_TTS_BORROW_TIMEOUT, LIVE_TTS_SEND_TIMEOUT,
+LIVE_TTS_MAX_SEND_FAILURES.
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.core.audio_formats import DEFAULT_FORMAT, FORMATS
+from app.core.audio_frames import pack_audio_frame
+from app.core.metrics import counter, gauge, histogram, lang_label
+from app.services.synthesizer_pool import SynthesizerBusy
+
+ENABLED_BY_DEFAULT = os.getenv("LIVE_TTS_ENABLED", "0") == "1"
+MAX_QUEUE = int(os.getenv("LIVE_TTS_MAX_QUEUE", "2"))
+MAX_AGE = float(os.getenv("LIVE_TTS_MAX_AGE", "6"))
+WORKERS = int(os.getenv("LIVE_TTS_WORKERS", "8"))
+# corto a propósito: si el pool está ocupado la frase ya llegaría tarde
+BORROW_TIMEOUT = float(os.getenv("LIVE_TTS_BORROW_TIMEOUT", "1"))
+SEND_TIMEOUT = float(os.getenv("LIVE_TTS_SEND_TIMEOUT", "0.5"))
+MAX_SEND_FAILURES = int(os.getenv("LIVE_TTS_MAX_SEND_FAILURES", "3"))
+DEFAULT_VOICE = "en-US-JennyNeural"
+
+UTTERANCES = counter("vortext_live_tts_utterances_total", "Frases del doblaje en vivo por resultado",
+                     ["lang", "format", "result"])
+FIRST_AUDIO = histogram("vortext_live_tts_first_audio_seconds",
+                        "Desde que se encola la frase hasta el primer trozo de audio enviado", ["lang"])
+QUEUE_DEPTH = gauge("vortext_live_tts_queue_depth", "Frases esperando síntesis en todas las salas")
+DROPPED_LISTENERS = counter("vortext_live_tts_dropped_listeners_total",
+                            "Oyentes sacados del doblaje por fallos o demoras seguidos al enviar", ["lang"])
+CHANNELS = gauge("vortext_live_tts_channels", "Colas (sala, idioma, formato) con síntesis en curso o pendiente")
+
+
+def voice_for(lang: str, voice_map: dict) -> str:
+    """Voz para un idioma de traducción: "es" -> la de "es-ES"; "zh-Hans" -> la de "zh-CN"."""
+    if lang in voice_map:
+        return voice_map[lang]
+    prefix = lang.split("-")[0].lower()
+    for locale, voice in voice_map.items():
+        if locale.split("-")[0].lower() == prefix:
+            return voice
+    return DEFAULT_VOICE
+
+
+class _Channel:
+    """Cola y tarea de síntesis de un (sala, idioma, formato)."""
+
+    def __init__(self):
+        self.pending = deque()
+        self.task = None
+
+
+class LiveDubbing:
+    def __init__(self, pool, voice_map: dict, listeners, max_queue: int = MAX_QUEUE, max_age: float = MAX_AGE,
+                 workers: int = WORKERS, borrow_timeout: float = BORROW_TIMEOUT, send_timeout: float = SEND_TIMEOUT,
+                 max_send_failures: int = MAX_SEND_FAILURES, on_drop=None):
+        """
+        listeners(room_id, lang, format_name) -> WebSockets que quieren ese audio, en este worker.
+        on_drop(room_id, lang, format_name, websocket) lo saca de esa lista cuando falla seguido.
+        """
+        self.pool = pool
+        self.voice_map = voice_map
+        self.listeners = listeners
+        self.max_queue = max(1, max_queue)
+        self.max_age = max_age
+        self.workers = max(1, workers)
+        self.borrow_timeout = borrow_timeout
+        self.send_timeout = send_timeout
+        self.max_send_failures = max(1, max_send_failures)
+        self.on_drop = on_drop
+        self._channels = {}
+        # fallos seguidos por oyente; se olvida solo cuando el WebSocket desaparece
+        self._send_failures = weakref.WeakKeyDictionary()
+        self._executor = None
+
+    @property
+    def depth(self) -> int:
+        return sum(len(channel.pending) for channel in self._channels.values())
+
+    @property
+    def active_channels(self) -> int:
+        return len(self._channels)
+
+    def submit(self, room_id: str, lang: str, utterance_id: int, text: str, format_name: str = DEFAULT_FORMAT):
+        """Encola la frase para ese idioma y formato sin esperar (desde el event loop)."""
+        key = (room_id, lang, format_name)
+        channel = self._channels.get(key)
+        if channel is None:
+            channel = self._channels[key] = _Channel()
+        if len(channel.pending) >= self.max_queue:
+            channel.pending.popleft()
+            UTTERANCES.labels(lang_label(lang), format_name, "superseded").inc()
+        channel.pending.append((time.monotonic(), utterance_id, text))
+        if channel.task is None:
+            channel.task = asyncio.create_task(self._run(key, channel),
+                                               name=f"live-tts-{room_id}-{lang}-{format_name}")
+
+    def forget_room(self, room_id: str):
+        for key in [key for key in self._channels if key[0] == room_id]:
+            channel = self._channels.pop(key)
+            if channel.task is not None:
+                channel.task.cancel()
+
+    async def close(self):
+        tasks = [channel.task for channel in self._channels.values() if channel.task is not None]
+        self._channels.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._executor is not None:
+            # las síntesis en curso terminan solas en sus hilos; no las esperamos
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="live-tts")
+        return self._executor
+
+    async def _run(self, key: tuple, channel: _Channel):
+        room_id, lang, format_name = key
+        try:
+            while channel.pending:
+                queued_at, utterance_id, text = channel.pending.popleft()
+                if time.monotonic() - queued_at > self.max_age:
+                    UTTERANCES.labels(lang_label(lang), format_name, "stale").inc()
+                    continue
+                if not self.listeners(room_id, lang, format_name):
+                    UTTERANCES.labels(lang_label(lang), format_name, "no_listeners").inc()
+                    continue
+                await self._synthesize(key, utterance_id, text, queued_at)
+        finally:
+            channel.task = None
+            # sin trabajo: la cola se vuelve a crear con la próxima frase
+            if not channel.pending and self._channels.get(key) is channel:
+                del self._channels[key]
+
+    async def _synthesize(self, key: tuple, utterance_id: int, text: str, queued_at: float):
+        room_id, lang, format_name = key
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def on_chunk(data):
+            # hilo del SDK -> loop; el resultado de la síntesis llega después del último trozo
+            loop.call_soon_threadsafe(chunks.put_nowait, data)
+
+        voice = voice_for(lang, self.voice_map)
+        # el formato es parte de la clave del pool: sintetizadores distintos por (voz, formato)
+        output_format = FORMATS[format_name].sdk_name
+        synthesis = loop.run_in_executor(self._get_executor(), lambda: self.pool.synthesize(
+            text, voice, output_format, timeout=self.borrow_timeout, on_chunk=on_chunk))
+        synthesis.add_done_callback(lambda _: chunks.put_nowait(None))
+        seq = 0
+        while True:
+            data = await chunks.get()
+            if data is None:
+                break
+            if not data:
+                continue
+            if seq == 0:
+                FIRST_AUDIO.labels(lang_label(lang)).observe(time.monotonic() - queued_at)
+            await self._send(key, pack_audio_frame(utterance_id, seq, data))
+            seq += 1
+        # cierre de la frase aunque la síntesis haya fallado: el cliente no queda esperando
+        await self._send(key, pack_audio_frame(utterance_id, seq, b"", last=True))
+        try:
+            result = synthesis.result()
+            outcome = "synthesized" if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted else "failed"
+            if outcome == "failed":
+                print(f"TTS en vivo falló en sala {room_id}, idioma {lang}: {result.reason}")
+        except SynthesizerBusy:
+            # pool saturado: se descarta como una frase vieja, sin bloquear más el hilo
+            outcome = "busy"
+        except Exception as e:
+            outcome = "failed"
+            print(f"Error en TTS en vivo de sala {room_id}, idioma {lang}: {e}")
+        UTTERANCES.labels(lang_label(lang), format_name, outcome).inc()
+
+    async def _send(self, key: tuple, frame: bytes):
+        room_id, lang, format_name = key
+        # el mismo buffer para todos los oyentes del idioma y formato, cada envío con su tope
+        clients = list(self.listeners(room_id, lang, format_name))
+        results = await asyncio.gather(*(asyncio.wait_for(client.send_bytes(frame), self.send_timeout)
+                                         for client in clients), return_exceptions=True)
+        failures = 0
+        for client, result in zip(clients, results):
+            if not isinstance(result, Exception):
+                self._send_failures.pop(client, None)
+                continue
+            failures += 1
+            count = self._send_failures[client] = self._send_failures.get(client, 0) + 1
+            if count >= self.max_send_failures:
+                self._send_failures.pop(client, None)
+                DROPPED_LISTENERS.labels(lang_label(lang)).inc()
+                print(f"⚠️ Oyente sin doblaje en sala {room_id}, idioma {lang}: {count} envíos fallidos seguidos")
+                if self.on_drop is not None:
+                    self.on_drop(room_id, lang, format_name, client)
+        if failures:
+            print(f"Error enviando audio a {failures} oyentes en sala {room_id}, idioma {lang}")
+
+
+def create_live_dubbing(pool, voice_map: dict, listeners, on_drop=None) -> LiveDubbing:
+    dubbing = LiveDubbing(pool, voice_map, listeners, on_drop=on_drop)
+    QUEUE_DEPTH.set_function(lambda: {(): dubbing.depth})
+    CHANNELS.set_function(lambda: {(): dubbing.active_channels})
+    return dubbing
@@ -0,0 +1,266 @@
+# File: app/services/speech_engine.py
+
+"""
+Creación del recognizer de traducción de una sala y de los sintetizadores
+de voz.
+
+SPEECH_ENGINE=azure (por defecto) usa el Speech SDK. SPEECH_ENGINE=fake usa
+un motor falso con la misma interfaz (push stream + señales recognized /
+recognizing + start/stop que devuelven futuros con .get()) para benchmarks
+y pruebas de carga sin consumir la API de Azure.
+
+El sintetizador falso genera silencio (~60 ms por carácter) con eventos
+synthesizing por trozo, del tamaño que tendría en el formato pedido
+(app.core.audio_formats: WAV a su frecuencia, o bytes al bitrate nominal
+del códec). Tarda FAKE_TTS_CONNECT_MS en la primera síntesis si no se abrió
+la conexión antes (como el SDK) y produce el audio a
+FAKE_TTS_REALTIME_FACTOR veces su duración.
+
+El motor falso emite una frase final cada FAKE_UTTERANCE_SECONDS de audio
+recibido, con un parcial a mitad de camino. El texto original termina en
+"t=<hora de ingesta>" del último byte de la frase, para que los clientes de
+benchmark midan la latencia hasta el oyente.
+"""
+
+import io
+import os
+import queue
+import threading
+import time
+import wave
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.core.audio_clock import TICKS_PER_SECOND
+from app.core.audio_formats import FORMATS, get_format
+
+TARGET_LANGUAGES = ["es", "en", "fr", "it", "de", "pt", "zh-Hans"]
+BYTES_PER_SECOND = 16000 * 2  # PCM 16 kHz, 16-bit, mono
+
+
+def create_translation_recognizer(speech_key, speech_region, input_lang, target_languages=TARGET_LANGUAGES):
+    """Devuelve (push_stream, recognizer) según SPEECH_ENGINE."""
+    if os.getenv("SPEECH_ENGINE", "azure") == "fake":
+        recognizer = FakeTranslationRecognizer(
+            target_languages, utterance_seconds=float(os.getenv("FAKE_UTTERANCE_SECONDS", "2.0")))
+        return recognizer.push_stream, recognizer
+
+    # Audio config
+    audio_format = speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
+    push_stream = speechsdk.audio.PushAudioInputStream(stream_format=audio_format)
+    audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
+
+    # SpeechTranslationConfig
+    speech_translation_config = speechsdk.translation.SpeechTranslationConfig(subscription=speech_key, region=speech_region)
+    speech_translation_config.speech_recognition_language = input_lang
+    for lang in target_languages:
+        speech_translation_config.add_target_language(lang)
+
+    recognizer = speechsdk.translation.TranslationRecognizer(
+        translation_config=speech_translation_config,
+        audio_config=audio_config
+    )
+    return push_stream, recognizer
+
+
+def create_speech_synthesizer(speech_key, speech_region, voice: str = None, output_format: str = None):
+    """
+    Sintetizador en memoria (audio_config=None: el audio queda en result.audio_data).
+    output_format es el nombre de un speechsdk.SpeechSynthesisOutputFormat; None deja el del SDK.
+    """
+    if os.getenv("SPEECH_ENGINE", "azure") == "fake":
+        return FakeSpeechSynthesizer(output_format)
+    speech_config = speechsdk.SpeechConfig(subscription=speech_key, region=speech_region)
+    if voice:
+        speech_config.speech_synthesis_voice_name = voice
+    if output_format:
+        speech_config.set_speech_synthesis_output_format(getattr(speechsdk.SpeechSynthesisOutputFormat, output_format))
+    return speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
+
+
+def open_synthesizer_connection(synthesizer):
+    """Abre la conexión al servicio antes de la primera síntesis. Devuelve el Connection (señales connected/disconnected)."""
+    if isinstance(synthesizer, FakeSpeechSynthesizer):
+        return synthesizer.open_connection()
+    connection = speechsdk.Connection.from_speech_synthesizer(synthesizer)
+    connection.open(True)
+    return connection
+
+
+# --- Motor falso ---
+class _Signal:
+    def __init__(self):
+        self._callbacks = []
+
+    def connect(self, callback):
+        self._callbacks.append(callback)
+
+    def fire(self, evt):
+        for callback in self._callbacks:
+            callback(evt)
+
+
+class _Done:
+    """Imita el ResultFuture del SDK."""
+
+    def get(self):
+        return None
+
+
+class FakeResult:
+    def __init__(self, text, translations, offset, duration, reason, audio_data: bytes = b""):
+        self.text = text
+        self.translations = translations
+        self.offset = offset
+        self.duration = duration
+        self.reason = reason
+        self.audio_data = audio_data
+
+
+class FakeEvent:
+    def __init__(self, result):
+        self.result = result
+
+
+FAKE_TTS_CONNECT = float(os.getenv("FAKE_TTS_CONNECT_MS", "150")) / 1000
+FAKE_TTS_REALTIME_FACTOR = float(os.getenv("FAKE_TTS_REALTIME_FACTOR", "0.1"))
+FAKE_TTS_CHUNK_SECONDS = 0.1
+FAKE_TTS_SECONDS_PER_CHAR = 0.06
+
+
+class FakeConnection:
+    def __init__(self):
+        self.connected = _Signal()
+        self.disconnected = _Signal()
+        self.is_open = False
+
+    def open(self, for_continuous_recognition: bool = False):
+        if not self.is_open:
+            time.sleep(FAKE_TTS_CONNECT)
+            self.is_open = True
+            self.connected.fire(None)
+
+    def close(self):
+        if self.is_open:
+            self.is_open = False
+            self.disconnected.fire(None)
+
+
+class _ResultFuture:
+    def __init__(self, fn):
+        self._fn = fn
+
+    def get(self):
+        return self._fn()
+
+
+class FakeSpeechSynthesizer:
+    """Silencio en el formato pedido (WAV 16 kHz si no) con eventos synthesizing por trozo de FAKE_TTS_CHUNK_SECONDS."""
+
+    def __init__(self, output_format: str = None):
+        self.audio_format = get_format(output_format) or FORMATS["wav-16k"]
+        self.synthesizing = _Signal()
+        self.synthesis_completed = _Signal()
+        self.synthesis_canceled = _Signal()
+        self.connection = FakeConnection()
+
+    def open_connection(self):
+        self.connection.open()
+        return self.connection
+
+    def speak_text_async(self, text: str):
+        return _ResultFuture(lambda: self._speak(text))
+
+    def _speak(self, text: str):
+        self.connection.open()  # sin pre-conexión, la primera síntesis paga el handshake
+        audio_format = self.audio_format
+        seconds = len(text) * FAKE_TTS_SECONDS_PER_CHAR
+        if audio_format.riff:
+            buffer = io.BytesIO()
+            with wave.open(buffer, "wb") as wav:
+                wav.setnchannels(1)
+                wav.setsampwidth(2)
+                wav.setframerate(audio_format.sample_rate)
+                wav.writeframes(b"\x00\x00" * int(seconds * audio_format.sample_rate))
+            audio, header = buffer.getvalue(), 44
+        else:
+            audio, header = b"\x00" * int(seconds * audio_format.kbps * 125), 0
+        byte_rate = audio_format.kbps * 125
+        # como el SDK en formatos RIFF: la cabecera WAV llega con el primer trozo
+        chunk_bytes = max(1, int(FAKE_TTS_CHUNK_SECONDS * byte_rate))
+        position = 0
+        while position < len(audio):
+            end = min(len(audio), position + chunk_bytes + (header if position == 0 else 0))
+            time.sleep((end - position) / byte_rate * FAKE_TTS_REALTIME_FACTOR)
+            self.synthesizing.fire(FakeEvent(FakeResult(text, {}, 0, 0, speechsdk.ResultReason.SynthesizingAudio,
+                                                         audio_data=audio[position:end])))
+            position = end
+        result = FakeResult(text, {}, 0, 0, speechsdk.ResultReason.SynthesizingAudioCompleted, audio_data=audio)
+        self.synthesis_completed.fire(FakeEvent(result))
+        return result
+
+
+class FakePushStream:
+    def __init__(self):
+        self._queue = queue.SimpleQueue()
+
+    def write(self, data: bytes):
+        self._queue.put((len(data), time.time()))
+
+    def close(self):
+        self._queue.put(None)
+
+
+class FakeTranslationRecognizer:
+    """Los callbacks se disparan desde un hilo propio, como hace el SDK."""
+
+    def __init__(self, target_languages, utterance_seconds: float = 2.0):
+        self.target_languages = list(target_languages)
+        self.utterance_bytes = int(utterance_seconds * BYTES_PER_SECOND)
+        self.push_stream = FakePushStream()
+        self.recognized = _Signal()
+        self.recognizing = _Signal()
+        self.canceled = _Signal()
+        self._thread = None
+
+    def start_continuous_recognition_async(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="fake-recognizer")
+        self._thread.start()
+        return _Done()
+
+    def stop_continuous_recognition_async(self):
+        self.push_stream.close()
+        return _Done()
+
+    def _result(self, text, offset_bytes, length_bytes, reason):
+        translations = {lang: f"[{lang}] {text}" for lang in self.target_languages}
+        return FakeResult(
+            text, translations,
+            offset_bytes * TICKS_PER_SECOND // BYTES_PER_SECOND,
+            length_bytes * TICKS_PER_SECOND // BYTES_PER_SECOND,
+            reason,
+        )
+
+    def _run(self):
+        total = 0
+        utterance_start = 0
+        partial_sent = False
+        count = 0
+        while True:
+            item = self.push_stream._queue.get()
+            if item is None:
+                return
+            nbytes, ingested_at = item
+            total += nbytes
+            length = total - utterance_start
+            if not partial_sent and length >= self.utterance_bytes // 2:
+                partial_sent = True
+                self.recognizing.fire(FakeEvent(self._result(
+                    f"utterance {count}", utterance_start, length, speechsdk.ResultReason.TranslatingSpeech)))
+            if length >= self.utterance_bytes:
+                text = f"utterance {count} t={ingested_at:.6f}"
+                self.recognized.fire(FakeEvent(self._result(
+                    text, utterance_start, length, speechsdk.ResultReason.TranslatedSpeech)))
+                count += 1
+                utterance_start = total
+                partial_sent = False
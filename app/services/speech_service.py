@@ -1,5 +1,9 @@
+import asyncio
+
 import azure.cognitiveservices.speech as speechsdk
 
+from app.services.synthesizer_pool import get_synthesizer_pool
+
 SPEECH_KEY = "1zZVViJwiJk8BAB97wLRQAwWRk8VGMsWp84I1TG77C6tUUqazbTBJQQJ99BIACHYHv6XJ3w3AAAEACOGVnMc"
 SPEECH_REGION = "eastus2"
 
@@ -48,9 +52,9 @@ class SpeechService:
         if result.reason == speechsdk.ResultReason.TranslatedSpeech:
             translated_text = list(result.translations.values())[0]
 
-            # Generar TTS
-            synthesizer = speechsdk.SpeechSynthesizer(speech_config=self.speech_config, audio_config=None)
-            tts_result = synthesizer.speak_text_async(translated_text).get()
+            # Generar TTS (voz por defecto) con un sintetizador ya conectado del pool
+            pool = get_synthesizer_pool(SPEECH_KEY, SPEECH_REGION)
+            tts_result = await asyncio.to_thread(pool.synthesize, translated_text)
             tts_bytes = tts_result.audio_data
 
         return translated_text, tts_bytes
@@ -0,0 +1,298 @@
+# File: app/services/synthesizer_pool.py
+
+"""
+Pool de sintetizadores de voz (Azure TTS) ya conectados.
+
+Crear un SpeechSynthesizer por llamada paga cada vez la conexión al
+servicio (TLS + websocket), que es buena parte de la demora hasta el primer
+byte de audio. El pool guarda sintetizadores por (voz, formato de salida)
+con la conexión abierta de antemano y los presta de a uno:
+
+  with pool.borrow("es-ES-AlvaroNeural") as synthesizer: ...
+  result = pool.synthesize(text, voice, output_format, on_chunk=None)   # bloqueante
+
+- Concurrencia: como mucho TTS_POOL_MAX_PER_VOICE síntesis a la vez por
+  (voz, formato). Si están todos ocupados, borrow() espera hasta
+  TTS_POOL_BORROW_TIMEOUT segundos y luego lanza SynthesizerBusy.
+- Salud: un sintetizador cuya conexión se cayó (evento disconnected) o cuya
+  síntesis terminó cancelada no vuelve al pool. El mantenimiento reconecta
+  los ociosos desconectados para que el próximo préstamo no pague la conexión.
+- Ociosos: se cierran tras TTS_POOL_IDLE_SECONDS sin uso.
+- warm(voces) los crea y conecta por adelantado (p. ej. al arrancar).
+
+Un pool por credenciales: get_synthesizer_pool(key, region). La API es
+bloqueante (la usan hilos del SDK y del executor); desde el event loop se
+llama con asyncio.to_thread.
+
+Métricas: espera para obtener un sintetizador, latencia hasta el primer
+trozo de audio, sintetizadores ociosos/ocupados y eventos del pool.
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+import azure.cognitiveservices.speech as speechsdk
+
+from app.core.metrics import TTS_SECONDS, counter, gauge, histogram, voice_label
+from app.services.speech_engine import create_speech_synthesizer, open_synthesizer_connection
+
+MAX_PER_VOICE = int(os.getenv("TTS_POOL_MAX_PER_VOICE", "4"))
+IDLE_SECONDS = float(os.getenv("TTS_POOL_IDLE_SECONDS", "300"))
+BORROW_TIMEOUT = float(os.getenv("TTS_POOL_BORROW_TIMEOUT", "10"))
+MAINTENANCE_INTERVAL = float(os.getenv("TTS_POOL_MAINTENANCE_INTERVAL", "15"))
+
+BORROW_WAIT = histogram("vortext_tts_pool_borrow_wait_seconds", "Espera para obtener un sintetizador del pool",
+                        ["voice"])
+FIRST_BYTE = histogram("vortext_tts_first_byte_seconds", "Desde el pedido de síntesis hasta el primer trozo de audio",
+                       ["voice"])
+POOL_EVENTS = counter("vortext_tts_pool_events_total", "Sintetizadores creados, reconectados, descartados o esperas "
+                      "agotadas", ["event"])
+POOL_SIZE = gauge("vortext_tts_pool_synthesizers", "Sintetizadores en el pool", ["state"])
+
+
+class SynthesizerBusy(Exception):
+    """Todos los sintetizadores de esa voz siguen ocupados al vencer la espera."""
+
+
+class _Entry:
+    def __init__(self, key, synthesizer):
+        self.key = key
+        self.synthesizer = synthesizer
+        self.connection = None
+        self.connected = False
+        self.healthy = True
+        self.last_used = time.monotonic()
+        # pedido en curso: para medir el primer byte desde el callback del SDK
+        self.requested_at = None
+        self.on_chunk = None
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = open_synthesizer_connection(self.synthesizer)
+            self.connection.connected.connect(lambda evt: setattr(self, "connected", True))
+            self.connection.disconnected.connect(lambda evt: setattr(self, "connected", False))
+            self.synthesizer.synthesizing.connect(self._on_synthesizing)
+        else:
+            self.connection.open(True)
+        self.connected = True
+
+    def close(self):
+        try:
+            if self.connection is not None:
+                self.connection.close()
+        except Exception:
+            pass
+
+    def _on_synthesizing(self, evt):
+        requested_at, self.requested_at = self.requested_at, None
+        if requested_at is not None:
+            FIRST_BYTE.labels(voice_label(self.key[0] or "default")).observe(time.monotonic() - requested_at)
+        on_chunk = self.on_chunk
+        if on_chunk is not None:
+            on_chunk(evt.result.audio_data)
+
+
+class SynthesizerPool:
+    def __init__(self, speech_key=None, speech_region=None, max_per_voice: int = MAX_PER_VOICE,
+                 idle_seconds: float = IDLE_SECONDS, borrow_timeout: float = BORROW_TIMEOUT,
+                 maintenance_interval: float = MAINTENANCE_INTERVAL):
+        self.speech_key = speech_key
+        self.speech_region = speech_region
+        self.max_per_voice = max_per_voice
+        self.idle_seconds = idle_seconds
+        self.borrow_timeout = borrow_timeout
+        self.maintenance_interval = maintenance_interval
+        self._idle = {}    # (voz, formato) -> [_Entry], el más recién usado al final
+        self._in_use = {}  # (voz, formato) -> prestados o creándose
+        self._cond = threading.Condition()
+        self._closed = False
+        self._maintenance = None
+
+    @property
+    def idle_count(self) -> int:
+        return sum(len(entries) for entries in self._idle.values())
+
+    @property
+    def busy_count(self) -> int:
+        return sum(self._in_use.values())
+
+    # --- préstamo ---
+    @contextlib.contextmanager
+    def borrow(self, voice: str = None, output_format: str = None, timeout: float = None):
+        entry = self._acquire((voice, output_format), self.borrow_timeout if timeout is None else timeout)
+        try:
+            yield entry.synthesizer
+        except Exception:
+            entry.healthy = False
+            raise
+        finally:
+            self._release(entry)
+
+    def synthesize(self, text: str, voice: str = None, output_format: str = None, timeout: float = None,
+                   on_chunk=None):
+        """
+        Sintetiza `text` con un sintetizador del pool. Devuelve el resultado del SDK (usar .reason).
+        on_chunk(bytes), si se pasa, recibe cada trozo de audio a medida que llega (hilo del SDK).
+        """
+        key = (voice, output_format)
+        entry = self._acquire(key, self.borrow_timeout if timeout is None else timeout)
+        try:
+            with TTS_SECONDS.labels(voice_label(voice or "default")).time():
+                entry.on_chunk = on_chunk
+                entry.requested_at = time.monotonic()
+                result = entry.synthesizer.speak_text_async(text).get()
+            if result.reason == speechsdk.ResultReason.Canceled:
+                entry.healthy = False
+            return result
+        except Exception:
+            entry.healthy = False
+            raise
+        finally:
+            entry.requested_at = None
+            entry.on_chunk = None
+            self._release(entry)
+
+    def _acquire(self, key, timeout: float) -> _Entry:
+        started = time.monotonic()
+        deadline = started + timeout
+        entry = None
+        with self._cond:
+            self._ensure_maintenance()
+            while True:
+                idle = self._idle.get(key)
+                while idle:
+                    candidate = idle.pop()
+                    if candidate.healthy and candidate.connected:
+                        entry = candidate
+                        break
+                    POOL_EVENTS.labels("discarded").inc()
+                    candidate.close()
+                if entry is not None or self._in_use.get(key, 0) + len(self._idle.get(key, ())) < self.max_per_voice:
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    POOL_EVENTS.labels("timeout").inc()
+                    raise SynthesizerBusy(f"Sin sintetizadores libres para la voz {key[0]!r}")
+                self._cond.wait(remaining)
+        if entry is None:
+            # crear y conectar fuera del lock: tarda lo que tarda el handshake
+            try:
+                entry = self._create(key)
+            except Exception:
+                with self._cond:
+                    self._in_use[key] -= 1
+                    self._cond.notify_all()
+                raise
+        BORROW_WAIT.labels(voice_label(key[0] or "default")).observe(time.monotonic() - started)
+        return entry
+
+    def _release(self, entry: _Entry):
+        with self._cond:
+            self._in_use[entry.key] -= 1
+            if entry.healthy and not self._closed:
+                entry.last_used = time.monotonic()
+                self._idle.setdefault(entry.key, []).append(entry)
+            else:
+                POOL_EVENTS.labels("discarded").inc()
+                entry.close()
+            self._cond.notify_all()
+
+    def _create(self, key) -> _Entry:
+        voice, output_format = key
+        entry = _Entry(key, create_speech_synthesizer(self.speech_key, self.speech_region, voice, output_format))
+        entry.connect()
+        POOL_EVENTS.labels("created").inc()
+        return entry
+
+    # --- pre-conexión y mantenimiento ---
+    def warm(self, voices, output_format: str = None, count: int = 1):
+        """Crea y conecta hasta `count` sintetizadores ociosos por voz (bloqueante)."""
+        for voice in voices:
+            key = (voice, output_format)
+            while True:
+                with self._cond:
+                    if len(self._idle.get(key, ())) >= count or \
+                            self._in_use.get(key, 0) + len(self._idle.get(key, ())) >= self.max_per_voice:
+                        break
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                try:
+                    entry = self._create(key)
+                except Exception as e:
+                    with self._cond:
+                        self._in_use[key] -= 1
+                    print(f"⚠️ No se pudo pre-conectar la voz {voice}: {e}")
+                    break
+                self._release(entry)
+
+    def maintain(self):
+        """Cierra los ociosos vencidos y reconecta los ociosos que perdieron la conexión."""
+        now = time.monotonic()
+        expired, reconnect = [], []
+        with self._cond:
+            for key, entries in self._idle.items():
+                keep = []
+                for entry in entries:
+                    if not entry.healthy or now - entry.last_used > self.idle_seconds:
+                        expired.append(entry)
+                    elif not entry.connected:
+                        reconnect.append(entry)
+                    else:
+                        keep.append(entry)
+                self._idle[key] = keep
+            # los que se reconectan cuentan como ocupados mientras tanto
+            for entry in reconnect:
+                self._in_use[entry.key] = self._in_use.get(entry.key, 0) + 1
+        for entry in expired:
+            POOL_EVENTS.labels("evicted").inc()
+            entry.close()
+        for entry in reconnect:
+            try:
+                entry.connect()
+                POOL_EVENTS.labels("reconnected").inc()
+            except Exception:
+                entry.healthy = False
+            self._release(entry)
+
+    def _ensure_maintenance(self):
+        if self._maintenance is None and not self._closed:
+            self._maintenance = threading.Thread(target=self._maintenance_loop, daemon=True, name="tts-pool")
+            self._maintenance.start()
+
+    def _maintenance_loop(self):
+        while not self._closed:
+            time.sleep(self.maintenance_interval)
+            try:
+                self.maintain()
+            except Exception as e:
+                print(f"Error en el mantenimiento del pool de TTS: {e}")
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            entries = [entry for idle in self._idle.values() for entry in idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for entry in entries:
+            entry.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_synthesizer_pool(speech_key=None, speech_region=None) -> SynthesizerPool:
+    """Pool compartido para esas credenciales (se crea en el primer uso)."""
+    with _pools_lock:
+        pool = _pools.get((speech_key, speech_region))
+        if pool is None:
+            pool = _pools[(speech_key, speech_region)] = SynthesizerPool(speech_key, speech_region)
+        return pool
+
+
+POOL_SIZE.set_function(lambda: {
+    ("idle",): sum(pool.idle_count for pool in list(_pools.values())),
+    ("busy",): sum(pool.busy_count for pool in list(_pools.values())),
+})
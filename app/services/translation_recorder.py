@@ -0,0 +1,213 @@
+# File: app/services/translation_recorder.py
+
+"""
+Escritura diferida (write-behind) de TranslationRecord para GET /translate.
+
+record() no toca la base: asigna el id de un bloque reservado de antemano
+(tabla id_sequences, RECORDER_ID_BLOCK ids por reserva), deja el registro en
+un buffer en memoria y vuelve. Una tarea de fondo lo vacía con un INSERT en
+lote y un solo commit (group commit) cada RECORDER_FLUSH_INTERVAL_MS o en
+cuanto se juntan RECORDER_FLUSH_MAX_RECORDS registros, así que cada fsync
+cubre cientos de peticiones en vez de una.
+
+Memoria acotada: con RECORDER_MAX_PENDING registros sin guardar (la base va
+lenta o está caída), record() espera al siguiente flush en vez de seguir
+acumulando. stop() guarda todo lo pendiente antes de salir: en un apagado
+ordenado no se pierde nada (desde que empieza, record() rechaza registros
+nuevos con RecorderStopped); si el proceso muere, sí lo del último intervalo.
+Quien necesite el registro en disco antes de responder puede usar flush().
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from app import crud, models
+from app.core.metrics import counter, gauge, histogram
+from app.db import session as db_session
+
+FLUSH_INTERVAL = float(os.getenv("RECORDER_FLUSH_INTERVAL_MS", "20")) / 1000
+FLUSH_MAX_RECORDS = int(os.getenv("RECORDER_FLUSH_MAX_RECORDS", "500"))
+MAX_PENDING = int(os.getenv("RECORDER_MAX_PENDING", "20000"))
+ID_BLOCK_SIZE = int(os.getenv("RECORDER_ID_BLOCK", "1000"))
+# espera entre reintentos si un flush falla
+RETRY_BACKOFF = 0.5
+# intentos al apagar antes de dar los registros por perdidos
+SHUTDOWN_ATTEMPTS = 5
+
+FLUSHES = counter("vortext_recorder_flushes_total", "Group commits de TranslationRecord", ["result"])
+FLUSH_ROWS = histogram("vortext_recorder_flush_rows", "Registros por group commit",
+                       buckets=(1, 10, 50, 100, 250, 500, 1000, 5000))
+FLUSH_SECONDS = histogram("vortext_recorder_flush_seconds", "Duración de cada group commit")
+PENDING = gauge("vortext_recorder_pending", "Registros aceptados aún sin guardar")
+BACKPRESSURE = counter("vortext_recorder_backpressure_total", "Veces que record() esperó por buffer lleno")
+
+
+class RecorderStopped(RuntimeError):
+    """El recorder no está corriendo (no iniciado o apagándose): el registro no se aceptó."""
+
+
+class IdBlockAllocator:
+    """Ids de una secuencia por bloques: una consulta cada block_size ids."""
+
+    def __init__(self, name: str, model, block_size: int = ID_BLOCK_SIZE, session_factory=None):
+        self.name = name
+        self.model = model
+        self.block_size = block_size
+        self.session_factory = session_factory
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> int:
+        if self._next >= self._end:
+            async with self._lock:
+                if self._next >= self._end:
+                    async with (self.session_factory or db_session.AsyncSessionLocal)() as db:
+                        start = await crud.reserve_id_block_async(db, self.name, self.block_size, self.model)
+                    self._next, self._end = start, start + self.block_size
+        value = self._next
+        self._next += 1
+        return value
+
+
+class TranslationRecorder:
+    def __init__(self, session_factory=None, flush_interval: float = FLUSH_INTERVAL,
+                 flush_max_records: int = FLUSH_MAX_RECORDS, max_pending: int = MAX_PENDING,
+                 id_block_size: int = ID_BLOCK_SIZE):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.flush_max_records = flush_max_records
+        self.max_pending = max_pending
+        self.ids = IdBlockAllocator("translation_records", models.TranslationRecord, id_block_size, session_factory)
+        self._buffer = []
+        # registros tomados por el flush en curso (siguen contando como pendientes)
+        self._in_flight = 0
+        # aceptados y guardados desde el arranque; el buffer se guarda en orden (FIFO)
+        self._accepted = 0
+        self._persisted = 0
+        self._stopping = False
+        self._wakeup = None
+        self._flushed = None
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._buffer) + self._in_flight
+
+    def _sessions(self):
+        return (self.session_factory or db_session.AsyncSessionLocal)()
+
+    # --- ciclo de vida ---
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._flushed = asyncio.Condition()
+        self._task = asyncio.create_task(self._run(), name="translation-recorder")
+
+    async def stop(self):
+        """Deja terminar el flush en curso y guarda lo pendiente (apagado ordenado)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+        # seguir mientras los lotes entren; solo cuentan los intentos fallidos
+        failures = 0
+        while self._buffer and failures < SHUTDOWN_ATTEMPTS:
+            if not await self._flush_once():
+                failures += 1
+                await asyncio.sleep(RETRY_BACKOFF)
+        if self._buffer:
+            print(f"⚠️ Se perdieron {len(self._buffer)} registros de traducción sin guardar al apagar")
+        # despertar a quien esperaba buffer libre: va a recibir RecorderStopped
+        async with self._flushed:
+            self._flushed.notify_all()
+
+    # --- escritura ---
+    async def record(self, source_lang: str, target_lang: str, source_text: str, translated_text: str) -> dict:
+        """Acepta el registro y devuelve la fila (con id y created_at) sin esperar al commit."""
+        if self._task is None or self._stopping:
+            raise RecorderStopped("TranslationRecorder no iniciado o apagándose")
+        while self.pending >= self.max_pending:
+            BACKPRESSURE.inc()
+            await self._wait_flush()
+            if self._stopping:
+                raise RecorderStopped("TranslationRecorder apagándose")
+        row = {
+            "id": await self.ids.next_id(),
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "source_text": source_text,
+            "translated_text": translated_text,
+            "created_at": datetime.utcnow(),
+        }
+        if self._stopping:
+            # el apagado empezó mientras se reservaban ids: el flush final podría no verlo
+            raise RecorderStopped("TranslationRecorder apagándose")
+        self._buffer.append(row)
+        self._accepted += 1
+        if len(self._buffer) >= self.flush_max_records:
+            self._wakeup.set()
+        return row
+
+    async def flush(self):
+        """Espera a que todo lo aceptado hasta ahora esté en la base."""
+        target = self._accepted
+        while self._persisted < target:
+            await self._wait_flush()
+
+    async def _wait_flush(self):
+        self._wakeup.set()
+        async with self._flushed:
+            await self._flushed.wait()
+
+    async def _flush_once(self) -> bool:
+        batch, self._buffer = self._buffer[:self.flush_max_records], self._buffer[self.flush_max_records:]
+        if not batch:
+            return True
+        self._in_flight = len(batch)
+        started = time.perf_counter()
+        try:
+            async with self._sessions() as db:
+                await crud.insert_translation_records_async(db, batch)
+        except Exception as e:
+            # se reintenta el mismo lote (mismos ids), delante de lo llegado después
+            print(f"Error guardando {len(batch)} registros de traducción: {e}")
+            self._buffer[:0] = batch
+            FLUSHES.labels("error").inc()
+            return False
+        finally:
+            self._in_flight = 0
+        self._persisted += len(batch)
+        FLUSHES.labels("ok").inc()
+        FLUSH_ROWS.observe(len(batch))
+        FLUSH_SECONDS.observe(time.perf_counter() - started)
+        async with self._flushed:
+            self._flushed.notify_all()
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            # vaciar de a lotes de flush_max_records; si falla, esperar antes de reintentar
+            while self._buffer:
+                if not await self._flush_once():
+                    async with self._flushed:
+                        self._flushed.notify_all()
+                    await asyncio.sleep(RETRY_BACKOFF)
+                    break
+
+
+def create_translation_recorder() -> TranslationRecorder:
+    recorder = TranslationRecorder()
+    PENDING.set_function(lambda: {(): recorder.pending})
+    return recorder
@@ -0,0 +1,228 @@
+# File: app/services/translation_worker.py
+
+"""
+Worker en proceso que completa las traducciones creadas con
+POST /translations (status="pending").
+
+La base de datos es la cola: cada vuelta reserva un lote de pendientes en
+translation_claims (lease de TRANSLATION_WORKER_LEASE segundos), las agrupa
+por (idioma origen, idioma destino), traduce cada grupo con una sola llamada
+por lote y guarda todos los resultados en una transacción. Si el proceso muere
+a mitad de camino, la reserva vence y otro worker (de este u otro proceso)
+la retoma; tras TRANSLATION_WORKER_MAX_ATTEMPTS intentos queda "failed".
+
+Solo arranca con un traductor real: si TRANSLATOR_BACKEND=auto resuelve al
+de demostración (Azure sin configurar) el worker no arranca y las
+traducciones quedan "pending" en vez de guardarse invertidas como
+"completed". El de demostración hay que pedirlo con TRANSLATOR_BACKEND=stub.
+Tampoco arranca si la tabla translations tiene el esquema viejo.
+
+Si una vuelta falla (base caída, esquema roto) la siguiente espera el doble,
+hasta TRANSLATION_WORKER_MAX_BACKOFF segundos.
+
+notify() despierta al worker en cuanto se crea una traducción (sin esperar
+al siguiente sondeo) y wait_for_completion() permite el long-poll de
+GET /translations/{id}?wait=N.
+
+Configuración: TRANSLATION_WORKER_ENABLED, TRANSLATION_WORKER_CONCURRENCY,
+TRANSLATION_WORKER_BATCH, TRANSLATION_WORKER_LEASE,
+TRANSLATION_WORKER_POLL_INTERVAL, TRANSLATION_WORKER_MAX_ATTEMPTS,
+TRANSLATION_WORKER_MAX_BACKOFF.
+"""
+
+import asyncio
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from app import crud
+from app.core.metrics import counter, histogram
+from app.core.translator import BACKEND, Translator
+from app.db import session as db_session
+
+ENABLED = os.getenv("TRANSLATION_WORKER_ENABLED", "1") == "1"
+CONCURRENCY = int(os.getenv("TRANSLATION_WORKER_CONCURRENCY", "2"))
+BATCH_SIZE = int(os.getenv("TRANSLATION_WORKER_BATCH", "50"))
+LEASE_SECONDS = float(os.getenv("TRANSLATION_WORKER_LEASE", "60"))
+POLL_INTERVAL = float(os.getenv("TRANSLATION_WORKER_POLL_INTERVAL", "2.0"))
+MAX_ATTEMPTS = int(os.getenv("TRANSLATION_WORKER_MAX_ATTEMPTS", "3"))
+# tope de la espera entre vueltas fallidas (crece x2 desde POLL_INTERVAL)
+MAX_BACKOFF = float(os.getenv("TRANSLATION_WORKER_MAX_BACKOFF", "60"))
+# segundos antes de reintentar un grupo cuya traducción falló
+RETRY_BACKOFF = 5.0
+# cada cuánto el long-poll vuelve a mirar la base (por si la completó otro proceso)
+LONG_POLL_RECHECK = 1.0
+
+JOBS = counter("vortext_translation_jobs_total", "Traducciones procesadas por el worker", ["result"])
+BATCH_ROWS = histogram("vortext_translation_batch_rows", "Filas por lote reservado", [],
+                       buckets=(1, 5, 10, 25, 50, 100, 250, 500))
+JOB_LAG = histogram("vortext_translation_job_lag_seconds", "Desde la creación hasta el resultado guardado",
+                    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+
+class TranslationWorker:
+    def __init__(self, translate_batch, session_factory=None, batch_size: int = BATCH_SIZE,
+                 concurrency: int = CONCURRENCY, lease_seconds: float = LEASE_SECONDS,
+                 poll_interval: float = POLL_INTERVAL, max_attempts: int = MAX_ATTEMPTS, worker_id: str = None,
+                 max_backoff: float = MAX_BACKOFF, ready: bool = True):
+        """
+        translate_batch(texts, target_lang, source_lang) -> lista de traducciones en el mismo orden.
+        ready=False: no hay traductor real y start() no hace nada.
+        """
+        self.translate_batch = translate_batch
+        self.ready = ready
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = None
+        self._tasks = []
+        self._waiters = defaultdict(list)
+
+    def _sessions(self):
+        # se resuelve al usarla: AsyncSessionLocal puede no existir si falta el driver async
+        return (self.session_factory or db_session.AsyncSessionLocal)()
+
+    # --- ciclo de vida ---
+    async def start(self):
+        if self._tasks:
+            return
+        if not self.ready:
+            print("⚠️ Worker de traducciones sin traductor real (Azure no configurado): no arranca, "
+                  "las traducciones quedan pendientes")
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(), name=f"translation-worker-{i}")
+                       for i in range(self.concurrency)]
+        print(f"Worker de traducciones iniciado ({self.concurrency} tareas, lotes de {self.batch_size})")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Hay trabajo nuevo: despertar a los workers sin esperar el sondeo."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        failures = 0
+        while True:
+            try:
+                processed = await self.process_batch()
+                failures = 0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failures += 1
+                delay = min(self.poll_interval * 2 ** failures, self.max_backoff)
+                print(f"Error en el worker de traducciones ({failures} seguidos, reintento en {delay:.1f}s): {e}")
+                await asyncio.sleep(delay)
+                continue
+            if processed < self.batch_size:
+                # cola vacía (o casi): dormir hasta notify() o el próximo sondeo
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    # --- un lote ---
+    async def process_batch(self) -> int:
+        async with self._sessions() as db:
+            rows = await crud.claim_pending_translations_async(
+                db, self.worker_id, self.batch_size, self.lease_seconds, self.max_attempts)
+        if not rows:
+            return 0
+        BATCH_ROWS.observe(len(rows))
+
+        groups = defaultdict(list)
+        for row in rows:
+            groups[(row.source_lang, row.target_lang)].append(row)
+
+        results, failed = {}, []
+        try:
+            outcomes = await asyncio.gather(
+                *(self.translate_batch([r.source_text for r in group], target, source)
+                  for (source, target), group in groups.items()),
+                return_exceptions=True,
+            )
+            for ((source, target), group), outcome in zip(groups.items(), outcomes):
+                if isinstance(outcome, BaseException) or len(outcome) != len(group):
+                    print(f"Error traduciendo {len(group)} textos {source}->{target}: {outcome!r}")
+                    failed.extend(r.id for r in group)
+                    continue
+                results.update((r.id, text) for r, text in zip(group, outcome))
+
+            async with self._sessions() as db:
+                await crud.set_translation_results_async(db, results)
+                if failed:
+                    await crud.release_translation_claims_async(db, failed, retry_after=RETRY_BACKOFF)
+        except asyncio.CancelledError:
+            # apagado a mitad de lote: devolver lo no guardado para que otro lo tome ya
+            async with self._sessions() as db:
+                await asyncio.shield(crud.release_translation_claims_async(db, [r.id for r in rows]))
+            raise
+
+        JOBS.labels("completed").inc(len(results))
+        if failed:
+            JOBS.labels("retry").inc(len(failed))
+        now = datetime.utcnow()
+        for row in rows:
+            if row.id in results:
+                JOB_LAG.observe((now - row.created_at).total_seconds())
+        self._resolve(results)
+        return len(rows)
+
+    # --- long-poll ---
+    def _resolve(self, translation_ids):
+        for translation_id in translation_ids:
+            for waiter in self._waiters.pop(translation_id, []):
+                if not waiter.done():
+                    waiter.set_result(True)
+
+    async def _wait_local(self, translation_id: int, timeout: float):
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[translation_id].append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            waiters = self._waiters.get(translation_id)
+            if waiters is not None:
+                if waiter in waiters:
+                    waiters.remove(waiter)
+                if not waiters:
+                    self._waiters.pop(translation_id, None)
+
+    async def wait_for_completion(self, translation_id: int, timeout: float):
+        """
+        Espera hasta `timeout` segundos a que la traducción deje de estar
+        pendiente y la devuelve (None si no existe). No retiene conexiones del
+        pool mientras espera: cada comprobación usa una sesión corta.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            async with self._sessions() as db:
+                translation = await crud.get_translation_async(db, translation_id)
+            remaining = deadline - time.monotonic()
+            if translation is None or translation.status != "pending" or remaining <= 0:
+                return translation
+            # despierta al instante si la completa este proceso; si no, vuelve a mirar la base
+            await self._wait_local(translation_id, min(remaining, LONG_POLL_RECHECK))
+
+
+def create_translation_worker() -> TranslationWorker:
+    """Con el backend de app.core.translator; el de demostración solo si se pidió explícitamente."""
+    translator = Translator(batch_window=0)
+    ready = translator.backend.name != "stub" or BACKEND == "stub"
+    return TranslationWorker(translator.translate_batch, ready=ready)
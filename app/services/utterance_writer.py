@@ -0,0 +1,166 @@
+# File: app/services/utterance_writer.py
+
+"""
+Historial de las salas en vivo: guarda cada frase reconocida (original y una
+fila por idioma) en room_utterances / room_utterance_translations.
+
+submit() se llama desde el reparto a oyentes en el event loop (nunca desde
+el hilo de callbacks del SDK) y solo encola: no espera a la base. Una tarea
+de fondo toma lo encolado y lo escribe en lotes, con INSERT en lote y un
+commit por lote, cada ROOM_HISTORY_FLUSH_INTERVAL_MS o al juntar
+ROOM_HISTORY_BATCH frases.
+
+La cola está acotada (ROOM_HISTORY_MAX_QUEUE). Si la base no da abasto, las
+frases nuevas se descartan y se cuentan, para no frenar el audio en vivo ni
+crecer sin límite. El transcript en memoria de la sala sigue completo. Las
+métricas de profundidad de cola, descartes y demora hasta el commit muestran
+cuándo pasa.
+
+Configuración: ROOM_HISTORY_ENABLED, ROOM_HISTORY_BATCH,
+ROOM_HISTORY_FLUSH_INTERVAL_MS, ROOM_HISTORY_MAX_QUEUE.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from app import crud, models
+from app.core.metrics import counter, gauge, histogram
+from app.db import session as db_session
+from app.services.translation_recorder import IdBlockAllocator
+
+ENABLED = os.getenv("ROOM_HISTORY_ENABLED", "1") == "1"
+BATCH_SIZE = int(os.getenv("ROOM_HISTORY_BATCH", "200"))
+FLUSH_INTERVAL = float(os.getenv("ROOM_HISTORY_FLUSH_INTERVAL_MS", "250")) / 1000
+MAX_QUEUE = int(os.getenv("ROOM_HISTORY_MAX_QUEUE", "10000"))
+RETRY_BACKOFF = 1.0
+SHUTDOWN_ATTEMPTS = 5
+
+WRITTEN = counter("vortext_room_history_utterances_total", "Frases de salas guardadas o descartadas", ["result"])
+QUEUE_DEPTH = gauge("vortext_room_history_queue_depth", "Frases esperando a guardarse")
+BATCH_ROWS = histogram("vortext_room_history_batch_utterances", "Frases por lote escrito",
+                       buckets=(1, 5, 10, 25, 50, 100, 200, 500))
+COMMIT_LAG = histogram("vortext_room_history_lag_seconds", "Desde que se encola la frase hasta su commit")
+
+
+class UtteranceWriter:
+    def __init__(self, session_factory=None, batch_size: int = BATCH_SIZE, flush_interval: float = FLUSH_INTERVAL,
+                 max_queue: int = MAX_QUEUE):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.ids = IdBlockAllocator("room_utterances", models.RoomUtterance, session_factory=session_factory)
+        self._queue = None
+        # lote tomado de la cola que falló al escribirse; se reintenta antes que lo nuevo
+        self._retry = []
+        self._task = None
+        self._stopping = False
+
+    @property
+    def depth(self) -> int:
+        return (self._queue.qsize() if self._queue is not None else 0) + len(self._retry)
+
+    def _sessions(self):
+        return (self.session_factory or db_session.AsyncSessionLocal)()
+
+    # --- ciclo de vida ---
+    async def start(self):
+        if self._task is not None:
+            return
+        self._stopping = False
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run(), name="room-history-writer")
+
+    async def stop(self):
+        """Escribe lo que quede en la cola y termina (apagado ordenado)."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+        failures = 0
+        while failures < SHUTDOWN_ATTEMPTS:
+            batch = self._retry or self._take_ready()
+            if not batch:
+                break
+            if await self._write(batch):
+                self._retry = []
+            else:
+                self._retry = batch
+                failures += 1
+                await asyncio.sleep(RETRY_BACKOFF)
+        if self.depth:
+            WRITTEN.labels("dropped").inc(self.depth)
+            print(f"⚠️ Se perdieron {self.depth} frases de salas sin guardar al apagar")
+
+    # --- entrada (event loop) ---
+    def submit(self, room_id: str, source_lang: str, original_text: str, translations: dict) -> bool:
+        """Encola la frase sin esperar. False si se descartó (cola llena o writer parado)."""
+        if self._queue is None or self._stopping:
+            return False
+        try:
+            self._queue.put_nowait((time.monotonic(), datetime.utcnow(), room_id, source_lang, original_text,
+                                    translations))
+            return True
+        except asyncio.QueueFull:
+            WRITTEN.labels("dropped").inc()
+            return False
+
+    # --- escritura ---
+    def _take_ready(self) -> list:
+        batch = []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _write(self, batch: list) -> bool:
+        utterances, translations = [], []
+        try:
+            for _, created_at, room_id, source_lang, original_text, langs in batch:
+                utterance_id = await self.ids.next_id()
+                utterances.append({"id": utterance_id, "room_id": room_id, "source_lang": source_lang,
+                                   "original_text": original_text, "created_at": created_at})
+                translations.extend({"utterance_id": utterance_id, "lang": lang, "translated_text": text}
+                                    for lang, text in langs.items() if text)
+            async with self._sessions() as db:
+                await crud.insert_room_utterances_async(db, utterances, translations)
+        except Exception as e:
+            print(f"Error guardando {len(batch)} frases de salas: {e}")
+            return False
+        now = time.monotonic()
+        WRITTEN.labels("written").inc(len(batch))
+        BATCH_ROWS.observe(len(batch))
+        for queued_at, *_ in batch:
+            COMMIT_LAG.observe(now - queued_at)
+        return True
+
+    async def _run(self):
+        while not self._stopping:
+            batch, self._retry = self._retry, []
+            if not batch:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=self.flush_interval))
+                except asyncio.TimeoutError:
+                    continue
+                # juntar lo que llegue durante el intervalo (o hasta llenar el lote)
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size and not self._stopping:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                    except asyncio.TimeoutError:
+                        break
+            if not await self._write(batch):
+                # se reintenta el mismo lote; mientras tanto la cola sigue acotada
+                self._retry = batch
+                await asyncio.sleep(RETRY_BACKOFF)
+
+
+def create_utterance_writer() -> UtteranceWriter:
+    writer = UtteranceWriter()
+    QUEUE_DEPTH.set_function(lambda: {(): writer.depth})
+    return writer
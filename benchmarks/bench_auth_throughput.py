@@ -0,0 +1,150 @@
+"""
+Benchmark de rutas autenticadas con y sin cache de usuarios (get_current_user).
+
+  nocache  PRINCIPAL_CACHE_TTL=0: cada petición busca el usuario en la base
+  cache    usuario resuelto desde app.core.principal_cache
+
+--users usuarios reales (registro + login) reparten --requests peticiones
+entre --clients clientes, alternando GET /api/translations?limit=20 y
+GET /api/translations/{id} (el polling típico). Informa peticiones/s,
+latencias, consultas SQL por petición y la tasa de aciertos del cache, y al
+final comprueba que desactivar una cuenta corta su token al instante.
+
+Uso:
+    python benchmarks/bench_auth_throughput.py --requests 5000 --clients 32
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2) if values else 0.0
+
+
+def query_count() -> int:
+    from app.core.metrics import DB_QUERY_SECONDS
+    return sum(child.count for child in list(DB_QUERY_SECONDS._children.values()))
+
+
+async def run_mode(mode: str, args) -> dict:
+    import httpx
+    from fastapi import FastAPI
+
+    from app import models  # noqa: F401  registra las tablas
+    from app.api.router import router
+    from app.core.config import settings
+    from app.core.principal_cache import LOOKUPS
+    from app.db.session import Base, engine
+
+    settings.SECRET_KEY = "bench"
+    settings.ALGORITHM = "HS256"
+    settings.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+    Base.metadata.create_all(engine)
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        tokens = []
+        for i in range(args.users):
+            creds = {"email": f"user{i}@example.com", "password": "secreto"}
+            assert (await client.post("/api/auth/register", json=creds)).status_code == 200
+            tokens.append((await client.post("/api/auth/login", json=creds)).json()["access_token"])
+        headers = [{"Authorization": f"Bearer {token}"} for token in tokens]
+        created = await client.post("/api/translations", headers=headers[0],
+                                    json={"source_text": "hola", "target_lang": "en"})
+        translation_id = created.json()["id"]
+
+        latencies, errors = [], 0
+        queue = iter(range(args.requests))
+
+        async def client_loop():
+            nonlocal errors
+            for i in queue:
+                url = "/api/translations?limit=20" if i % 2 else f"/api/translations/{translation_id}"
+                started = time.perf_counter()
+                resp = await client.get(url, headers=headers[i % len(headers)])
+                latencies.append(time.perf_counter() - started)
+                errors += resp.status_code != 200
+
+        queries_before = query_count()
+        lookups_before = {r: LOOKUPS.labels(r).value for r in ("hit", "miss", "expired")}
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+        queries = query_count() - queries_before
+        lookups = {r: LOOKUPS.labels(r).value - lookups_before[r] for r in lookups_before}
+
+        # desactivar la cuenta invalida el cache: el mismo token deja de valer enseguida
+        await client.post("/api/auth/deactivate", headers=headers[0])
+        after = await client.get(f"/api/translations/{translation_id}", headers=headers[0])
+
+    total_lookups = sum(lookups.values())
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "queries_per_request": round(queries / args.requests, 2),
+        "hit_rate": round(lookups["hit"] / total_lookups, 4) if total_lookups else 0.0,
+        "errors": errors,
+        "deactivated_status": after.status_code,
+    }
+
+
+def run_child(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", TRANSLATION_WORKER_ENABLED="0",
+                   BCRYPT_ROUNDS="4", PASSWORD_HASH_WORKERS="0")
+        if mode == "nocache":
+            env["PRINCIPAL_CACHE_TTL"] = "0"
+        cmd = [sys.executable, __file__, "--child", mode, "--requests", str(args.requests),
+               "--clients", str(args.clients), "--users", str(args.users)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr, file=sys.stderr)
+        return {"mode": mode, "error": out.stderr.strip().splitlines()[-1] if out.stderr else "falló"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args.child, args))))
+        return
+
+    results = [run_child(mode, args) for mode in ("nocache", "cache")]
+    print(f"{'modo':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'SQL/req':>8} {'aciertos':>9} {'errores':>8} "
+          f"{'tras desactivar':>16}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<8} ERROR: {r['error']}")
+            continue
+        print(f"{r['mode']:<8} {r['requests_per_second']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['queries_per_request']:>8} {r['hit_rate']:>9} {r['errors']:>8} {r['deactivated_status']:>16}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark de alta de traducciones: N POST /api/translations frente a
+POST /api/translations/bulk.
+
+  single      una petición por traducción (un commit y un fsync por fila),
+              con --concurrency clientes a la vez
+  bulk_<k>    peticiones bulk de k items (un INSERT en lote y un commit por petición)
+
+Cada modo corre en un proceso propio sobre un SQLite nuevo (con las pragmas
+de app.db.session) o contra DATABASE_URL si se pasa --database-url. Comprueba
+además que los ids de cada respuesta bulk sigan el orden de los items.
+
+Uso:
+    python benchmarks/bench_bulk_insert.py --items 20000 --bulk-sizes 100,1000,5000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def item(i: int) -> dict:
+    return {"source_text": f"frase número {i} para traducir", "target_lang": "en" if i % 2 else "fr",
+            "source_lang": "es"}
+
+
+def build_app():
+    from types import SimpleNamespace
+
+    from fastapi import FastAPI
+
+    from app.api.deps import get_current_user
+    from app.api.router import router
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, email="bench@example.com")
+    # sin lifespan: el worker de traducciones no arranca y no compite por la base
+    return app
+
+
+async def run_mode(mode: str, items: int, concurrency: int) -> dict:
+    import httpx
+
+    from app import models  # noqa: F401  registra las tablas
+    from app.db.session import Base, engine
+
+    Base.metadata.create_all(engine)
+    transport = httpx.ASGITransport(app=build_app(), raise_app_exceptions=False)
+    errors = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        if mode == "single":
+            queue = iter(range(items))
+
+            async def client_loop():
+                nonlocal errors
+                for i in queue:
+                    resp = await client.post("/api/translations", json=item(i))
+                    errors += resp.status_code != 200
+
+            await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        else:
+            size = int(mode.split("_", 1)[1])
+            for start in range(0, items, size):
+                batch = [item(i) for i in range(start, min(items, start + size))]
+                resp = await client.post("/api/translations/bulk", json={"items": batch})
+                if resp.status_code != 200:
+                    errors += len(batch)
+                    continue
+                ids = resp.json()["ids"]
+                assert len(ids) == len(batch) and ids == sorted(ids), "ids fuera de orden"
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+
+    return {
+        "mode": mode,
+        "items": items,
+        "seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 1),
+        "cpu_us_per_item": round(cpu / items * 1e6, 1),
+        "errors": errors,
+    }
+
+
+def run_child(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=args.database_url or f"sqlite:///{tmp}/bench.db")
+        out = subprocess.run([sys.executable, __file__, "--child", mode, "--items", str(args.items),
+                              "--concurrency", str(args.concurrency)], env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr, file=sys.stderr)
+        return {"mode": mode, "error": out.stderr.strip().splitlines()[-1] if out.stderr else "falló"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=16, help="clientes a la vez en el modo single")
+    parser.add_argument("--bulk-sizes", default="100,1000,5000")
+    parser.add_argument("--database-url", help="base a usar en vez de un SQLite temporal (se llena con las filas)")
+    parser.add_argument("--output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args.child, args.items, args.concurrency))))
+        return
+
+    modes = ["single"] + [f"bulk_{size}" for size in args.bulk_sizes.split(",") if size]
+    results = [run_child(mode, args) for mode in modes]
+    print(f"{'modo':<11} {'items/s':>10} {'s':>8} {'CPU µs/item':>12} {'errores':>8}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<11} ERROR: {r['error']}")
+            continue
+        print(f"{r['mode']:<11} {r['items_per_second']:>10} {r['seconds']:>8} {r['cpu_us_per_item']:>12} {r['errors']:>8}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
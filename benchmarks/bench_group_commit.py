@@ -0,0 +1,153 @@
+"""
+Benchmark de GET /translate: commit por petición frente al recorder con
+group commit (app.services.translation_recorder).
+
+  per_request  la ruta anterior: db.add + db.commit + db.refresh en cada llamada
+  group        la ruta actual: id de un bloque preasignado y flush en lote
+
+--clients clientes hacen --requests peticiones en total sobre un SQLite en
+archivo (WAL, synchronous según SQLITE_SYNCHRONOUS). Al terminar se hace el
+apagado ordenado de la app y se comprueba en la base que estén todos los
+registros con los ids que devolvió la API.
+
+Uso:
+    python benchmarks/bench_group_commit.py --requests 20000 --clients 64
+    SQLITE_SYNCHRONOUS=FULL python benchmarks/bench_group_commit.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2) if values else 0.0
+
+
+def build_app(mode: str):
+    from fastapi import Depends, FastAPI
+    from sqlalchemy.orm import Session
+
+    from app.db.session import get_db
+    from app.models import TranslationRecord
+
+    app = FastAPI()
+    if mode == "group":
+        from app.api.routes.translate import router
+        app.include_router(router)
+        return app
+
+    @app.get("/translate")
+    def translate_text(q: str, db: Session = Depends(get_db)):
+        # la ruta anterior, tal cual
+        translated = q[::-1]
+        record = TranslationRecord(source_lang="auto", target_lang="es", source_text=q, translated_text=translated)
+        db.add(record)
+        db.commit()
+        db.refresh(record)
+        return {"id": record.id, "original": q, "translated": translated, "created_at": record.created_at}
+
+    return app
+
+
+async def run_mode(mode: str, args, db_path: str) -> dict:
+    import httpx
+
+    from app import models  # noqa: F401  registra las tablas
+    from app.db.session import Base, engine
+
+    Base.metadata.create_all(engine)
+    app = build_app(mode)
+    await app.router.startup()
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    latencies, ids, errors = [], [], 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        queue = iter(range(args.requests))
+
+        async def client_loop():
+            nonlocal errors
+            for i in queue:
+                started = time.perf_counter()
+                resp = await client.get("/translate", params={"q": f"texto {i}"})
+                latencies.append(time.perf_counter() - started)
+                if resp.status_code != 200:
+                    errors += 1
+                    continue
+                ids.append(resp.json()["id"])
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+
+    shutdown_started = time.perf_counter()
+    await app.router.shutdown()
+    shutdown_seconds = time.perf_counter() - shutdown_started
+
+    with sqlite3.connect(db_path) as conn:
+        stored = {row[0] for row in conn.execute("SELECT id FROM translation_records")}
+    return {
+        "mode": mode,
+        "requests": args.requests,
+        "requests_per_second": round(args.requests / elapsed, 1),
+        "p50_ms": percentile(latencies, 0.5),
+        "p99_ms": percentile(latencies, 0.99),
+        "shutdown_ms": round(shutdown_seconds * 1000, 1),
+        "errors": errors,
+        "unique_ids": len(set(ids)) == len(ids),
+        "missing_after_shutdown": len(set(ids) - stored),
+    }
+
+
+def run_child(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}")
+        cmd = [sys.executable, __file__, "--child", mode, "--db", db_path, "--requests", str(args.requests),
+               "--clients", str(args.clients)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr, file=sys.stderr)
+        return {"mode": mode, "error": out.stderr.strip().splitlines()[-1] if out.stderr else "falló"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args.child, args, args.db))))
+        return
+
+    results = [run_child(mode, args) for mode in ("per_request", "group")]
+    print(f"{'modo':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'apagado ms':>11} {'errores':>8} "
+          f"{'ids únicos':>11} {'faltan':>7}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<12} ERROR: {r['error']}")
+            continue
+        print(f"{r['mode']:<12} {r['requests_per_second']:>8} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{r['shutdown_ms']:>11} {r['errors']:>8} {str(r['unique_ids']):>11} {r['missing_after_shutdown']:>7}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
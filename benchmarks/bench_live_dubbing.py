@@ -0,0 +1,143 @@
+"""
+Benchmark del doblaje en vivo de las salas (app.services.live_dubbing):
+síntesis por oyente (cada oyente con su propia cola de TTS, lo que haría un
+TTS por conexión) frente a una síntesis por idioma repartida a todos los
+oyentes de ese idioma.
+
+Usa SPEECH_ENGINE=fake: el sintetizador falso produce el audio a
+FAKE_TTS_REALTIME_FACTOR veces su duración en trozos de 100 ms, con
+sintetizadores del pool ya conectados. Los oyentes son sockets falsos que
+solo cuentan bytes. El orador dice --utterances frases a --rate frases/s;
+con muchas colas el pool se satura y se ven los descartes por frase vieja.
+
+Uso:
+    python benchmarks/bench_live_dubbing.py --langs 3 --listeners 20
+    FAKE_TTS_REALTIME_FACTOR=0.3 python benchmarks/bench_live_dubbing.py --rate 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SPEECH_ENGINE"] = "fake"
+
+from app.core.audio_frames import unpack_audio_frame  # noqa: E402
+from app.services import live_dubbing  # noqa: E402
+from app.services.synthesizer_pool import SynthesizerPool  # noqa: E402
+from benchmarks.harness import percentile  # noqa: E402
+
+VOICE_MAP = {
+    "en-US": "en-US-JennyNeural",
+    "es-ES": "es-ES-AlvaroNeural",
+    "fr-FR": "fr-FR-DeniseNeural",
+    "de-DE": "de-DE-KatjaNeural",
+    "it-IT": "it-IT-ElsaNeural",
+}
+LANGS = ["es", "fr", "de", "it", "en"]
+TEXT = "Gracias por venir, en unos minutos empezamos con la primera charla de la tarde."
+
+
+class CountingPool:
+    """El pool real, contando las síntesis hechas (no las que se quedan sin sintetizador)."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.calls = 0
+
+    def synthesize(self, *args, **kwargs):
+        result = self.pool.synthesize(*args, **kwargs)
+        self.calls += 1
+        return result
+
+
+class FakeListener:
+    def __init__(self, queued_at: dict):
+        self.queued_at = queued_at
+        self.first_audio = {}
+        self.bytes = 0
+
+    async def send_bytes(self, frame: bytes):
+        utterance_id, _, last, payload = unpack_audio_frame(frame)
+        self.bytes += len(frame)
+        if payload and utterance_id not in self.first_audio:
+            self.first_audio[utterance_id] = time.perf_counter() - self.queued_at[utterance_id]
+
+
+async def run_case(mode: str, args, pool) -> dict:
+    langs = LANGS[:args.langs]
+    queued_at = {}
+    sockets = {lang: [FakeListener(queued_at) for _ in range(args.listeners)] for lang in langs}
+    if mode == "shared":
+        channels = {lang: sockets[lang] for lang in langs}
+    else:
+        # una cola por oyente: mismo código, cada socket como si fuera su propio idioma
+        channels = {f"{lang}#{i}": [socket] for lang in langs for i, socket in enumerate(sockets[lang])}
+
+    pool = CountingPool(pool)
+    dubbing = live_dubbing.LiveDubbing(
+        pool, VOICE_MAP, lambda room_id, channel, format_name: channels.get(channel, ()), max_age=args.max_age)
+    started = time.perf_counter()
+    for utterance_id in range(1, args.utterances + 1):
+        queued_at[utterance_id] = time.perf_counter()
+        for channel in channels:
+            # el mismo texto en todos los idiomas: solo importa el costo
+            dubbing.submit("bench", channel, utterance_id, TEXT)
+        await asyncio.sleep(1 / args.rate)
+    while dubbing.active_channels:
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    await dubbing.close()
+
+    listeners = [socket for group in sockets.values() for socket in group]
+    latencies = [value for socket in listeners for value in socket.first_audio.values()]
+    delivered = sum(len(socket.first_audio) for socket in listeners)
+    return {
+        "mode": mode,
+        "syntheses": pool.calls,
+        # descartadas por cola llena, por vieja o por pool ocupado
+        "dropped": len(channels) * args.utterances - pool.calls,
+        "delivered_pct": round(100 * delivered / (len(listeners) * args.utterances), 1),
+        "first_audio_p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "first_audio_p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "seconds": round(elapsed, 2),
+    }
+
+
+async def run(args) -> list:
+    pool = SynthesizerPool("bench", "local", max_per_voice=args.pool_size)
+    await asyncio.to_thread(pool.warm, [live_dubbing.voice_for(lang, VOICE_MAP) for lang in LANGS[:args.langs]],
+                            None, args.pool_size)
+    try:
+        return [await run_case(mode, args, pool) for mode in ("per_listener", "shared")]
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--langs", type=int, default=3)
+    parser.add_argument("--listeners", type=int, default=20, help="oyentes de audio por idioma")
+    parser.add_argument("--utterances", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=1.0, help="frases por segundo del orador")
+    parser.add_argument("--pool-size", type=int, default=4, help="sintetizadores por voz")
+    parser.add_argument("--max-age", type=float, default=live_dubbing.MAX_AGE)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'modo':<13} {'síntesis':>9} {'descartes':>10} {'entregado %':>12} {'1er audio p50':>14} "
+          f"{'p99 ms':>9} {'s':>7}")
+    for r in results:
+        print(f"{r['mode']:<13} {r['syntheses']:>9} {r['dropped']:>10} {r['delivered_pct']:>12} "
+              f"{r['first_audio_p50_ms']!s:>14} {r['first_audio_p99_ms']!s:>9} {r['seconds']:>7}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Benchmark de una "tormenta de logins" (muchos asistentes entrando a la vez
+al empezar un evento) y de su efecto sobre el resto de las rutas.
+
+  threadpool  login como antes: ruta síncrona con bcrypt en el threadpool
+  pool        POST /api/auth/login con bcrypt en el pool de procesos
+
+Mientras --clients clientes hacen --logins logins en total, una sonda pide
+GET /api/projects (ruta síncrona con base de datos) cada 20 ms y mide su
+latencia: es lo que sufren los usuarios que ya estaban dentro.
+
+Con --seed-rounds distinto de --rounds los usuarios se crean con otro coste
+y el modo pool comprueba que se regeneren los hashes al hacer login.
+
+Uso:
+    python benchmarks/bench_login_storm.py --logins 200 --clients 50 --rounds 12
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PASSWORD = "contraseña-de-prueba"
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 1)
+
+
+def build_app(mode: str):
+    from types import SimpleNamespace
+
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy.orm import Session
+
+    from app import crud, schemas
+    from app.api.deps import get_current_user
+    from app.api.router import router
+    from app.db.session import get_db
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1, email="bench@example.com")
+
+    @app.post("/legacy/login")
+    def legacy_login(form_data: schemas.UserCreate, db: Session = Depends(get_db)):
+        # la ruta de login anterior: bcrypt en un hilo del threadpool, compitiendo por el GIL
+        if not crud.authenticate_user(db, form_data.email, form_data.password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    return app
+
+
+def seed(users: int, rounds: int):
+    from passlib.context import CryptContext
+
+    from app import models
+    from app.db.session import Base, SessionLocal, engine
+
+    Base.metadata.create_all(engine)
+    # el mismo hash para todos: sembrar miles de usuarios con bcrypt tardaría minutos
+    hashed = CryptContext(schemes=["bcrypt"], bcrypt__rounds=rounds).hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all(models.User(email=f"user{i}@example.com", hashed_password=hashed) for i in range(users))
+        db.commit()
+
+
+async def run_mode(mode: str, args) -> dict:
+    import httpx
+
+    from app.core.config import settings
+    from app.security import REHASHED, shutdown_hash_pool, start_hash_pool
+
+    settings.SECRET_KEY = "bench"
+    settings.ALGORITHM = "HS256"
+    settings.ACCESS_TOKEN_EXPIRE_MINUTES = 30
+    seed(args.logins, args.seed_rounds)
+    app = build_app(mode)
+    if mode == "pool":
+        await start_hash_pool()
+    path = "/api/auth/login" if mode == "pool" else "/legacy/login"
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    login_times, probe_times, statuses = [], [], {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        queue = iter(range(args.logins))
+        storm_done = asyncio.Event()
+
+        async def login_client():
+            for i in queue:
+                started = time.perf_counter()
+                resp = await client.post(path, json={"email": f"user{i}@example.com", "password": PASSWORD})
+                login_times.append(time.perf_counter() - started)
+                statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        async def probe():
+            while not storm_done.is_set():
+                started = time.perf_counter()
+                await client.get("/api/projects")
+                probe_times.append(time.perf_counter() - started)
+                await asyncio.sleep(0.02)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_client() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - started
+        storm_done.set()
+        await probe_task
+
+    if mode == "pool":
+        shutdown_hash_pool()
+    return {
+        "mode": mode,
+        "logins": args.logins,
+        "seconds": round(elapsed, 2),
+        "logins_per_second": round(args.logins / elapsed, 1),
+        "login_p50_ms": percentile(login_times, 0.5),
+        "login_p99_ms": percentile(login_times, 0.99),
+        "probe_p50_ms": percentile(probe_times, 0.5),
+        "probe_p99_ms": percentile(probe_times, 0.99),
+        "probe_max_ms": percentile(probe_times, 1.0),
+        "probe_mean_ms": round(statistics.fmean(probe_times) * 1000, 1) if probe_times else 0.0,
+        "statuses": statuses,
+        "rehashed": REHASHED.labels().value,
+    }
+
+
+def run_child(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", BCRYPT_ROUNDS=str(args.rounds),
+                   TRANSLATION_WORKER_ENABLED="0")
+        if args.workers is not None:
+            env["PASSWORD_HASH_WORKERS"] = str(args.workers)
+        cmd = [sys.executable, __file__, "--child", mode, "--logins", str(args.logins), "--clients", str(args.clients),
+               "--rounds", str(args.rounds), "--seed-rounds", str(args.seed_rounds)]
+        out = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        print(out.stderr, file=sys.stderr)
+        return {"mode": mode, "error": out.stderr.strip().splitlines()[-1] if out.stderr else "falló"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="coste bcrypt (BCRYPT_ROUNDS)")
+    parser.add_argument("--seed-rounds", type=int, help="coste de los hashes sembrados (por defecto --rounds)")
+    parser.add_argument("--workers", type=int, help="PASSWORD_HASH_WORKERS para el modo pool")
+    parser.add_argument("--modes", default="threadpool,pool")
+    parser.add_argument("--output")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.seed_rounds is None:
+        args.seed_rounds = args.rounds
+
+    if args.child:
+        print(json.dumps(asyncio.run(run_mode(args.child, args))))
+        return
+
+    results = [run_child(mode, args) for mode in args.modes.split(",")]
+    print(f"{'modo':<11} {'logins/s':>9} {'login p50':>10} {'login p99':>10} {'sonda p50':>10} {'sonda p99':>10} "
+          f"{'sonda max':>10} {'rehash':>7}  estados")
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<11} ERROR: {r['error']}")
+            continue
+        print(f"{r['mode']:<11} {r['logins_per_second']:>9} {r['login_p50_ms']:>10} {r['login_p99_ms']:>10} "
+              f"{r['probe_p50_ms']:>10} {r['probe_p99_ms']:>10} {r['probe_max_ms']:>10} {r['rehashed']:>7}  "
+              f"{r['statuses']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+Sobrecoste de la instrumentación de /metrics en los caminos calientes.
+
+Mide, con y sin instrumentación:
+  - ingesta del orador, igual que el bucle de /ws/speaker: receive_bytes() de
+    Starlette + push_stream.write(), con
+      pcm:  el trozo tal cual (100 ms de PCM); el camino más barato posible
+      opus: un paquete Opus de 20 ms decodificado en el pool de decodificación
+    La instrumentación es la de main.py: por trozo solo la suma de bytes del
+    lote; por lote de INGEST_MARK_FRAMES trozos una marca de AudioClock
+    (latencia del recognizer y trazas) y cada INGEST_METRICS_FLUSH_FRAMES
+    trozos el volcado de los contadores de bytes/trozos.
+  - reparto de una frase (on_room_event) a L oyentes con send_json simulado
+
+El objetivo es < 1 % de sobrecoste. target_met sale de la diferencia medida
+con y sin instrumentación (overhead_pct): --segments pares de segmentos
+contiguos en el mismo loop y push stream, mediana de la razón on/off de cada
+par (corridas separadas varían más del 1 % entre sí). instrumentation_pct es
+el coste aislado (bucle por lotes menos el mismo bucle sin instrumentar), como
+referencia. Uso:
+    python benchmarks/bench_metrics_overhead.py --listeners 200 --chunks 20000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import azure.cognitiveservices.speech as speechsdk  # noqa: E402
+from starlette.websockets import WebSocket  # noqa: E402
+
+import main  # noqa: E402
+from app.core import metrics  # noqa: E402
+from app.core.audio_clock import AudioClock  # noqa: E402
+from app.services.audio_decoder import av, create_stream_decoder, get_decode_pool  # noqa: E402
+
+if av is not None:
+    from benchmarks.bench_opus_decode import encode as opus_messages  # noqa: E402
+
+
+class FakeListener:
+    """Oyente sin red: on_room_event ya entrega el payload serializado."""
+
+    async def send_text(self, payload):
+        payload.encode("utf-8")
+
+
+TARGET_PCT = 1.0
+
+
+async def ingest(segments: int, segment_chunks: int, codec: str = "pcm") -> tuple:
+    """
+    Segmentos de segment_chunks trozos alternando sin y con instrumentación
+    sobre el mismo push stream y el mismo loop: la deriva (memoria del SDK,
+    frecuencia de la CPU) afecta por igual a ambos. Devuelve (off, on) en
+    segundos por segmento.
+    """
+    push_stream = speechsdk.audio.PushAudioInputStream(
+        stream_format=speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1))
+    decoder = create_stream_decoder(codec)
+    if decoder is None:
+        messages = [{"type": "websocket.receive", "bytes": b"\x00" * 3200}]
+    else:
+        packets, _ = opus_messages(codec, 10, 24000)
+        messages = [{"type": "websocket.receive", "bytes": packet} for packet in packets]
+    next_message = itertools.cycle(messages).__next__
+
+    async def receive():
+        return next_message()
+
+    async def send(_):
+        pass
+
+    websocket = WebSocket({"type": "websocket", "path": "/ws/speaker/bench", "headers": []}, receive, send)
+    websocket.client_state = websocket.application_state = type(websocket.client_state).CONNECTED
+    clock = AudioClock()
+    label = metrics.room_label("bench")
+    bytes_metric = main.SPEAKER_AUDIO_BYTES.labels(label)
+    frames_metric = main.SPEAKER_AUDIO_FRAMES.labels(label)
+    pending_bytes = pending_frames = 0
+    loop = asyncio.get_running_loop()
+    clock.on_push(0)
+    off, on = [], []
+    for segment in range(2 * segments):
+        # orden alternado dentro de cada par: off/on, on/off, ...
+        instrumented = (segment % 2) != (segment // 2 % 2)
+        metrics.set_enabled(instrumented)
+        started = time.perf_counter()
+        if not instrumented:
+            for _ in range(segment_chunks):
+                audio_data = await websocket.receive_bytes()
+                if decoder is not None:
+                    audio_data = await loop.run_in_executor(get_decode_pool(), decoder.decode, audio_data)
+                if audio_data:
+                    push_stream.write(audio_data)
+        else:
+            # el bucle de /ws/speaker (main.py); segment_chunks es múltiplo del lote
+            for _ in range(segment_chunks // main.INGEST_MARK_FRAMES):
+                batch_bytes = decoded_bytes = 0
+                for _ in range(main.INGEST_MARK_FRAMES):
+                    audio_data = await websocket.receive_bytes()
+                    batch_bytes += len(audio_data)
+                    if decoder is not None:
+                        audio_data = await loop.run_in_executor(get_decode_pool(), decoder.decode, audio_data)
+                        decoded_bytes += len(audio_data)
+                    if audio_data:
+                        push_stream.write(audio_data)
+                clock.on_push(decoded_bytes if decoder is not None else batch_bytes)
+                pending_bytes += batch_bytes
+                pending_frames += main.INGEST_MARK_FRAMES
+                if pending_frames >= main.INGEST_METRICS_FLUSH_FRAMES:
+                    bytes_metric.inc(pending_bytes)
+                    frames_metric.inc(pending_frames)
+                    pending_bytes = pending_frames = 0
+        (on if instrumented else off).append(time.perf_counter() - started)
+    push_stream.close()
+    metrics.set_enabled(True)
+    return off, on
+
+
+async def fanout(segments: int, listeners: int, utterances: int) -> tuple:
+    """Como ingest: segmentos de `utterances` frases alternando métricas apagadas/encendidas."""
+    main.ensure_room("bench")
+    main.rooms["bench"]["listeners"] = {"es": [FakeListener() for _ in range(listeners)]}
+    event = {"type": "utterance", "original_text": "hello world " * 4,
+             "translations": {"es": "hola mundo " * 4, "fr": "bonjour le monde " * 4}}
+    off, on = [], []
+    for segment in range(2 * segments):
+        instrumented = (segment % 2) != (segment // 2 % 2)
+        metrics.set_enabled(instrumented)
+        started = time.perf_counter()
+        for _ in range(utterances):
+            await main.on_room_event("bench", event)
+        (on if instrumented else off).append(time.perf_counter() - started)
+        main.rooms["bench"]["transcript_original"].clear()
+        main.rooms["bench"]["translations"].clear()
+    metrics.set_enabled(True)
+    return off, on
+
+
+def ingest_instrumentation_us(batches: int = 20000) -> float:
+    """Coste aislado de lo que añade la instrumentación a cada trozo del orador (sin el bucle en sí)."""
+    clock = AudioClock()
+    label = metrics.room_label("bench")
+    bytes_metric = main.SPEAKER_AUDIO_BYTES.labels(label)
+    frames_metric = main.SPEAKER_AUDIO_FRAMES.labels(label)
+    audio_data = b"\x00" * 3200
+    pending_bytes = pending_frames = 0
+    chunks = batches * main.INGEST_MARK_FRAMES
+    started = time.perf_counter()
+    for _ in range(chunks):
+        pass
+    bare = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(batches):
+        batch_bytes = 0
+        for _ in range(main.INGEST_MARK_FRAMES):
+            batch_bytes += len(audio_data)
+        clock.on_push(batch_bytes)
+        pending_bytes += batch_bytes
+        pending_frames += main.INGEST_MARK_FRAMES
+        if pending_frames >= main.INGEST_METRICS_FLUSH_FRAMES:
+            bytes_metric.inc(pending_bytes)
+            frames_metric.inc(pending_frames)
+            pending_bytes = pending_frames = 0
+    return 1e6 * (time.perf_counter() - started - bare) / chunks
+
+
+def fanout_instrumentation_us(iterations: int = 100000) -> float:
+    """Coste aislado de lo que añade la instrumentación a cada on_room_event."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        main.FANOUT_SECONDS.labels(metrics.room_label("bench")).observe(time.perf_counter() - t)
+    return 1e6 * (time.perf_counter() - started) / iterations
+
+
+def overhead(off: list, on: list) -> float:
+    """Sobrecoste en %: mediana de on/off por par de segmentos contiguos."""
+    return round(100 * (statistics.median(b / a for a, b in zip(off, on)) - 1), 3)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=40, help="pares de segmentos sin/con instrumentación")
+    parser.add_argument("--chunks", type=int, default=2000, help="trozos por segmento de ingesta")
+    parser.add_argument("--listeners", type=int, default=200)
+    parser.add_argument("--utterances", type=int, default=20, help="frases por segmento de reparto")
+    parser.add_argument("--runs", type=int, default=7, help="repeticiones de los costes aislados")
+    args = parser.parse_args()
+    # el bucle instrumentado procesa lotes enteros
+    args.chunks -= args.chunks % main.INGEST_MARK_FRAMES
+
+    results = {"target_pct": TARGET_PCT}
+    ingest_added_us = min(ingest_instrumentation_us() for _ in range(args.runs))
+    for codec in ("pcm", "opus"):
+        if codec == "opus" and av is None:
+            continue
+        # medianas: robustas a las pausas sueltas (GC, planificador)
+        off_times, on_times = asyncio.run(ingest(args.segments, args.chunks, codec))
+        off, on = statistics.median(off_times), statistics.median(on_times)
+        added_pct = 100 * ingest_added_us / (1e6 * off / args.chunks)
+        results[f"ingest_{codec}"] = {
+            "us_per_chunk_off": round(1e6 * off / args.chunks, 3),
+            "us_per_chunk_on": round(1e6 * on / args.chunks, 3),
+            "overhead_pct": overhead(off_times, on_times),
+            "instrumentation_us": round(ingest_added_us, 3),
+            "instrumentation_pct": round(added_pct, 3),
+            "target_met": overhead(off_times, on_times) < TARGET_PCT,
+        }
+
+    fanout_off_times, fanout_on_times = asyncio.run(fanout(args.segments, args.listeners, args.utterances))
+    fanout_off, fanout_on = statistics.median(fanout_off_times), statistics.median(fanout_on_times)
+    fanout_added_us = fanout_instrumentation_us()
+    fanout_pct = 100 * fanout_added_us / (1e6 * fanout_off / args.utterances)
+    results["fanout"] = {
+        "ms_per_utterance_off": round(1e3 * fanout_off / args.utterances, 3),
+        "ms_per_utterance_on": round(1e3 * fanout_on / args.utterances, 3),
+        "overhead_pct": overhead(fanout_off_times, fanout_on_times),
+        "instrumentation_us": round(fanout_added_us, 3),
+        "instrumentation_pct": round(fanout_pct, 4),
+        "target_met": overhead(fanout_off_times, fanout_on_times) < TARGET_PCT,
+    }
+    results["target_met"] = all(results[path]["target_met"] for path in results if path.startswith(("ingest", "fanout")))
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,136 @@
+"""
+Benchmark de ingesta comprimida del orador.
+
+Genera audio sintético, lo codifica en Opus (paquetes crudos, Ogg o WebM),
+y simula S oradores enviando trozos en tiempo real a través del mismo pool de
+decodificación que usa /ws/speaker/{room_id}. Informa:
+  - CPU de decodificación por orador (% de un core)
+  - latencia añadida por trozo (recepción -> PCM listo para push_stream)
+  - ancho de banda de subida frente a PCM crudo
+
+Uso:
+    python benchmarks/bench_opus_decode.py --codec webm --speakers 50 --seconds 20
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import av  # noqa: E402
+
+from app.services.audio_decoder import create_stream_decoder, get_decode_pool  # noqa: E402
+
+
+def synth_audio(seconds: float, rate: int = 48000):
+    """Tono con glissando para que Opus tenga algo que codificar."""
+    import numpy as np
+    t = np.arange(int(seconds * rate)) / rate
+    freq = 220 + 200 * np.sin(2 * math.pi * 0.5 * t)
+    signal = 0.3 * np.sin(2 * math.pi * freq * t)
+    return (signal * 32767).astype("int16")
+
+
+def encode(codec: str, seconds: float, bitrate: int):
+    """Devuelve la lista de mensajes WebSocket que mandaría el cliente."""
+    samples = synth_audio(seconds)
+    rate = 48000
+    frame_size = 960  # 20 ms
+
+    if codec == "opus":
+        ctx = av.CodecContext.create("libopus", "w")
+        ctx.sample_rate = rate
+        ctx.layout = "mono"
+        ctx.format = "s16"
+        ctx.bit_rate = bitrate
+        packets = []
+        for i in range(0, len(samples) - frame_size + 1, frame_size):
+            frame = av.AudioFrame.from_ndarray(samples[i:i + frame_size].reshape(1, -1), format="s16", layout="mono")
+            frame.sample_rate = rate
+            packets.extend(bytes(p) for p in ctx.encode(frame))
+        packets.extend(bytes(p) for p in ctx.encode(None))
+        return packets, 0.02
+
+    buf = io.BytesIO()
+    container = av.open(buf, mode="w", format=codec)
+    stream = container.add_stream("libopus", rate=rate)
+    stream.layout = "mono"
+    stream.bit_rate = bitrate
+    for i in range(0, len(samples) - frame_size + 1, frame_size):
+        frame = av.AudioFrame.from_ndarray(samples[i:i + frame_size].reshape(1, -1), format="s16", layout="mono")
+        frame.sample_rate = rate
+        for packet in stream.encode(frame):
+            container.mux(packet)
+    for packet in stream.encode(None):
+        container.mux(packet)
+    container.close()
+    data = buf.getvalue()
+    # MediaRecorder.start(250): un trozo cada 250 ms, de tamaño irregular
+    n_chunks = max(1, int(seconds / 0.25))
+    step = math.ceil(len(data) / n_chunks)
+    return [data[i:i + step] for i in range(0, len(data), step)], 0.25
+
+
+async def run_speaker(codec, messages, interval, latencies):
+    loop = asyncio.get_running_loop()
+    decoder = create_stream_decoder(codec)
+    pool = get_decode_pool()
+    next_send = loop.time()
+    for message in messages:
+        next_send += interval
+        received = time.perf_counter()
+        await loop.run_in_executor(pool, decoder.decode, message)
+        latencies.append((time.perf_counter() - received) * 1000)
+        delay = next_send - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    return decoder
+
+
+async def main_async(args):
+    messages, interval = encode(args.codec, args.seconds, args.bitrate)
+    latencies = []
+    started = time.perf_counter()
+    decoders = await asyncio.gather(*(
+        run_speaker(args.codec, messages, interval, latencies) for _ in range(args.speakers)
+    ))
+    wall = time.perf_counter() - started
+
+    audio_seconds = statistics.mean(d.audio_seconds for d in decoders)
+    cpu_per_speaker = statistics.mean(d.cpu_seconds for d in decoders)
+    uplink_bytes = sum(len(m) for m in messages)
+    latencies.sort()
+    result = {
+        "codec": args.codec,
+        "speakers": args.speakers,
+        "workers": get_decode_pool()._max_workers,
+        "audio_seconds": round(audio_seconds, 2),
+        "wall_seconds": round(wall, 2),
+        "cpu_core_pct_per_speaker": round(100 * cpu_per_speaker / max(audio_seconds, 1e-9), 3),
+        "added_latency_ms_p50": round(latencies[len(latencies) // 2], 3),
+        "added_latency_ms_p95": round(latencies[int(len(latencies) * 0.95)], 3),
+        "added_latency_ms_max": round(latencies[-1], 3),
+        "uplink_kbps": round(uplink_bytes * 8 / 1000 / args.seconds, 1),
+        "pcm_kbps": 256.0,
+    }
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--codec", choices=["opus", "ogg", "webm"], default="webm")
+    parser.add_argument("--speakers", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--bitrate", type=int, default=24000)
+    parser.add_argument("--output", help="ruta donde escribir el resultado en JSON")
+    asyncio.run(main_async(parser.parse_args()))
@@ -0,0 +1,188 @@
+"""
+Benchmark de paginación de /translations: OFFSET frente a cursor (keyset).
+
+Carga N traducciones (10M por defecto) en un SQLite con el esquema e índices
+de app.models y mide, a distintas profundidades, cuánto tarda en salir una
+página de 50 filas:
+  offset_old   consulta anterior: LIMIT/OFFSET sin ORDER BY
+  offset       LIMIT/OFFSET ordenado por (created_at, id)
+  keyset       crud.list_translations con el cursor de la fila en esa profundidad
+
+en tres listados del usuario 1 (dueño de los proyectos 1-9): todo,
+status=pending y un project_id grande. Además imprime el plan de consulta
+de SQLite para comprobar que usa los índices.
+
+La base se reutiliza entre corridas si ya tiene las filas pedidas (generar
+10M filas tarda unos minutos y ocupa ~2 GB).
+
+Uso:
+    python benchmarks/bench_pagination.py --rows 10000000 --db /tmp/vortext_pages.db
+    python benchmarks/bench_pagination.py --rows 200000   # corrida rápida
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGE = 50
+STATUSES = ["completed"] * 90 + ["pending"] * 9 + ["failed"]
+LANGS = ["es", "en", "fr", "it", "de", "pt", "zh-Hans"]
+
+
+def row_count(path: str) -> int:
+    try:
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT count(*) FROM translations").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+def sqlite_datetime(value: datetime) -> str:
+    # mismo formato de texto que guarda SQLAlchemy, para que las comparaciones coincidan
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def populate(path: str, rows: int, projects: int, chunk: int = 100_000):
+    from app import models  # noqa: F401  registra las tablas
+    from app.db.session import Base, engine
+
+    if os.path.exists(path):
+        os.remove(path)
+    Base.metadata.create_all(engine)
+    indexes = [idx for table in Base.metadata.sorted_tables for idx in table.indexes]
+    # cargar sin índices y crearlos al final es mucho más rápido
+    for idx in indexes:
+        idx.drop(engine)
+
+    rng = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2024, 1, 1)
+    base_text = sqlite_datetime(base)
+    conn.executemany("INSERT INTO users (id, email, hashed_password, is_active, created_at) VALUES (?, ?, 'x', 1, ?)",
+                     [(u, f"user{u}@example.com", base_text) for u in range(1, projects // 10 + 2)])
+    conn.executemany("INSERT INTO projects (id, name, owner_id, created_at) VALUES (?, ?, ?, ?)",
+                     [(p, f"project {p}", p // 10 + 1, base_text) for p in range(1, projects + 1)])
+    started = time.time()
+    for start in range(0, rows, chunk):
+        batch = []
+        for i in range(start, min(rows, start + chunk)):
+            # ~1 fila cada 3 ms con empates de created_at para ejercitar el desempate por id
+            created = base + timedelta(milliseconds=(i // 2) * 6)
+            # proyectos con distribución sesgada: el 1 es grande
+            project = 1 if rng.random() < 0.05 else rng.randint(1, projects)
+            batch.append((f"texto {i}", "auto", rng.choice(LANGS), rng.choice(STATUSES), project, project // 10 + 1,
+                          sqlite_datetime(created)))
+        conn.executemany("INSERT INTO translations (source_text, source_lang, target_lang, status, project_id, owner_id, "
+                         "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+        conn.commit()
+        print(f"  {min(rows, start + chunk):,} filas ({time.time() - started:.0f}s)", file=sys.stderr)
+    conn.close()
+    for idx in indexes:
+        print(f"  creando {idx.name}", file=sys.stderr)
+        idx.create(engine)
+
+
+def timed(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return round(statistics.median(times) * 1000, 3)
+
+
+def explain(db, stmt) -> str:
+    from app.db.session import engine
+    compiled = stmt.compile(engine, compile_kwargs={"literal_binds": True})
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall()
+    return " | ".join(r[-1] for r in rows)
+
+
+def run(args) -> dict:
+    from sqlalchemy import select
+
+    from app import crud, models
+    from app.core.pagination import encode_cursor
+    from app.db.session import SessionLocal
+
+    T = models.Translation
+    owner = 1
+    db = SessionLocal()
+    scenarios = {"all": {}, "pending": {"status": "pending"}, "project": {"project_id": 1}}
+    results = {"rows": row_count(args.db), "page_size": PAGE, "scenarios": {}}
+
+    for name, filters in scenarios.items():
+        total = len(db.scalars(crud.translations_query(owner, limit=args.rows, **filters).with_only_columns(T.id)).all())
+        # mismas filas que el listado del usuario (todas sus traducciones tienen proyecto suyo)
+        base = select(T).where(T.owner_id == owner)
+        for column, value in filters.items():
+            base = base.where(getattr(T, column) == value)
+        ordered = base.order_by(T.created_at.desc(), T.id.desc())
+        scenario = {"rows": total, "plan_keyset": None, "depths": []}
+
+        for depth in args.depths:
+            if depth + PAGE > total:
+                continue
+            # cursor de la fila anterior a esa profundidad (fuera de la medición)
+            cursor = None
+            if depth:
+                anchor = db.execute(ordered.with_only_columns(T.created_at, T.id).offset(depth - 1).limit(1)).one()
+                cursor = encode_cursor(anchor.created_at, anchor.id)
+            if scenario["plan_keyset"] is None and cursor:
+                scenario["plan_keyset"] = explain(db, crud.translations_query(owner, cursor, PAGE, **filters))
+
+            keyset_ids = [t.id for t in crud.list_translations(db, owner, cursor, PAGE, **filters)[0]]
+            offset_ids = list(db.scalars(ordered.with_only_columns(T.id).offset(depth).limit(PAGE)))
+            assert keyset_ids == offset_ids, f"keyset y OFFSET no coinciden en {name}@{depth}"
+
+            entry = {
+                "depth": depth,
+                "offset_old_ms": timed(lambda: db.scalars(base.offset(depth).limit(PAGE)).all(), args.repeat),
+                "offset_ms": timed(lambda: db.scalars(ordered.offset(depth).limit(PAGE)).all(), args.repeat),
+                "keyset_ms": timed(lambda: crud.list_translations(db, owner, cursor, PAGE, **filters), args.repeat),
+            }
+            scenario["depths"].append(entry)
+            print(f"{name:<8} depth={depth:>10,}  offset_old={entry['offset_old_ms']:>9.3f} ms  "
+                  f"offset={entry['offset_ms']:>9.3f} ms  keyset={entry['keyset_ms']:>7.3f} ms")
+        print(f"{name:<8} plan keyset: {scenario['plan_keyset']}")
+        results["scenarios"][name] = scenario
+    db.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--projects", type=int, default=10_000)
+    parser.add_argument("--db", default=os.path.join("/tmp", "vortext_pages.db"))
+    parser.add_argument("--depths", default="0,1000,10000,100000,1000000,5000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+    args.depths = [int(d) for d in args.depths.split(",")]
+
+    # antes de importar app: la sesión se arma con esta base
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    if row_count(args.db) != args.rows:
+        print(f"Generando {args.rows:,} filas en {args.db}...", file=sys.stderr)
+        populate(args.db, args.rows, args.projects)
+
+    results = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark de /api/search sobre el índice FTS5 del historial de salas.
+
+Genera --utterances frases (150k por defecto) con original y --langs
+traducciones cada una (≈1M segmentos indexados con los valores por defecto)
+repartidas en --rooms salas, crea el índice con el mismo backfill que usa
+main.py al arrancar y mide crud.search_utterances_async (consulta, snippet y
+resaltado incluidos) para distintos tipos de búsqueda: palabra frecuente,
+palabra rara, varias palabras, frase exacta, prefijo, filtros por idioma y
+por sala, una página profunda (siguiendo cursores) y sin resultados.
+
+La base se reutiliza entre corridas si ya tiene las frases pedidas.
+
+Uso:
+    python benchmarks/bench_search.py --utterances 150000 --db /tmp/vortext_search.db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LANGS = ["es", "fr", "de", "it", "pt", "zh-Hans"]
+VOCABULARY = 20000
+TARGET_MS = 50
+
+
+def word(rank: int) -> str:
+    # palabras pronunciables y distintas para cada rango
+    syllables = ["ka", "lo", "mi", "ne", "su", "ta", "ri", "po", "de", "gu", "fa", "ve", "zo", "bi", "che", "ra"]
+    out = []
+    rank += 1
+    while rank:
+        rank, r = divmod(rank, len(syllables))
+        out.append(syllables[r])
+    return "".join(out)
+
+
+def sentence(rng: random.Random, weights) -> str:
+    ranks = rng.choices(range(VOCABULARY), cum_weights=weights, k=rng.randint(8, 20))
+    return " ".join(word(r) for r in ranks)
+
+
+def utterance_count(path: str) -> int:
+    try:
+        with sqlite3.connect(path) as conn:
+            return conn.execute("SELECT count(*) FROM room_utterances").fetchone()[0]
+    except sqlite3.Error:
+        return 0
+
+
+def populate(path: str, utterances: int, rooms: int, chunk: int = 20000):
+    from app import models  # noqa: F401  registra las tablas
+    from app.db import search_index
+    from app.db.session import Base, engine
+
+    if os.path.exists(path):
+        os.remove(path)
+    Base.metadata.create_all(engine)
+
+    rng = random.Random(7)
+    # Zipf: unas pocas palabras aparecen en casi todas las frases
+    weights, total = [], 0.0
+    for rank in range(VOCABULARY):
+        total += 1 / (rank + 1)
+        weights.append(total)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    base = datetime(2026, 1, 1)
+    started = time.time()
+    for start in range(0, utterances, chunk):
+        originals, translations = [], []
+        for i in range(start, min(utterances, start + chunk)):
+            created = (base + timedelta(seconds=i * 3)).strftime("%Y-%m-%d %H:%M:%S.%f")
+            originals.append((i + 1, f"room-{rng.randrange(rooms)}", "en-US", sentence(rng, weights), created))
+            translations.extend((i + 1, lang, sentence(rng, weights)) for lang in LANGS)
+        conn.executemany("INSERT INTO room_utterances (id, room_id, source_lang, original_text, created_at) "
+                         "VALUES (?, ?, ?, ?, ?)", originals)
+        conn.executemany("INSERT INTO room_utterance_translations (utterance_id, lang, translated_text) "
+                         "VALUES (?, ?, ?)", translations)
+        conn.commit()
+        print(f"  {min(utterances, start + chunk):,} frases ({time.time() - started:.0f}s)", file=sys.stderr)
+    conn.close()
+
+    print("  creando el índice FTS5 (backfill)", file=sys.stderr)
+    started = time.time()
+    with engine.begin() as sync_conn:
+        search_index.ensure_search_index(sync_conn)
+        sync_conn.exec_driver_sql(f"INSERT INTO {search_index.SEARCH_TABLE}({search_index.SEARCH_TABLE}) "
+                                  "VALUES ('optimize')")
+    print(f"  índice listo en {time.time() - started:.0f}s", file=sys.stderr)
+
+
+async def measure(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await fn()
+        times.append(time.perf_counter() - started)
+    times.sort()
+    return {
+        "p50_ms": round(statistics.median(times) * 1000, 2),
+        "p99_ms": round(times[min(len(times) - 1, int(0.99 * len(times)))] * 1000, 2),
+    }, result
+
+
+async def run(args) -> dict:
+    from app import crud
+    from app.db import search_index
+    from app.db.session import AsyncSessionLocal
+
+    with sqlite3.connect(args.db) as conn:
+        segments = conn.execute(f"SELECT count(*) FROM {search_index.SEARCH_TABLE}").fetchone()[0]
+    common, mid, rare = word(0), word(300), word(VOCABULARY - 50)
+    cases = {
+        "common_word": {"query": common},
+        "rare_word": {"query": rare},
+        "two_words": {"query": f"{common} {mid}"},
+        "phrase": {"query": f'"{word(0)} {word(1)}"'},
+        "prefix": {"query": word(40)[:3] + "*"},
+        "lang_filter": {"query": mid, "lang": "fr"},
+        "room_filter": {"query": common, "room_id": "room-7"},
+        "room_lang_filter": {"query": mid, "room_id": "room-7", "lang": "de"},
+        "no_results": {"query": "zzzzqqq"},
+    }
+    results = {"segments": segments, "target_ms": TARGET_MS, "cases": {}}
+    async with AsyncSessionLocal() as db:
+        for name, params in cases.items():
+            async def one():
+                rows, cursor = await crud.search_utterances_async(db, limit=args.limit, **params)
+                return [search_index.highlight(r.snippet) for r in rows], cursor
+
+            stats, (snippets, _) = await measure(one, args.repeat)
+            stats["hits"] = len(snippets)
+            results["cases"][name] = stats
+            print(f"{name:<18} p50={stats['p50_ms']:>7.2f} ms  p99={stats['p99_ms']:>7.2f} ms  "
+                  f"resultados={stats['hits']}" + (f"  ej: {snippets[0][:70]}" if snippets else ""))
+
+        # página profunda: seguir cursores y medir la última
+        cursor = None
+        for _ in range(args.deep_pages):
+            _, cursor = await crud.search_utterances_async(db, mid, cursor=cursor, limit=args.limit)
+        stats, _ = await measure(lambda: crud.search_utterances_async(db, mid, cursor=cursor, limit=args.limit),
+                                 args.repeat)
+        results["cases"]["deep_page"] = stats
+        print(f"{'deep_page':<18} p50={stats['p50_ms']:>7.2f} ms  p99={stats['p99_ms']:>7.2f} ms  "
+              f"(página {args.deep_pages + 1})")
+
+    slow = [name for name, stats in results["cases"].items() if stats["p99_ms"] > TARGET_MS]
+    results["within_target"] = not slow
+    print(f"{segments:,} segmentos; " + (f"sobre {TARGET_MS} ms: {', '.join(slow)}" if slow
+                                         else f"todas las búsquedas por debajo de {TARGET_MS} ms (p99)"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=150_000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--db", default=os.path.join("/tmp", "vortext_search.db"))
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--deep-pages", type=int, default=100)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    # antes de importar app: la sesión se arma con esta base
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    if utterance_count(args.db) != args.utterances:
+        print(f"Generando {args.utterances:,} frases en {args.db}...", file=sys.stderr)
+        populate(args.db, args.utterances, args.rooms)
+
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
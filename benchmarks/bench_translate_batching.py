@@ -0,0 +1,100 @@
+"""
+Benchmark del micro-batcher de app.core.translator.
+
+--clients clientes concurrentes (como sockets de chat que comparten el
+Translator) piden translate_text uno tras otro, repartidos entre --langs
+idiomas destino, contra el backend stub con --latency-ms por petición y sin
+caché (textos siempre distintos). Se compara la ventana de micro-batching en
+0 (una petición por texto, el comportamiento anterior) con varias ventanas.
+
+Informa textos por segundo, peticiones al backend, textos por petición y la
+latencia de cada translate_text. El techo sin batching es
+TRANSLATE_WORKERS / latencia.
+
+Uso:
+    python benchmarks/bench_translate_batching.py --clients 500 --seconds 5 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.harness import percentile  # noqa: E402
+
+
+class CountingStub:
+    """Stub con latencia que cuenta peticiones (para no depender del registro de métricas)."""
+
+    def __init__(self, latency: float):
+        from app.core.translator import StubTranslatorBackend
+        self.inner = StubTranslatorBackend(latency)
+        self.name = self.inner.name
+        self.requests = 0
+
+    def translate_batch(self, texts, target, source=None):
+        self.requests += 1
+        return self.inner.translate_batch(texts, target, source)
+
+
+async def run_mode(window_ms: float, args) -> dict:
+    from app.core.translator import Translator
+
+    backend = CountingStub(args.latency_ms / 1000)
+    translator = Translator(backend, batch_window=window_ms / 1000)
+    langs = ["es", "fr", "de", "it", "pt", "ja"][:args.langs]
+    latencies, done = [], 0
+    deadline = time.perf_counter() + args.seconds
+
+    async def client(n: int):
+        nonlocal done
+        i = 0
+        while time.perf_counter() < deadline:
+            text = f"cliente {n} mensaje {i}"
+            started = time.perf_counter()
+            translated = await translator.translate_text(text, langs[(n + i) % len(langs)])
+            latencies.append(time.perf_counter() - started)
+            assert translated == text[::-1]
+            done += 1
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(n) for n in range(args.clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "window_ms": window_ms,
+        "texts_per_second": round(done / elapsed, 1),
+        "backend_requests": backend.requests,
+        "texts_per_request": round(done / max(1, backend.requests), 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--langs", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--windows", default="0,2,5,10")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = [asyncio.run(run_mode(float(w), args)) for w in args.windows.split(",")]
+    print(f"{'ventana ms':>10} {'textos/s':>10} {'peticiones':>11} {'textos/pet':>11} {'p50 ms':>8} {'p99 ms':>8}")
+    for r in results:
+        print(f"{r['window_ms']:>10} {r['texts_per_second']:>10} {r['backend_requests']:>11} "
+              f"{r['texts_per_request']:>11} {r['p50_ms']:>8} {r['p99_ms']:>8}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"clients": args.clients, "langs": args.langs, "latency_ms": args.latency_ms,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark de los formatos de salida del TTS (app.core.audio_formats):
+ancho de banda por oyente del doblaje en vivo y CPU del servidor para
+repartirlo, por formato.
+
+Cada formato se mide con el mismo reparto que las salas (LiveDubbing): un
+idioma, --listeners oyentes de audio, --utterances frases. Los oyentes son
+sockets falsos que cuentan bytes. Los kbit/s se calculan sobre la duración
+del audio, tomada de la corrida en wav-16k (PCM: bytes / 32000).
+
+Con SPEECH_ENGINE=fake (por defecto aquí) los números son nominales: los
+tamaños salen del bitrate de la tabla de formatos, no de un códec, y la CPU
+incluye generar el silencio del sintetizador falso. La salida lo marca
+("nominal"). Los bytes reales por formato salen con SPEECH_ENGINE=azure,
+SPEECH_KEY y SPEECH_REGION: ahí la codificación la hace Azure y la CPU
+medida es la del reparto en este proceso (frames, envíos, y recibir el
+audio del SDK), no la de decodificar en el teléfono.
+
+Uso:
+    python benchmarks/bench_tts_formats.py --listeners 300
+    SPEECH_ENGINE=azure SPEECH_KEY=... SPEECH_REGION=... python benchmarks/bench_tts_formats.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SPEECH_ENGINE", "fake")
+
+from app.core.audio_formats import FORMATS  # noqa: E402
+from app.core.audio_frames import HEADER  # noqa: E402
+from app.services import live_dubbing  # noqa: E402
+from app.services.synthesizer_pool import SynthesizerPool  # noqa: E402
+
+VOICE_MAP = {"es-ES": "es-ES-AlvaroNeural"}
+TEXT = "Gracias por venir, en unos minutos empezamos con la primera charla de la tarde."
+
+
+class FakeListener:
+    def __init__(self):
+        self.payload_bytes = 0
+        self.frames = 0
+
+    async def send_bytes(self, frame: bytes):
+        self.payload_bytes += len(frame) - HEADER.size
+        self.frames += 1
+
+
+async def run_format(format_name: str, args, pool) -> dict:
+    sockets = [FakeListener() for _ in range(args.listeners)]
+    dubbing = live_dubbing.LiveDubbing(pool, VOICE_MAP, lambda room_id, lang, name: sockets,
+                                       max_queue=args.utterances, max_age=3600)
+    cpu_started, started = time.process_time(), time.perf_counter()
+    for utterance_id in range(1, args.utterances + 1):
+        dubbing.submit("bench", "es", utterance_id, TEXT, format_name)
+    while dubbing.active_channels:
+        await asyncio.sleep(0.005)
+    cpu, elapsed = time.process_time() - cpu_started, time.perf_counter() - started
+    await dubbing.close()
+    return {
+        "format": format_name,
+        "bytes_per_listener": sockets[0].payload_bytes,
+        "frames_per_listener": sockets[0].frames,
+        "cpu_ms": round(cpu * 1000, 1),
+        "seconds": round(elapsed, 2),
+    }
+
+
+async def run(args, nominal: bool) -> list:
+    names = args.formats.split(",") if args.formats else list(FORMATS)
+    if "wav-16k" not in names:
+        names.insert(0, "wav-16k")
+    pool = SynthesizerPool(os.getenv("SPEECH_KEY"), os.getenv("SPEECH_REGION"))
+    try:
+        for name in names:
+            # conexión abierta antes de medir: solo cuenta la síntesis
+            await asyncio.to_thread(pool.warm, [VOICE_MAP["es-ES"]], FORMATS[name].sdk_name)
+        results = [await run_format(name, args, pool) for name in names]
+    finally:
+        pool.close()
+
+    reference = next(r for r in results if r["format"] == "wav-16k")
+    audio_seconds = (reference["bytes_per_listener"] - 44 * args.utterances) / 32000
+    for r in results:
+        kbps = r["bytes_per_listener"] * 8 / audio_seconds / 1000
+        r["kbps_per_listener"] = round(kbps, 1)
+        r["hall_mbps"] = round(kbps * args.hall / 1000, 1)
+        # CPU del reparto por segundo de audio y oyente
+        r["cpu_us_per_listener_second"] = round(r["cpu_ms"] * 1000 / (audio_seconds * args.listeners), 2)
+        r["vs_wav_16k"] = round(r["bytes_per_listener"] / reference["bytes_per_listener"], 3)
+        r["nominal"] = nominal
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--listeners", type=int, default=100, help="oyentes de audio del idioma")
+    parser.add_argument("--utterances", type=int, default=10)
+    parser.add_argument("--hall", type=int, default=300, help="oyentes para estimar el total de la sala")
+    parser.add_argument("--formats", help="coma separados (por defecto todos)")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    engine = os.environ["SPEECH_ENGINE"]
+    nominal = engine == "fake"
+    if not nominal and not (os.getenv("SPEECH_KEY") and os.getenv("SPEECH_REGION")):
+        parser.error("SPEECH_ENGINE=azure necesita SPEECH_KEY y SPEECH_REGION")
+    results = asyncio.run(run(args, nominal))
+    if nominal:
+        print("⚠️ SPEECH_ENGINE=fake: kbit/s nominales de la tabla de formatos y CPU con el sintetizador falso; "
+              "para bytes reales usar SPEECH_ENGINE=azure")
+    print(f"{'formato':<9} {'kbit/s':>7} {'x wav':>6} {f'sala {args.hall} Mbit/s':>16} {'frames':>7} "
+          f"{'CPU ms':>7} {'CPU µs/oyente·s':>16}")
+    for r in results:
+        print(f"{r['format']:<9} {r['kbps_per_listener']:>7} {r['vs_wav_16k']:>6} {r['hall_mbps']:>16} "
+              f"{r['frames_per_listener']:>7} {r['cpu_ms']:>7} {r['cpu_us_per_listener_second']:>16}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"engine": engine, "nominal": nominal, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
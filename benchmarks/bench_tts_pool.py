@@ -0,0 +1,107 @@
+"""
+Benchmark del pool de sintetizadores (app.services.synthesizer_pool):
+latencia hasta el primer trozo de audio con un SpeechSynthesizer nuevo por
+llamada (lo anterior) frente a sintetizadores pre-conectados del pool.
+
+Con SPEECH_ENGINE=fake (por defecto aquí) el sintetizador falso tarda
+FAKE_TTS_CONNECT_MS en conectar la primera vez, como el SDK; con
+SPEECH_ENGINE=azure, SPEECH_KEY y SPEECH_REGION mide el servicio real.
+
+--concurrency hilos sintetizan --requests frases en total repartidas entre
+--voices voces.
+
+Uso:
+    python benchmarks/bench_tts_pool.py --requests 200 --concurrency 8
+    SPEECH_ENGINE=azure SPEECH_KEY=... SPEECH_REGION=... python benchmarks/bench_tts_pool.py
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SPEECH_ENGINE", "fake")
+
+from benchmarks.harness import percentile  # noqa: E402
+
+VOICES = ["es-ES-AlvaroNeural", "en-US-JennyNeural", "fr-FR-DeniseNeural", "de-DE-KatjaNeural"]
+TEXT = "Bienvenidos a la sesión de la tarde, empezamos en cinco minutos."
+
+
+def first_byte_fresh(voice: str) -> float:
+    from app.services.speech_engine import create_speech_synthesizer
+
+    started = time.perf_counter()
+    synthesizer = create_speech_synthesizer(os.getenv("SPEECH_KEY"), os.getenv("SPEECH_REGION"), voice)
+    first = []
+    synthesizer.synthesizing.connect(lambda evt: first.append(time.perf_counter()) if not first else None)
+    synthesizer.speak_text_async(TEXT).get()
+    return first[0] - started
+
+
+def first_byte_pooled(pool, voice: str) -> float:
+    started = time.perf_counter()
+    first = []
+    pool.synthesize(TEXT, voice, on_chunk=lambda chunk: first.append(time.perf_counter()) if not first else None)
+    return first[0] - started
+
+
+def run(mode: str, args) -> dict:
+    voices = VOICES[:args.voices]
+    pool = None
+    if mode == "pooled":
+        from app.services.synthesizer_pool import SynthesizerPool
+        pool = SynthesizerPool(os.getenv("SPEECH_KEY"), os.getenv("SPEECH_REGION"), max_per_voice=args.concurrency)
+        warm_started = time.perf_counter()
+        pool.warm(voices, count=args.concurrency)
+        warm_seconds = time.perf_counter() - warm_started
+
+    latencies, lock = [], threading.Lock()
+
+    def one(i: int):
+        voice = voices[i % len(voices)]
+        value = first_byte_pooled(pool, voice) if pool else first_byte_fresh(voice)
+        with lock:
+            latencies.append(value)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    if pool:
+        pool.close()
+    result = {
+        "mode": mode,
+        "first_byte_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "first_byte_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "syntheses_per_second": round(args.requests / elapsed, 1),
+    }
+    if pool:
+        result["warmup_ms"] = round(warm_seconds * 1000, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--voices", type=int, default=2)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = [run(mode, args) for mode in ("fresh", "pooled")]
+    print(f"{'modo':<8} {'1er byte p50 ms':>16} {'1er byte p99 ms':>16} {'síntesis/s':>11}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['first_byte_p50_ms']:>16} {r['first_byte_p99_ms']:>16} "
+              f"{r['syntheses_per_second']:>11}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"engine": os.environ["SPEECH_ENGINE"], "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark del TTS en streaming de SpeechSession (services/speech_service.py):
+tiempo desde la frase final reconocida hasta el primer audio enviado al
+cliente, esperando el WAV completo (mensaje "audio" en base64, lo anterior)
+frente a frames binarios por trozo (send_bytes_coro).
+
+Usa SPEECH_ENGINE=fake: el sintetizador falso produce el audio a
+FAKE_TTS_REALTIME_FACTOR veces su duración (0.1 por defecto) en trozos de
+100 ms, con sintetizadores ya conectados del pool. Los eventos del
+recognizer se inyectan como los dispararía el SDK; no hace falta Azure.
+
+Uso:
+    python benchmarks/bench_tts_streaming.py --utterances 20
+    FAKE_TTS_REALTIME_FACTOR=0.3 python benchmarks/bench_tts_streaming.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["SPEECH_ENGINE"] = "fake"
+
+import azure.cognitiveservices.speech as speechsdk  # noqa: E402
+
+from app.core.audio_frames import unpack_audio_frame  # noqa: E402
+from app.services.speech_engine import FakeEvent, FakeResult  # noqa: E402
+from app.services.synthesizer_pool import get_synthesizer_pool  # noqa: E402
+from services import speech_service  # noqa: E402
+
+SENTENCES = {
+    "corta": "Buenos días a todos.",
+    "media": "Buenos días a todos, gracias por venir a la conferencia de esta mañana sobre energía.",
+    "larga": ("Buenos días a todos, gracias por venir a la conferencia de esta mañana; antes de empezar quiero "
+              "agradecer a los organizadores, a los traductores y a todo el equipo técnico que hizo posible que "
+              "hoy podamos escuchar a los oradores en siete idiomas al mismo tiempo."),
+}
+
+
+async def run_case(streaming: bool, text: str, utterances: int) -> dict:
+    first_audio, done = {}, {}
+    recognized_at = {}
+
+    async def send_json(payload):
+        now = time.perf_counter()
+        utterance_id = payload.get("utterance_id")
+        if payload["type"] == "audio":
+            first_audio.setdefault(utterance_id, now)
+            done[utterance_id] = now
+        elif payload["type"] == "audio_end":
+            done[utterance_id] = now
+
+    async def send_bytes(frame):
+        utterance_id, _, _, _ = unpack_audio_frame(frame)
+        first_audio.setdefault(utterance_id, time.perf_counter())
+
+    session = speech_service.SpeechSession(send_json, send_bytes_coro=send_bytes if streaming else None)
+    session._tts_task = asyncio.get_running_loop().create_task(session._tts_worker())
+    for i in range(utterances):
+        utterance_id = i + 1
+        recognized_at[utterance_id] = time.perf_counter()
+        event = FakeEvent(FakeResult(text, {"es": text}, 0, 0, speechsdk.ResultReason.TranslatedSpeech))
+        # desde un hilo, como el SDK
+        await asyncio.to_thread(session._on_recognized, event)
+        while utterance_id not in done:
+            await asyncio.sleep(0.005)
+    session._tts_task.cancel()
+
+    ttfa = [first_audio[u] - recognized_at[u] for u in recognized_at]
+    total = [done[u] - recognized_at[u] for u in recognized_at]
+    return {
+        "first_audio_ms": round(statistics.median(ttfa) * 1000, 1),
+        "complete_ms": round(statistics.median(total) * 1000, 1),
+    }
+
+
+async def run(args) -> list:
+    speech_service.init_azure("bench", "local")
+    # el pool ya conectado, como en producción tras el primer uso
+    await asyncio.to_thread(get_synthesizer_pool("bench", "local").warm, [None])
+    results = []
+    for name, text in SENTENCES.items():
+        for streaming in (False, True):
+            result = await run_case(streaming, text, args.utterances)
+            result.update({"sentence": name, "chars": len(text), "mode": "stream" if streaming else "full"})
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--utterances", type=int, default=20)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'frase':<7} {'chars':>6} {'modo':<7} {'1er audio ms':>13} {'completo ms':>12}")
+    for r in results:
+        print(f"{r['sentence']:<7} {r['chars']:>6} {r['mode']:<7} {r['first_audio_ms']:>13} {r['complete_ms']:>12}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark de /ws/translate: mensajes por segundo en un mismo socket según la
+ventana de tubería (WS_PIPELINE_WINDOW) de ConnectionManager.
+
+El servidor es main:app real (uvicorn en proceso). El traductor usa el
+backend stub con --latency-ms por llamada, como una API externa, sin caché
+ni micro-batching (para medir solo la tubería); las llamadas corren en el
+pool propio del Translator (TRANSLATE_WORKERS), que pone el techo total:
+TRANSLATE_WORKERS / latencia mensajes por segundo entre todos los sockets.
+
+Cada uno de los --sockets clientes manda --messages textos seguidos y lee
+las respuestas. Modos:
+  window=1          el comportamiento anterior: un mensaje por vez
+  window=N          N en vuelo, respuestas en orden de llegada
+  window=N ids      N en vuelo, con "id": respuestas fuera de orden
+
+Se comprueba que lleguen todas y, sin ids, en el mismo orden.
+
+Uso:
+    python benchmarks/bench_ws_pipeline.py --messages 50 --sockets 4 --latency-ms 40
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import websockets  # noqa: E402
+
+from benchmarks.harness import InProcessServer, percentile  # noqa: E402
+
+
+def slow_translator(latency: float):
+    from app.core.translator import StubTranslatorBackend, Translator
+
+    return Translator(StubTranslatorBackend(latency), batch_window=0)
+
+
+async def run_socket(url: str, messages: int, with_ids: bool) -> dict:
+    async with websockets.connect(url, max_queue=None) as ws:
+        sent_at = {}
+
+        async def send_all():
+            for i in range(messages):
+                message = {"type": "text", "text": f"mensaje {i}", "target": "es"}
+                if with_ids:
+                    message["id"] = i
+                sent_at[i] = time.perf_counter()
+                await ws.send(json.dumps(message))
+
+        started = time.perf_counter()
+        sender = asyncio.create_task(send_all())
+        order, latencies = [], []
+        for position in range(messages):
+            reply = json.loads(await ws.recv())
+            i = reply["id"] if with_ids else int(reply["original"].split()[-1])
+            order.append(i)
+            latencies.append(time.perf_counter() - sent_at[i])
+        elapsed = time.perf_counter() - started
+        await sender
+    return {
+        "seconds": elapsed,
+        "in_order": order == list(range(messages)),
+        "complete": sorted(order) == list(range(messages)),
+        "latencies": latencies,
+    }
+
+
+async def run_mode(server, args, window: int, with_ids: bool) -> dict:
+    server.app_module.text_translation.window = window
+    url = f"{server.ws_url}/ws/translate"
+    results = await asyncio.gather(*(run_socket(url, args.messages, with_ids) for _ in range(args.sockets)))
+    latencies = [value for r in results for value in r["latencies"]]
+    per_socket = [args.messages / r["seconds"] for r in results]
+    return {
+        "window": window,
+        "ids": with_ids,
+        "messages_per_second_per_socket": round(statistics.mean(per_socket), 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "complete": all(r["complete"] for r in results),
+        "in_order": all(r["in_order"] for r in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--sockets", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    parser.add_argument("--windows", default="1,4,8,16")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    server = InProcessServer().start()
+    server.app_module.text_translation.translator = slow_translator(args.latency_ms / 1000)
+    modes = [(int(w), False) for w in args.windows.split(",")]
+    modes.append((modes[-1][0], True))
+    results = []
+    try:
+        for window, with_ids in modes:
+            results.append(asyncio.run(run_mode(server, args, window, with_ids)))
+    finally:
+        server.stop()
+
+    baseline = results[0]["messages_per_second_per_socket"]
+    print(f"{'ventana':>8} {'ids':>4} {'msg/s/socket':>13} {'x':>6} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'completas':>10} {'en orden':>9}")
+    for r in results:
+        print(f"{r['window']:>8} {('sí' if r['ids'] else 'no'):>4} {r['messages_per_second_per_socket']:>13} "
+              f"{r['messages_per_second_per_socket'] / baseline:>6.1f} {r['p50_ms']:>8} {r['p99_ms']:>8} "
+              f"{str(r['complete']):>10} {str(r['in_order']):>9}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"latency_ms": args.latency_ms, "sockets": args.sockets, "messages": args.messages,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Prueba local del enrutamiento por afinidad de sala.
+
+1) Rebalanceo: reparte R salas en un anillo de N nodos y mide qué fracción
+   cambia de dueño al añadir o quitar un nodo (lo ideal es ~1/(N+1) y ~1/N).
+2) Con --spawn levanta N procesos uvicorn (main:app) en puertos locales con
+   CLUSTER_NODES/NODE_ID y un bus TCP compartido, y comprueba que todos los
+   nodos coinciden en el dueño y que /configure en un nodo ajeno redirige.
+
+Uso:
+    python benchmarks/cluster_local.py --nodes 4 --rooms 100000
+    python benchmarks/cluster_local.py --nodes 3 --spawn
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.core.node_directory import HashRing  # noqa: E402
+
+
+def moved_fraction(before: HashRing, after: HashRing, rooms: list) -> float:
+    moved = sum(1 for room in rooms if before.owner(room) != after.owner(room))
+    return moved / len(rooms)
+
+
+def rebalance_report(n_nodes: int, n_rooms: int, vnodes: int) -> dict:
+    rooms = [f"sala-{i}" for i in range(n_rooms)]
+    nodes = {f"n{i}": f"http://127.0.0.1:{8100 + i}" for i in range(n_nodes)}
+    ring = HashRing(nodes, vnodes=vnodes)
+
+    counts = {}
+    for room in rooms:
+        counts[ring.owner(room)] = counts.get(ring.owner(room), 0) + 1
+
+    grown = HashRing(dict(nodes, extra="http://127.0.0.1:8199"), vnodes=vnodes)
+    shrunk = HashRing({k: v for k, v in nodes.items() if k != "n0"}, vnodes=vnodes)
+    return {
+        "nodes": n_nodes,
+        "rooms": n_rooms,
+        "vnodes": vnodes,
+        "max_load_vs_mean": round(max(counts.values()) / (n_rooms / n_nodes), 3),
+        "moved_on_join": round(moved_fraction(ring, grown, rooms), 4),
+        "ideal_on_join": round(1 / (n_nodes + 1), 4),
+        "moved_on_leave": round(moved_fraction(ring, shrunk, rooms), 4),
+        "ideal_on_leave": round(1 / n_nodes, 4),
+    }
+
+
+def get_json(url: str):
+    with urllib.request.urlopen(url, timeout=5) as resp:
+        return json.loads(resp.read())
+
+
+def spawn_cluster(n_nodes: int, base_port: int, bus_port: int) -> dict:
+    nodes = {f"n{i}": f"http://127.0.0.1:{base_port + i}" for i in range(n_nodes)}
+    spec = ",".join(f"{k}={v}" for k, v in nodes.items())
+    procs = []
+    try:
+        for i, node_id in enumerate(nodes):
+            env = dict(os.environ, CLUSTER_NODES=spec, NODE_ID=node_id,
+                       ROOM_BUS_URL=f"tcp://127.0.0.1:{bus_port}")
+            procs.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--port", str(base_port + i), "--log-level", "warning"],
+                cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            ))
+        for url in nodes.values():
+            for _ in range(100):
+                try:
+                    get_json(f"{url}/stats")
+                    break
+                except OSError:
+                    time.sleep(0.1)
+
+        rooms = [f"sala-{i}" for i in range(50)]
+        disagreements = 0
+        redirects_ok = 0
+        for room in rooms:
+            owners = {get_json(f"{url}/cluster/owner/{room}")["node"] for url in nodes.values()}
+            disagreements += len(owners) > 1
+            owner = owners.pop()
+            foreign = next(url for node_id, url in nodes.items() if node_id != owner)
+            body = urllib.parse.urlencode({"action": "start", "input_lang": "es-ES"}).encode()
+            try:
+                urllib.request.urlopen(urllib.request.Request(f"{foreign}/configure/{room}", data=body), timeout=5)
+            except urllib.error.HTTPError as e:
+                if e.code == 307 and e.headers["location"].startswith(nodes[owner]):
+                    redirects_ok += 1
+        return {"spawned_nodes": n_nodes, "rooms_checked": len(rooms),
+                "owner_disagreements": disagreements, "configure_redirects_ok": redirects_ok}
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=100000)
+    parser.add_argument("--vnodes", type=int, default=128)
+    parser.add_argument("--spawn", action="store_true", help="levantar procesos uvicorn locales")
+    parser.add_argument("--base-port", type=int, default=8100)
+    parser.add_argument("--bus-port", type=int, default=7070)
+    args = parser.parse_args()
+
+    print(json.dumps(rebalance_report(args.nodes, args.rooms, args.vnodes), indent=2))
+    if args.spawn:
+        print(json.dumps(spawn_cluster(args.nodes, args.base_port, args.bus_port), indent=2))
@@ -0,0 +1,225 @@
+"""
+Utilidades compartidas por los benchmarks de salas: levantar main:app en el
+mismo proceso (hilo propio con su event loop) contra el motor de voz falso,
+clientes de orador/oyente y muestreo de recursos del proceso.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# antes de importar main: motor falso y sin trazas, salvo que se pida lo contrario
+os.environ.setdefault("SPEECH_ENGINE", "fake")
+os.environ.setdefault("TRACE_SAMPLE_RATE", "0")
+
+import uvicorn  # noqa: E402
+import websockets  # noqa: E402
+
+from app.core.room_tickets import RoomTickets  # noqa: E402
+
+CHUNK_SECONDS = 0.1
+CHUNK = b"\x00\x01" * int(16000 * CHUNK_SECONDS)  # 100 ms de PCM 16 kHz mono
+
+
+# con ROOM_TICKET_SECRET los clientes se presentan con ticket, como uno real
+_room_tickets = RoomTickets(os.getenv("ROOM_TICKET_SECRET"))
+
+
+def with_ticket(url: str, room_id: str, role: str) -> str:
+    if not _room_tickets.enforced:
+        return url
+    ticket, _ = _room_tickets.issue(room_id, role)
+    return f"{url}{'&' if '?' in url else '?'}ticket={ticket}"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(values, pct: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class InProcessServer:
+    """main:app servido por uvicorn en un hilo con su propio event loop."""
+
+    def __init__(self, port: int = None, quiet: bool = True):
+        self.port = port or free_port()
+        self.quiet = quiet
+        self.loop = None
+        self.thread_cpu_start = 0.0
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        with self._quiet():
+            import main
+        self.app_module = main
+        config = uvicorn.Config(main.app, host="127.0.0.1", port=self.port, log_level="error",
+                                ws_max_queue=1024, backlog=8192)
+        self._server = uvicorn.Server(config)
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self.loop)
+            with self._quiet():
+                self.loop.run_until_complete(self._server.serve())
+
+        self._thread = threading.Thread(target=run, daemon=True, name="uvicorn")
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.05)
+        self.thread_cpu_start = self.call(self._thread_time())
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+    def call(self, coro, timeout: float = 30):
+        """Ejecuta una corutina en el loop del servidor y devuelve el resultado."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def _thread_time(self):
+        return time.thread_time()
+
+    def loop_thread_cpu(self) -> float:
+        """CPU consumida por el hilo del event loop del servidor desde start()."""
+        return self.call(self._thread_time()) - self.thread_cpu_start
+
+    @contextlib.contextmanager
+    def _quiet(self):
+        if not self.quiet:
+            yield
+            return
+        # devnull y no StringIO: el servidor imprime durante toda la corrida
+        with open(os.devnull, "w") as sink, contextlib.redirect_stdout(sink):
+            yield
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://127.0.0.1:{self.port}"
+
+    @property
+    def http_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+
+class LoopLagProbe:
+    """Mide cuánto se retrasa un sleep en el loop del servidor (lag del event loop)."""
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.samples = []
+        self._running = True
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while self._running:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+    def stop(self):
+        self._running = False
+
+
+def read_proc_status(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def sample_resources() -> dict:
+    rss_kb = read_proc_status("VmRSS") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        fds = len(os.listdir("/proc/self/fd"))
+    except OSError:
+        fds = None
+    times = os.times()
+    return {
+        "time": time.time(),
+        "rss_mb": rss_kb / 1024,
+        "fds": fds,
+        "threads": read_proc_status("Threads") or threading.active_count(),
+        "cpu_seconds": times.user + times.system,
+    }
+
+
+async def run_speaker(ws_url: str, room_id: str, seconds: float, stop: asyncio.Event = None, query: str = ""):
+    """Envía PCM a tiempo real durante `seconds` (o hasta stop)."""
+    loop = asyncio.get_running_loop()
+    async with websockets.connect(with_ticket(f"{ws_url}/ws/speaker/{room_id}{query}", room_id, "speaker"),
+                                  max_size=None) as ws:
+        deadline = loop.time() + seconds
+        next_send = loop.time()
+        while loop.time() < deadline and not (stop and stop.is_set()):
+            await ws.send(CHUNK)
+            next_send += CHUNK_SECONDS
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+
+
+def utterance_latency(message: dict):
+    """Latencia ingesta->oyente a partir del "t=" que agrega el motor falso."""
+    text = message.get("original_text", "")
+    _, sep, stamp = text.rpartition("t=")
+    if not sep:
+        return None
+    try:
+        return time.time() - float(stamp)
+    except ValueError:
+        return None
+
+
+async def run_listener(ws_url: str, room_id: str, lang: str, latencies: list, counter: list,
+                       connected: asyncio.Event = None, stop: asyncio.Event = None):
+    async with websockets.connect(with_ticket(f"{ws_url}/ws/listener/{room_id}?lang={lang}", room_id, "listener"),
+                                  max_size=None) as ws:
+        if connected is not None:
+            connected.set()
+        while not (stop and stop.is_set()):
+            try:
+                raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+            except asyncio.TimeoutError:
+                continue
+            except websockets.exceptions.ConnectionClosed:
+                return
+            if isinstance(raw, bytes):
+                continue
+            latency = utterance_latency(json.loads(raw))
+            counter[0] += 1
+            if latency is not None:
+                latencies.append(latency)
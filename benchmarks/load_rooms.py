@@ -0,0 +1,170 @@
+"""
+Benchmark de carga de salas de punta a punta.
+
+Levanta main:app en el mismo proceso con el motor de voz falso
+(SPEECH_ENGINE=fake), conecta L oyentes por idioma en cada sala y S oradores
+que envían PCM a tiempo real. Informa latencia de entrega p50/p95/p99
+(ingesta del audio -> oyente), mensajes por segundo, lag del event loop del
+servidor, RSS y CPU por sala, y escribe los resultados en JSON para comparar
+entre commits.
+
+Escenarios predefinidos (--scenario):
+    one_room_5000    1 sala x 5000 oyentes (2500 es + 2500 fr)
+    rooms_500x10     500 salas x 10 oyentes (5 es + 5 fr)
+    smoke            2 salas x 4 oyentes, para probar el arnés
+
+Uso:
+    python benchmarks/load_rooms.py --scenario rooms_500x10 --seconds 30 --output results.json
+    python benchmarks/load_rooms.py --scenario one_room_5000 --compare results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from harness import (  # noqa: E402
+    InProcessServer, LoopLagProbe, git_commit, percentile, raise_fd_limit,
+    run_listener, run_speaker, sample_resources,
+)
+
+SCENARIOS = {
+    "one_room_5000": {"rooms": 1, "listeners_per_lang": 2500, "langs": ["es", "fr"]},
+    "rooms_500x10": {"rooms": 500, "listeners_per_lang": 5, "langs": ["es", "fr"]},
+    "smoke": {"rooms": 2, "listeners_per_lang": 2, "langs": ["es", "fr"]},
+}
+
+# conexiones de oyentes abiertas en paralelo durante el arranque
+CONNECT_CONCURRENCY = 200
+
+
+async def run_scenario(server: InProcessServer, rooms: int, speakers: int, listeners_per_lang: int,
+                       langs: list, seconds: float) -> dict:
+    stop = asyncio.Event()
+    latencies = []
+    received = [0]
+    room_ids = [f"bench-{i}" for i in range(rooms)]
+
+    # 1) oyentes
+    semaphore = asyncio.Semaphore(CONNECT_CONCURRENCY)
+    listener_tasks = []
+
+    async def start_listener(room_id, lang):
+        connected = asyncio.Event()
+        async with semaphore:
+            task = asyncio.create_task(run_listener(server.ws_url, room_id, lang, latencies, received, connected, stop))
+            listener_tasks.append(task)
+            await asyncio.wait([asyncio.create_task(connected.wait()), task], return_when=asyncio.FIRST_COMPLETED)
+
+    connect_started = time.perf_counter()
+    await asyncio.gather(*(start_listener(r, lang) for r in room_ids for lang in langs
+                           for _ in range(listeners_per_lang)))
+    connect_seconds = time.perf_counter() - connect_started
+
+    # 2) oradores a tiempo real + sondas en el servidor
+    probe = LoopLagProbe()
+    server.call(_start_probe(probe))
+    before = sample_resources()
+    cpu_loop_before = server.loop_thread_cpu()
+    received[0] = 0
+    latencies.clear()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_speaker(server.ws_url, room_ids[i % rooms], seconds) for i in range(speakers)))
+    await asyncio.sleep(1.0)  # dejar llegar las últimas frases
+    elapsed = time.perf_counter() - started
+
+    after = sample_resources()
+    cpu_loop = server.loop_thread_cpu() - cpu_loop_before
+    probe.stop()
+    stop.set()
+    await asyncio.gather(*listener_tasks, return_exceptions=True)
+
+    total_listeners = rooms * len(langs) * listeners_per_lang
+    cpu_seconds = after["cpu_seconds"] - before["cpu_seconds"]
+    ms = lambda v: round(v * 1000, 2) if v is not None else None  # noqa: E731
+    return {
+        "rooms": rooms,
+        "speakers": speakers,
+        "listeners": total_listeners,
+        "langs": langs,
+        "seconds": round(elapsed, 2),
+        "listener_connect_seconds": round(connect_seconds, 2),
+        "messages": received[0],
+        "messages_per_second": round(received[0] / elapsed, 1),
+        "latency_ms_p50": ms(percentile(latencies, 50)),
+        "latency_ms_p95": ms(percentile(latencies, 95)),
+        "latency_ms_p99": ms(percentile(latencies, 99)),
+        "latency_ms_max": ms(max(latencies) if latencies else None),
+        "loop_lag_ms_p50": ms(percentile(probe.samples, 50)),
+        "loop_lag_ms_p99": ms(percentile(probe.samples, 99)),
+        "loop_lag_ms_max": ms(max(probe.samples) if probe.samples else None),
+        "rss_mb": round(after["rss_mb"], 1),
+        "rss_mb_per_room": round(after["rss_mb"] / rooms, 3),
+        # el proceso incluye a los clientes; el hilo del loop es solo el servidor
+        "process_cpu_pct": round(100 * cpu_seconds / elapsed, 1),
+        "server_loop_cpu_pct": round(100 * cpu_loop / elapsed, 1),
+        "server_loop_cpu_pct_per_room": round(100 * cpu_loop / elapsed / rooms, 4),
+    }
+
+
+async def _start_probe(probe: LoopLagProbe):
+    asyncio.create_task(probe.run())
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Variación porcentual de cada métrica numérica frente a una corrida anterior."""
+    diff = {}
+    for key, value in current["results"].items():
+        old = baseline.get("results", {}).get(key)
+        if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            diff[key] = f"{100 * (value - old) / old:+.1f}%"
+    return diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="smoke")
+    parser.add_argument("--rooms", type=int)
+    parser.add_argument("--speakers", type=int, help="por defecto, uno por sala")
+    parser.add_argument("--listeners-per-lang", type=int)
+    parser.add_argument("--langs", help="lista separada por comas, p. ej. es,fr")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--utterance-seconds", type=float, default=2.0)
+    parser.add_argument("--output", help="archivo JSON de resultados")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    params = dict(SCENARIOS[args.scenario])
+    if args.rooms:
+        params["rooms"] = args.rooms
+    if args.listeners_per_lang is not None:
+        params["listeners_per_lang"] = args.listeners_per_lang
+    if args.langs:
+        params["langs"] = args.langs.split(",")
+    params["speakers"] = args.speakers or params["rooms"]
+
+    os.environ["FAKE_UTTERANCE_SECONDS"] = str(args.utterance_seconds)
+    raise_fd_limit()
+    server = InProcessServer().start()
+    try:
+        results = asyncio.run(run_scenario(server, seconds=args.seconds, **params))
+    finally:
+        server.stop()
+
+    report = {"scenario": args.scenario, "commit": git_commit(), "timestamp": int(time.time()), "results": results}
+    if args.compare:
+        with open(args.compare) as f:
+            report["vs_baseline"] = compare(report, json.load(f))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
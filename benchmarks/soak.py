@@ -0,0 +1,228 @@
+"""
+Soak test: horas de sesiones sintéticas contra el motor de voz falso, con
+detección de fugas.
+
+Cada sesión: conecta oyentes, un orador habla unos segundos, se exportan el
+original, una traducción y el audio, y todos se desconectan. Se usa un
+room_id nuevo por sesión para que las salas que no se liberan se noten.
+
+Durante la corrida se muestrean RSS, descriptores abiertos, hilos, tamaño de
+los temporales, salas en memoria y memoria trazada por tracemalloc. Tras el
+calentamiento se ajusta una recta a cada serie; si alguna pendiente (por
+hora) supera su umbral, el proceso sale con código 1. Al final se listan los
+mayores crecimientos de tracemalloc. En corridas de pocos minutos la
+pendiente del RSS refleja sobre todo el calentamiento del allocator; los
+umbrales están pensados para corridas de horas.
+
+Uso:
+    python benchmarks/soak.py --hours 4 --sessions 8 --output soak.json
+    python benchmarks/soak.py --minutes 5            # corrida corta
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.parse
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# salas vacías se eliminan rápido para que el soak las vea desaparecer
+os.environ.setdefault("ROOM_IDLE_TTL", "5")
+os.environ.setdefault("ROOM_SWEEP_INTERVAL", "2")
+
+from harness import (  # noqa: E402
+    InProcessServer, git_commit, raise_fd_limit, run_listener, run_speaker, sample_resources,
+)
+
+# series vigiladas y unidad de su umbral (por hora)
+THRESHOLDS = {
+    "rss_mb": "max_rss_mb_per_hour",
+    "fds": "max_fds_per_hour",
+    "threads": "max_threads_per_hour",
+    "tmp_mb": "max_tmp_mb_per_hour",
+    "rooms": "max_rooms_per_hour",
+    "traced_mb": "max_traced_mb_per_hour",
+}
+
+
+def tmp_dir_mb() -> float:
+    total = 0
+    with os.scandir(tempfile.gettempdir()) as entries:
+        for entry in entries:
+            try:
+                if entry.is_file(follow_symlinks=False):
+                    total += entry.stat().st_size
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def slope_per_hour(samples: list, key: str):
+    points = [(s["time"], s[key]) for s in samples if s.get(key) is not None]
+    if len(points) < 3:
+        return None
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if var == 0:
+        return None
+    cov = sum((t - mean_t) * (v - mean_v) for t, v in points)
+    return cov / var * 3600
+
+
+def http(method: str, url: str, data: dict = None) -> int:
+    body = urllib.parse.urlencode(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, method=method)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+async def session(server: InProcessServer, room_id: str, listeners: int, speak_seconds: float, stats: dict):
+    stop = asyncio.Event()
+    received = [0]
+    tasks = [asyncio.create_task(run_listener(server.ws_url, room_id, lang, [], received, stop=stop))
+             for lang in ("es", "fr") for _ in range(listeners)]
+    await asyncio.sleep(0.2)
+    await run_speaker(server.ws_url, room_id, speak_seconds)
+    await asyncio.sleep(0.5)
+
+    for method, path, data in (
+        ("GET", f"/export/original/{room_id}", None),
+        ("GET", f"/export/translation/{room_id}/es", None),
+        ("POST", f"/export/audio/{room_id}", {}),
+    ):
+        status = await asyncio.to_thread(http, method, server.http_url + path, data)
+        stats["exports"] += 1
+        if status >= 400:
+            stats["export_errors"] += 1
+
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    stats["sessions"] += 1
+    stats["messages"] += received[0]
+
+
+async def session_loop(server, worker: int, deadline: float, args, stats):
+    n = 0
+    while time.time() < deadline:
+        try:
+            await session(server, f"soak-{worker}-{n}", args.listeners, args.speak_seconds, stats)
+        except Exception as e:
+            stats["session_errors"] += 1
+            print(f"Sesión soak-{worker}-{n} falló: {e}", file=sys.stderr)
+        n += 1
+
+
+async def sampler(server, deadline: float, interval: float, samples: list):
+    while time.time() < deadline:
+        sample = sample_resources()
+        sample["tmp_mb"] = tmp_dir_mb()
+        sample["rooms"] = len(server.app_module.rooms)
+        if tracemalloc.is_tracing():
+            # solo memoria viva: los ciclos pendientes de recolectar no son una fuga
+            gc.collect()
+            sample["traced_mb"] = tracemalloc.get_traced_memory()[0] / (1024 * 1024)
+        samples.append(sample)
+        await asyncio.sleep(interval)
+
+
+async def run(server, args) -> dict:
+    duration = args.minutes * 60 if args.minutes else args.hours * 3600
+    started = time.time()
+    deadline = started + duration
+    samples = []
+    stats = {"sessions": 0, "session_errors": 0, "exports": 0, "export_errors": 0, "messages": 0}
+
+    sampler_task = asyncio.create_task(sampler(server, deadline, args.sample_interval, samples))
+    loops = [asyncio.create_task(session_loop(server, i, deadline, args, stats)) for i in range(args.sessions)]
+
+    baseline_snapshot = None
+    warmup_end = started + duration * args.warmup_fraction
+    while time.time() < warmup_end:
+        await asyncio.sleep(1)
+    if tracemalloc.is_tracing():
+        gc.collect()
+        baseline_snapshot = tracemalloc.take_snapshot()
+
+    await asyncio.gather(*loops)
+    await sampler_task
+
+    steady = [s for s in samples if s["time"] >= warmup_end]
+    slopes = {key: slope_per_hour(steady, key) for key in THRESHOLDS}
+    failures = []
+    for key, arg_name in THRESHOLDS.items():
+        limit = getattr(args, arg_name)
+        if slopes[key] is not None and slopes[key] > limit:
+            failures.append(f"{key} crece {slopes[key]:.2f}/h (máximo {limit}/h)")
+
+    top = []
+    if baseline_snapshot is not None:
+        gc.collect()
+        growth = [s for s in tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno") if s.size_diff > 0]
+        for stat in growth[:args.top]:
+            top.append({"where": str(stat.traceback), "size_diff_kb": round(stat.size_diff / 1024, 1),
+                        "count_diff": stat.count_diff})
+
+    last = samples[-1] if samples else {}
+    return {
+        "commit": git_commit(),
+        "duration_seconds": round(time.time() - started, 1),
+        "stats": stats,
+        "final": {k: round(v, 2) if isinstance(v, float) else v for k, v in last.items() if k != "time"},
+        "slopes_per_hour": {k: round(v, 3) if v is not None else None for k, v in slopes.items()},
+        "tracemalloc_top": top,
+        "failures": failures,
+        "passed": not failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--minutes", type=float, help="duración en minutos (tiene prioridad sobre --hours)")
+    parser.add_argument("--sessions", type=int, default=4, help="sesiones concurrentes")
+    parser.add_argument("--listeners", type=int, default=3, help="oyentes por idioma por sesión")
+    parser.add_argument("--speak-seconds", type=float, default=6.0)
+    parser.add_argument("--sample-interval", type=float, default=5.0)
+    parser.add_argument("--warmup-fraction", type=float, default=0.2)
+    parser.add_argument("--no-tracemalloc", action="store_true")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--max-rss-mb-per-hour", type=float, default=20.0)
+    parser.add_argument("--max-fds-per-hour", type=float, default=10.0)
+    parser.add_argument("--max-threads-per-hour", type=float, default=5.0)
+    parser.add_argument("--max-tmp-mb-per-hour", type=float, default=5.0)
+    parser.add_argument("--max-rooms-per-hour", type=float, default=10.0)
+    parser.add_argument("--max-traced-mb-per-hour", type=float, default=10.0)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    if not args.no_tracemalloc:
+        tracemalloc.start(10)
+    raise_fd_limit()
+    server = InProcessServer().start()
+    try:
+        report = asyncio.run(run(server, args))
+    finally:
+        server.stop()
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
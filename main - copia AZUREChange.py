@@ -4,6 +4,8 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import asyncio
 import azure.cognitiveservices.speech as speechsdk
+from app.core.audio_formats import DEFAULT_FORMAT, FORMATS
+from app.services.synthesizer_pool import get_synthesizer_pool
 import sounddevice as sd
 import numpy as np
 import os
@@ -19,6 +21,9 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 SPEECH_KEY = os.getenv("SPEECH_KEY")
 SPEECH_REGION = os.getenv("SPEECH_REGION")
+tts_pool = get_synthesizer_pool(SPEECH_KEY, SPEECH_REGION)
+# formato del audio que se difunde (TTS_DEFAULT_FORMAT: wav-16k, wav-8k, mp3, opus, ...)
+TTS_FORMAT = FORMATS[DEFAULT_FORMAT]
 
 if not SPEECH_KEY or not SPEECH_REGION:
     raise ValueError("Las variables de entorno SPEECH_KEY y SPEECH_REGION no están configuradas.")
@@ -162,23 +167,18 @@ async def broadcast_translations():
             await broadcast_status("Traduciendo")
 
             voice = VOICE_MAP.get(CURRENT_TARGET_LANG, VOICE_MAP.get("en"))
-            speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-            speech_config.set_speech_synthesis_output_format(
-                speechsdk.SpeechSynthesisOutputFormat.Riff16Khz16BitMonoPcm
-            )
-            speech_config.speech_synthesis_voice_name = voice
-            synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
 
             def synth_blocking():
-                future = synthesizer.speak_text_async(text)
-                return future.get()
+                # sintetizador del pool, ya conectado a la voz
+                return tts_pool.synthesize(text, voice, TTS_FORMAT.sdk_name)
 
             result = await asyncio.to_thread(synth_blocking)
 
             if result and result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
                 audio_buffer = result.audio_data
                 audio_base64 = base64.b64encode(audio_buffer).decode("utf-8")
-                payload = {"text": text, "audio": audio_base64, "status": "Enviando", "lang": CURRENT_TARGET_LANG}
+                payload = {"text": text, "audio": audio_base64, "media_type": TTS_FORMAT.media_type, "status": "Enviando",
+                           "lang": CURRENT_TARGET_LANG}
                 for client in list(connected_clients):
                     try:
                         await client.send_json(payload)
@@ -1,14 +1,59 @@
 import os
 import json
 import asyncio
+from collections import deque
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, UploadFile, File, Form
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.websockets import WebSocketState
 from threading import Thread
 from dotenv import load_dotenv
 import azure.cognitiveservices.speech as speechsdk
 import time
-import tempfile
+import websockets
+
+from app.api.router import router as api_router
+from app.core import metrics
+from app.core.audio_clock import AudioClock
+from app.core.audio_formats import FORMATS as AUDIO_FORMATS, negotiate as negotiate_audio_format
+from app.core.metrics import lang_label, room_label, voice_label
+from app.core.node_directory import create_node_directory
+from app.core.room_bus import ALL_ROOMS, create_room_bus, default_worker_id
+from app.core.room_tickets import TicketError, create_room_tickets
+from app.core.stats_hub import StatsHub
+from app.core.tracing import MAX_SEND_EVENTS, UtteranceTrace, create_tracer, new_trace_id
+from app.core.websocket_manager import create_connection_manager
+from app.services.audio_decoder import create_stream_decoder, get_decode_pool
+from app.services.speech_engine import create_translation_recognizer
+from app.services.synthesizer_pool import SynthesizerBusy, get_synthesizer_pool
+from app.services import live_dubbing as live_dubbing_module
+from app.services import utterance_writer as history_module
+
+# --- Métricas (/metrics) ---
+SPEAKER_AUDIO_BYTES = metrics.counter(
+    "vortext_speaker_audio_bytes_total", "Bytes de audio recibidos de oradores (antes de decodificar)", ["room"])
+SPEAKER_AUDIO_FRAMES = metrics.counter(
+    "vortext_speaker_audio_frames_total", "Mensajes de audio recibidos de oradores", ["room"])
+RECOGNITION_EVENTS = metrics.counter(
+    "vortext_recognition_events_total", "Eventos del recognizer", ["room", "kind"])
+RECOGNITION_LATENCY = metrics.histogram(
+    "vortext_recognition_latency_seconds",
+    "Desde la ingesta del final del audio reconocido hasta el evento del recognizer", ["room", "kind"])
+FANOUT_SECONDS = metrics.histogram(
+    "vortext_fanout_seconds", "Duración del reparto de una frase a los oyentes locales", ["room"])
+SEND_FAILURES = metrics.counter(
+    "vortext_listener_send_failures_total", "Envíos fallidos a oyentes", ["room", "lang"])
+LISTENERS = metrics.gauge(
+    "vortext_listeners", "Oyentes conectados a este worker", ["room", "lang"])
+DECODE_QUEUE_DEPTH = metrics.gauge(
+    "vortext_decode_queue_depth", "Trozos de audio esperando en el pool de decodificación")
+# Ingesta del orador por lotes de INGEST_MARK_FRAMES trozos: por trozo solo se suman bytes en una local;
+# la hora de pared (AudioClock, que interpola dentro del lote) se toma una vez por lote y los contadores
+# se vuelcan cada INGEST_METRICS_FLUSH_FRAMES trozos (~10 s de audio a 100 ms por trozo)
+INGEST_MARK_FRAMES = max(1, int(os.getenv("INGEST_MARK_FRAMES", "20")))
+INGEST_METRICS_FLUSH_FRAMES = int(os.getenv("INGEST_METRICS_FLUSH_FRAMES", "100"))
+WS_ADMISSIONS = metrics.counter(
+    "vortext_ws_admissions_total", "Conexiones de sala aceptadas o rechazadas por ticket", ["role", "result"])
 
 app = FastAPI()
 
@@ -30,10 +75,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# API autenticada: usuarios, tickets de sala, historial y búsqueda (/api/...)
+app.include_router(api_router, prefix="/api")
+TICKET_ISSUER_PATH = "/api/rooms/{room_id}/tickets"
+
 # --- Estado por sala ---
 # Cada sala tendrá:
 # {
 #   "listeners": { lang: [websockets] },
+#   "audio_listeners": { lang: { formato: [websockets] } },   # además quieren el doblaje en vivo (?audio=1)
+#   "live_tts": bool,
+#   "utterance_seq": int,
 #   "input_lang": "en-US",
 #   "push_stream": obj,
 #   "translator": obj,
@@ -41,11 +93,48 @@ app.add_middleware(
 #   "start_time": float,
 #   "speaker_count": int,
 #   "last_text": str,
-#   "transcript_original": [ "segment 1", "segment 2", ... ],
-#   "translations": { "es": ["seg1","seg2"], "en": [...] }
+#   "transcript_original": deque([ "segment 1", "segment 2", ... ]),
+#   "translations": { "es": deque(["seg1","seg2"]), "en": deque([...]) },
+#   "dropped_segments": { "original": n, "es": n },  # descartados por TRANSCRIPT_MAX_SEGMENTS
+#   "remote_presence": { worker_id: {"speakers": n, "listeners": {lang: n}, "seen": float} },
+#   "last_activity": float
 # }
+# "listeners", "audio_listeners", "push_stream", "translator", "speaker_count" y
+# "utterance_seq" son locales a este worker; transcripts, configuración y presencia de otros workers llegan por el bus.
 rooms = {}
 
+# Bus de salas (ROOM_BUS_URL). Con un solo worker basta el bus en memoria.
+room_bus = create_room_bus()
+WORKER_ID = default_worker_id()
+
+# Directorio de nodos (CLUSTER_NODES / NODE_ID): cada sala tiene un nodo dueño
+# que corre su recognizer. Los oyentes se atienden desde cualquier nodo.
+node_directory = create_node_directory()
+FORWARDED_HEADER = "x-vortext-forwarded"
+
+# Trazas por frase (TRACE_SAMPLE_RATE / TRACE_RING_SIZE / TRACE_OTLP_FILE)
+tracer = create_tracer()
+
+# Historial de frases en la base (ROOM_HISTORY_*), escrito en lotes fuera del camino en vivo
+utterance_writer = history_module.create_utterance_writer()
+
+# Tickets firmados de admisión a salas (ROOM_TICKET_SECRET); los emite POST /api/rooms/{room_id}/tickets
+room_tickets = create_room_tickets()
+
+# Límites de memoria: segmentos que se conservan por sala/idioma para exportar,
+# y tiempo sin actividad tras el cual una sala vacía se elimina. Pasado el
+# límite se descartan los más viejos y las exportaciones lo avisan (cabecera
+# X-Transcript-Truncated y una primera línea en los .txt); el historial
+# completo queda en /api/rooms/{room_id}/utterances si ROOM_HISTORY_ENABLED.
+TRANSCRIPT_MAX_SEGMENTS = int(os.getenv("TRANSCRIPT_MAX_SEGMENTS", "5000"))
+ROOM_IDLE_TTL = float(os.getenv("ROOM_IDLE_TTL", "3600"))
+ROOM_SWEEP_INTERVAL = float(os.getenv("ROOM_SWEEP_INTERVAL", "60"))
+# Cada worker re-anuncia su presencia cada ROOM_PRESENCE_INTERVAL segundos (así
+# la reciben los workers que arrancan después); la de un worker que deja de
+# anunciarse (caído) se descarta tras ROOM_PRESENCE_TTL.
+ROOM_PRESENCE_INTERVAL = float(os.getenv("ROOM_PRESENCE_INTERVAL", "10"))
+ROOM_PRESENCE_TTL = float(os.getenv("ROOM_PRESENCE_TTL", str(3 * ROOM_PRESENCE_INTERVAL)))
+
 # Cargar .env
 load_dotenv()
 SPEECH_KEY = os.getenv("SPEECH_KEY")
@@ -58,6 +147,9 @@ def ensure_room(room_id: str, input_lang: str = "en-US", storage_method: str = "
     if room_id not in rooms:
         rooms[room_id] = {
             "listeners": {},
+            "audio_listeners": {},
+            "live_tts": live_dubbing_module.ENABLED_BY_DEFAULT,
+            "utterance_seq": 0,
             "input_lang": input_lang,
             "push_stream": None,
             "translator": None,
@@ -65,45 +157,426 @@ def ensure_room(room_id: str, input_lang: str = "en-US", storage_method: str = "
             "start_time": time.time(),
             "speaker_count": 0,
             "last_text": "",
-            "transcript_original": [],
-            "translations": {}
+            "transcript_original": deque(maxlen=TRANSCRIPT_MAX_SEGMENTS),
+            "translations": {},
+            "dropped_segments": {},
+            "remote_presence": {},
+            "last_activity": time.time()
         }
+        stats_hub.mark_dirty(room_id)
+
+
+async def admit_to_room(websocket: WebSocket, room_id: str, role: str, lang: str = None) -> bool:
+    """
+    Verifica el ticket antes de aceptar el WebSocket (solo HMAC, sin base de
+    datos). Si no vale, cierra sin tocar `rooms`: un room_id inventado no
+    crea estado.
+    """
+    if not room_tickets.enforced:
+        return True
+    try:
+        room_tickets.verify(websocket.query_params.get("ticket"), room_id, role, lang)
+    except TicketError as e:
+        WS_ADMISSIONS.labels(role, e.reason).inc()
+        print(f"⛔ {role} rechazado en sala {room_id}: {e}")
+        # cerrar antes de accept: el handshake responde 403
+        await websocket.close(code=1008)
+        return False
+    WS_ADMISSIONS.labels(role, "accepted").inc()
+    return True
+
+
+def room_is_idle(room: dict, now: float) -> bool:
+    if room["speaker_count"] > 0 or any(room["listeners"].values()):
+        return False
+    if any(p["speakers"] or any(p["listeners"].values()) for p in room["remote_presence"].values()):
+        return False
+    return now - room["last_activity"] > ROOM_IDLE_TTL
+
+
+def evict_idle_rooms():
+    """Quita las salas sin oradores ni oyentes (en ningún worker) inactivas más de ROOM_IDLE_TTL."""
+    now = time.time()
+    for room_id in [r for r, room in rooms.items() if room_is_idle(room, now)]:
+        rooms.pop(room_id, None)
+        live_dubbing.forget_room(room_id)
+        stats_hub.remove_room(room_id)
+        metrics.forget_room(room_id)
+        print(f"🧹 Sala {room_id} eliminada por inactividad")
+
+
+def room_stats_entry(room_id: str):
+    """Entrada de estadísticas de una sala (se recalcula solo cuando la sala cambia)."""
+    info = rooms.get(room_id)
+    if info is None:
+        return None
+    oyentes_total = sum(len(clients) for clients in info["listeners"].values())
+    oradores_total = info.get("speaker_count", 0)
+    for presence in info["remote_presence"].values():
+        oyentes_total += sum(presence["listeners"].values())
+        oradores_total += presence["speakers"]
+    return {
+        "sala": room_id,
+        "oradores": oradores_total,
+        "oyentes": oyentes_total,
+        "frases": len(info["transcript_original"]),
+        "inicio": info.get("start_time", time.time())
+    }
+
+
+# Estadísticas incrementales: /stats (snapshot cacheado) y /ws/stats (deltas)
+stats_hub = StatsHub(room_stats_entry)
+
+
+# publicaciones al bus en segundo plano: referencia fuerte hasta que terminan
+_publish_tasks = set()
+
+
+def _publish_done(task: asyncio.Task):
+    _publish_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"⚠️ Error publicando en el bus de salas ({task.get_name()}): {task.exception()}")
+
+
+def publish_in_background(room_id: str, event: dict):
+    task = asyncio.create_task(room_bus.publish(room_id, event), name=f"publish-{event.get('type')}-{room_id}")
+    _publish_tasks.add(task)
+    task.add_done_callback(_publish_done)
+
+
+def presence_event(room: dict) -> dict:
+    return {
+        "type": "presence",
+        "worker": WORKER_ID,
+        "speakers": room["speaker_count"],
+        "listeners": {lang: len(clients) for lang, clients in room["listeners"].items()}
+    }
+
+
+def publish_presence(room_id: str):
+    """Anuncia a los demás workers cuántos oradores/oyentes tiene esta sala aquí."""
+    room = rooms[room_id]
+    room["last_activity"] = time.time()
+    stats_hub.mark_dirty(room_id)
+    publish_in_background(room_id, presence_event(room))
+
+
+def expire_remote_presence(now: float):
+    """Descarta la presencia de workers que no se anuncian hace más de ROOM_PRESENCE_TTL."""
+    for room_id, room in rooms.items():
+        stale = [w for w, p in room["remote_presence"].items() if now - p["seen"] > ROOM_PRESENCE_TTL]
+        for worker in stale:
+            del room["remote_presence"][worker]
+            print(f"🧹 Presencia del worker {worker} en sala {room_id} expirada")
+        if stale:
+            stats_hub.mark_dirty(room_id)
+
+
+async def on_room_event(room_id: str, event: dict):
+    """Aplica un evento del bus al estado local y reparte a los oyentes de este worker."""
+    ensure_room(room_id)
+    room = rooms[room_id]
+    room["last_activity"] = time.time()
+    kind = event.get("type")
+
+    if kind == "utterance":
+        if event.get("worker") == WORKER_ID:
+            # la guarda solo el worker del orador; los demás reciben la misma frase por el bus
+            utterance_writer.submit(room_id, event.get("source_lang"), event["original_text"], event["translations"])
+        await fan_out_utterance(room_id, room, event)
+        stats_hub.mark_dirty(room_id)
+
+    elif kind == "presence":
+        if event["worker"] != WORKER_ID:
+            room["remote_presence"][event["worker"]] = {
+                "speakers": event["speakers"],
+                "listeners": event["listeners"],
+                "seen": time.time()
+            }
+            stats_hub.mark_dirty(room_id)
+
+    elif kind == "config":
+        room["input_lang"] = event["input_lang"]
+        room["storage_method"] = event["storage_method"]
+        room["live_tts"] = event.get("live_tts", room["live_tts"])
+        room["start_time"] = event["start_time"]
+        stats_hub.mark_dirty(room_id)
+
+
+def append_segment(room: dict, key: str, segments: deque, text: str):
+    """Agrega un segmento al transcript; si está lleno, cuenta el que se descarta."""
+    if len(segments) == segments.maxlen:
+        room["dropped_segments"][key] = room["dropped_segments"].get(key, 0) + 1
+    segments.append(text)
+
+
+def truncated_export(room_id: str, key: str, text: str, headers: dict) -> str:
+    """Si la sala descartó segmentos de `key`, lo avisa en la cabecera y en la primera línea del texto."""
+    dropped = rooms[room_id]["dropped_segments"].get(key, 0)
+    if not dropped:
+        return text
+    headers["X-Transcript-Truncated"] = str(dropped)
+    return (f"[... {dropped} segmentos anteriores no incluidos (límite TRANSCRIPT_MAX_SEGMENTS); "
+            f"historial completo en /api/rooms/{room_id}/utterances ...]\n{text}")
+
+
+async def _timed_send(client, payload: str) -> float:
+    await client.send_text(payload)
+    return time.time()
+
+
+async def fan_out_utterance(room_id: str, room: dict, event: dict):
+    trace_ctx = event.get("trace")
+    handled_at = time.time()
+    fanout_started = time.perf_counter()
+    append_segment(room, "original", room["transcript_original"], event["original_text"])
+    # numeración local: el audio del doblaje en vivo lleva el mismo utterance_id que el texto
+    room["utterance_seq"] += 1
+    utterance_id = room["utterance_seq"]
+
+    # un solo json.dumps por idioma, no por oyente
+    sends = []
+    for lang, translated_text in event["translations"].items():
+        append_segment(room, lang, room["translations"].setdefault(lang, deque(maxlen=TRANSCRIPT_MAX_SEGMENTS)),
+                       translated_text)
+        dubbed = bool(room["live_tts"] and translated_text and room["audio_listeners"].get(lang))
+        if dubbed:
+            # una síntesis por idioma y formato, repartida a todos sus oyentes de audio
+            for format_name in room["audio_listeners"][lang]:
+                live_dubbing.submit(room_id, lang, utterance_id, translated_text, format_name)
+        payload = json.dumps({
+            "utterance_id": utterance_id,
+            "original_text": event["original_text"],
+            "translated_text": translated_text,
+            "audio_url": "",
+            "audio": dubbed
+        }, separators=(",", ":"), ensure_ascii=False)
+        # enviar solo a oyentes interesados en ese idioma
+        for client in list(room["listeners"].get(lang, [])):
+            send = _timed_send(client, payload) if trace_ctx else client.send_text(payload)
+            sends.append((lang, send))
+    serialized_at = time.time()
+
+    results = await asyncio.gather(*(send for _, send in sends), return_exceptions=True)
+    for (lang, _), result in zip(sends, results):
+        if isinstance(result, Exception):
+            SEND_FAILURES.labels(room_label(room_id), lang_label(lang)).inc()
+            print(f"Error enviando a oyente en sala {room_id}: {result}")
+    FANOUT_SECONDS.labels(room_label(room_id)).observe(time.perf_counter() - fanout_started)
+
+    if trace_ctx:
+        export_utterance_trace(room_id, trace_ctx, handled_at, serialized_at, sends, results)
+
+
+def export_utterance_trace(room_id, trace_ctx, handled_at, serialized_at, sends, results):
+    done_at = time.time()
+    trace = UtteranceTrace(trace_ctx["trace_id"], room_id, WORKER_ID)
+    audio_start = trace_ctx.get("audio_start") or trace_ctx["recognized"]
+    audio_end = trace_ctx.get("audio_end") or trace_ctx["recognized"]
+    trace.add_span("audio_ingest", audio_start, audio_end)
+    trace.add_span("recognition", audio_end, trace_ctx["recognized"])
+    trace.add_span("loop_handoff", trace_ctx["recognized"], handled_at, published=trace_ctx["published"])
+    trace.add_span("serialize", handled_at, serialized_at, languages=len({lang for lang, _ in sends}))
+
+    completions = sorted(r for r in results if isinstance(r, float))
+    fanout = trace.add_span("fanout", serialized_at, done_at, listeners=len(sends),
+                            failures=len(sends) - len(completions))
+    if completions:
+        fanout.attributes["send_p50_seconds"] = completions[len(completions) // 2] - serialized_at
+        fanout.attributes["send_max_seconds"] = completions[-1] - serialized_at
+    for (lang, _), result in list(zip(sends, results))[:MAX_SEND_EVENTS]:
+        if isinstance(result, float):
+            fanout.events.append(("send_completed", result, {"lang": lang}))
+
+    # de la ingesta del primer byte de la frase hasta el último oyente servido
+    trace.finish(audio_start, done_at, mouth_to_screen_seconds=done_at - audio_end)
+    tracer.export(trace)
+
+
+@app.on_event("startup")
+async def check_ticket_issuer():
+    if not room_tickets.enforced:
+        return
+    # sin emisor de tickets, todos los WebSockets de sala se cerrarían con 1008
+    if not any(getattr(route, "path", None) == TICKET_ISSUER_PATH for route in app.routes):
+        raise RuntimeError(f"ROOM_TICKET_SECRET configurado pero no hay emisor en {TICKET_ISSUER_PATH}")
+    if not room_tickets.speakers:
+        print("⚠️ ROOM_TICKET_SPEAKERS vacío: solo se emiten tickets de oyente, nadie puede abrir el micrófono")
+
+
+@app.on_event("startup")
+async def start_room_bus():
+    room_bus.subscribe(ALL_ROOMS, on_room_event)
+    await room_bus.start()
+
+
+@app.on_event("shutdown")
+async def stop_room_bus():
+    await room_bus.close()
+
+
+@app.on_event("startup")
+async def start_room_history():
+    if not history_module.ENABLED:
+        return
+    # las tablas del historial y el índice de /api/search los crea el arranque del router de /api (montado antes)
+    await utterance_writer.start()
+
+
+@app.on_event("shutdown")
+async def stop_room_history():
+    # guarda lo que quede encolado antes de salir
+    await utterance_writer.stop()
+
+
+@app.on_event("startup")
+async def start_room_sweeper():
+    async def sweep():
+        while True:
+            await asyncio.sleep(ROOM_SWEEP_INTERVAL)
+            evict_idle_rooms()
+
+    app.state.room_sweeper = asyncio.create_task(sweep())
+
+
+@app.on_event("shutdown")
+async def stop_room_sweeper():
+    sweeper = getattr(app.state, "room_sweeper", None)
+    if sweeper is not None:
+        sweeper.cancel()
+
+
+@app.on_event("startup")
+async def start_presence_heartbeat():
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(ROOM_PRESENCE_INTERVAL)
+            for room_id, room in list(rooms.items()):
+                # solo las salas con gente aquí: las demás ya anunciaron su cero al vaciarse
+                if room["speaker_count"] or any(room["listeners"].values()):
+                    publish_in_background(room_id, presence_event(room))
+            expire_remote_presence(time.time())
+
+    app.state.presence_heartbeat = asyncio.create_task(heartbeat())
+
+
+@app.on_event("shutdown")
+async def stop_presence_heartbeat():
+    heartbeat = getattr(app.state, "presence_heartbeat", None)
+    if heartbeat is not None:
+        heartbeat.cancel()
+
+
+@app.on_event("startup")
+async def watch_node_directory():
+    if not node_directory.nodes_file:
+        return
+
+    async def poll():
+        while True:
+            await asyncio.sleep(5)
+            node_directory.reload()
+
+    asyncio.create_task(poll())
+
+
+async def proxy_speaker_to_owner(websocket: WebSocket, room_id: str):
+    """Reenvía el WebSocket del orador al nodo dueño de la sala."""
+    owner_url = node_directory.owner_url(room_id)
+    target = owner_url.replace("http", "ws", 1) + f"/ws/speaker/{room_id}"
+    if websocket.url.query:
+        target += "?" + websocket.url.query
+
+    await websocket.accept()
+    print(f"↪️ Orador de sala {room_id} reenviado a {node_directory.owner(room_id)}")
+    try:
+        async with websockets.connect(
+            target, additional_headers={FORWARDED_HEADER: node_directory.forward_token(room_id)}, max_size=None
+        ) as upstream:
+            async def client_to_owner():
+                while True:
+                    await upstream.send(await websocket.receive_bytes())
+
+            async def owner_to_client():
+                async for message in upstream:
+                    if isinstance(message, bytes):
+                        await websocket.send_bytes(message)
+                    else:
+                        await websocket.send_text(message)
+
+            tasks = [asyncio.create_task(client_to_owner()), asyncio.create_task(owner_to_client())]
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            for task in done:
+                if task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                    print(f"Error en proxy de orador (sala {room_id}): {task.exception()}")
+    except (OSError, websockets.exceptions.WebSocketException) as e:
+        print(f"No se pudo conectar con el nodo dueño de {room_id}: {e}")
+    finally:
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
 
 # --- WebSocket Orador ---
 @app.websocket("/ws/speaker/{room_id}")
 async def websocket_speaker(websocket: WebSocket, room_id: str):
+    # el ticket se comprueba también aquí para no abrir un proxy a nombre de cualquiera
+    if not await admit_to_room(websocket, room_id, "speaker"):
+        return
+
+    # Si la sala pertenece a otro nodo, hacemos de proxy (salvo que ya venga reenviado por otro nodo:
+    # la cabecera se verifica, un cliente que la mande por su cuenta igual termina en el dueño)
+    forwarded = node_directory.verify_forwarded(websocket.headers.get(FORWARDED_HEADER), room_id)
+    if not node_directory.is_local(room_id) and not forwarded:
+        await proxy_speaker_to_owner(websocket, room_id)
+        return
+
+    # El cliente negocia el códec con ?codec=pcm|opus|ogg|webm (por defecto PCM crudo)
+    codec = websocket.query_params.get("codec", "pcm")
+    try:
+        decoder = create_stream_decoder(codec)
+    except (ValueError, RuntimeError) as e:
+        print(f"Orador rechazado en sala {room_id}: {e}")
+        await websocket.close(code=1003)
+        return
+
     await websocket.accept()
-    print(f"✨ Orador conectado a la sala {room_id}")
+    print(f"✨ Orador conectado a la sala {room_id} (códec: {codec})")
 
     loop = asyncio.get_running_loop()
 
     ensure_room(room_id)
     rooms[room_id]["speaker_count"] += 1
     rooms[room_id]["start_time"] = time.time()
+    publish_presence(room_id)
 
-    # Audio config
-    audio_format = speechsdk.audio.AudioStreamFormat(samples_per_second=16000, bits_per_sample=16, channels=1)
-    push_stream = speechsdk.audio.PushAudioInputStream(stream_format=audio_format)
-    audio_config = speechsdk.audio.AudioConfig(stream=push_stream)
-
-    # SpeechTranslationConfig
-    speech_translation_config = speechsdk.translation.SpeechTranslationConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-    speech_translation_config.speech_recognition_language = rooms[room_id].get("input_lang", "en-US")
-    target_languages = ["es", "en", "fr", "it", "de", "pt", "zh-Hans"]
-    for lang in target_languages:
-        speech_translation_config.add_target_language(lang)
-
-    translator = speechsdk.translation.TranslationRecognizer(
-        translation_config=speech_translation_config,
-        audio_config=audio_config
-    )
+    # Push stream + TranslationRecognizer (Azure, o el motor falso con SPEECH_ENGINE=fake)
+    push_stream, translator = create_translation_recognizer(
+        SPEECH_KEY, SPEECH_REGION, rooms[room_id].get("input_lang", "en-US"))
 
     rooms[room_id]["push_stream"] = push_stream
     rooms[room_id]["translator"] = translator
 
+    # hora de ingesta de cada trozo, para medir cuánto tarda el recognizer
+    audio_clock = AudioClock()
+    room_metric_label = room_label(room_id)
+    audio_bytes_metric = SPEAKER_AUDIO_BYTES.labels(room_metric_label)
+    audio_frames_metric = SPEAKER_AUDIO_FRAMES.labels(room_metric_label)
+    # pending_*: lotes ya cerrados sin volcar a los contadores; batch_*: el lote en curso
+    pending_bytes = pending_frames = batch_bytes = batch_frames = 0
+
+    def observe_recognition(result, kind: str):
+        RECOGNITION_EVENTS.labels(room_metric_label, kind).inc()
+        ingested_at = audio_clock.wall_time_at(result.offset + result.duration)
+        if ingested_at is not None:
+            RECOGNITION_LATENCY.labels(room_metric_label, kind).observe(time.time() - ingested_at)
+
     # --- Función para enviar traducciones finales ---
     def send_translation_to_listeners(result_event):
+        recognized_at = time.time()
         try:
             translations = result_event.translations
             original_text = (result_event.text or "").strip()
@@ -115,47 +588,73 @@ async def websocket_speaker(websocket: WebSocket, room_id: str):
                 return
             rooms[room_id]["last_text"] = original_text
 
-            # Guardar original
-            rooms[room_id]["transcript_original"].append(original_text)
-
-            # Guardar traducciones por idioma y enviar a oyentes
-            for lang, translated_text in translations.items():
-                if translated_text is None:
-                    continue
-                # inicializar lista de traducciones
-                rooms[room_id]["translations"].setdefault(lang, []).append(translated_text)
-
-                # construir mensaje
-                message = {
-                    "original_text": original_text,
-                    "translated_text": translated_text,
-                    "audio_url": ""
+            # Publicar en el bus: cada worker guarda el transcript y reparte a sus oyentes
+            event = {
+                "type": "utterance",
+                "worker": WORKER_ID,
+                "source_lang": rooms[room_id].get("input_lang"),
+                "original_text": original_text,
+                "translations": {lang: text for lang, text in translations.items() if text is not None}
+            }
+            if tracer.should_sample():
+                # offset/duration del recognizer -> hora de ingesta de ese audio
+                event["trace"] = {
+                    "trace_id": new_trace_id(),
+                    "audio_start": audio_clock.wall_time_at(result_event.offset),
+                    "audio_end": audio_clock.wall_time_at(result_event.offset + result_event.duration),
+                    "recognized": recognized_at,
+                    "published": time.time()
                 }
-                # enviar solo a oyentes interesados en ese idioma
-                if lang in rooms[room_id]["listeners"]:
-                    for client in list(rooms[room_id]["listeners"][lang]):
-                        try:
-                            asyncio.run_coroutine_threadsafe(client.send_json(message), loop)
-                        except Exception as e:
-                            print(f"Error enviando a oyente en {lang}: {e}")
+            asyncio.run_coroutine_threadsafe(room_bus.publish(room_id, event), loop)
         except Exception as e:
             print("Error en send_translation_to_listeners:", e)
 
-    translator.recognized.connect(lambda evt: send_translation_to_listeners(evt.result))
-    translator.recognizing.connect(lambda evt: print(f"Parcial: {evt.result.text}"))  # solo consola
+    def on_recognized(evt):
+        observe_recognition(evt.result, "final")
+        send_translation_to_listeners(evt.result)
+
+    def on_recognizing(evt):
+        observe_recognition(evt.result, "partial")
+        print(f"Parcial: {evt.result.text}")  # solo consola
+
+    translator.recognized.connect(on_recognized)
+    translator.recognizing.connect(on_recognizing)
 
     translation_thread = Thread(target=lambda: translator.start_continuous_recognition_async().get(), daemon=True)
     translation_thread.start()
     print(f"Reconocimiento iniciado en sala {room_id}")
 
+    # marca de inicio: el audio del primer lote se interpola desde aquí
+    audio_clock.on_push(0)
     try:
         while True:
-            audio_data = await websocket.receive_bytes()
-            if audio_data and rooms[room_id]["storage_method"] == "NO_RECORD":
-                push_stream.write(audio_data)
+            batch_bytes = decoded_bytes = 0
+            # el índice del for es la cuenta de trozos del lote: si receive_bytes corta, batch_frames ya recibidos
+            for batch_frames in range(INGEST_MARK_FRAMES):
+                audio_data = await websocket.receive_bytes()
+                batch_bytes += len(audio_data)
+                if decoder is not None and audio_data:
+                    # decodificar fuera del event loop; el demuxer necesita todos los trozos en orden
+                    audio_data = await loop.run_in_executor(get_decode_pool(), decoder.decode, audio_data)
+                    decoded_bytes += len(audio_data)
+                if audio_data and rooms[room_id]["storage_method"] == "NO_RECORD":
+                    push_stream.write(audio_data)
+            audio_clock.on_push(decoded_bytes if decoder is not None else batch_bytes)
+            pending_bytes += batch_bytes
+            pending_frames += INGEST_MARK_FRAMES
+            batch_bytes = batch_frames = 0
+            if pending_frames >= INGEST_METRICS_FLUSH_FRAMES:
+                audio_bytes_metric.inc(pending_bytes)
+                audio_frames_metric.inc(pending_frames)
+                pending_bytes = pending_frames = 0
     except WebSocketDisconnect:
         print(f"Orador desconectado de sala {room_id}")
     finally:
+        audio_bytes_metric.inc(pending_bytes + batch_bytes)
+        audio_frames_metric.inc(pending_frames + batch_frames)
+        if decoder is not None:
+            print(f"Decodificación {decoder.codec} en sala {room_id}: "
+                  f"{decoder.cpu_seconds:.2f}s CPU para {decoder.audio_seconds:.1f}s de audio")
         try:
             push_stream.close()
         except Exception:
@@ -171,7 +670,9 @@ async def websocket_speaker(websocket: WebSocket, room_id: str):
         rooms[room_id]["speaker_count"] -= 1
         if rooms[room_id]["speaker_count"] < 0:
             rooms[room_id]["speaker_count"] = 0
-        await websocket.close()
+        publish_presence(room_id)
+        if websocket.client_state == WebSocketState.CONNECTED:
+            await websocket.close()
         print(f"Reconocimiento detenido en sala {room_id}")
 
 
@@ -179,13 +680,26 @@ async def websocket_speaker(websocket: WebSocket, room_id: str):
 @app.websocket("/ws/listener/{room_id}")
 async def websocket_listener(websocket: WebSocket, room_id: str):
     # NOTE: listener passes lang via query param ?lang=es
-    await websocket.accept()
     params = websocket.query_params
     lang = params.get("lang", "es")
+    # ?audio=1: además del texto recibe el doblaje en vivo como frames binarios (si la sala lo tiene activo)
+    # ?format=opus|mp3|wav-8k|...: formato de ese audio (app.core.audio_formats)
+    wants_audio = params.get("audio") == "1"
+    audio_format = negotiate_audio_format(params.get("format"))
+    if wants_audio and audio_format is None:
+        print(f"⛔ Oyente rechazado en sala {room_id}: formato de audio desconocido {params.get('format')!r}")
+        await websocket.close(code=1008)
+        return
+    if not await admit_to_room(websocket, room_id, "listener", lang):
+        return
+    await websocket.accept()
     ensure_room(room_id)
     if lang not in rooms[room_id]["listeners"]:
         rooms[room_id]["listeners"][lang] = []
     rooms[room_id]["listeners"][lang].append(websocket)
+    if wants_audio:
+        rooms[room_id]["audio_listeners"].setdefault(lang, {}).setdefault(audio_format.name, []).append(websocket)
+    publish_presence(room_id)
     print(f"👂 Oyente conectado a sala {room_id}, idioma {lang}")
 
     try:
@@ -197,42 +711,108 @@ async def websocket_listener(websocket: WebSocket, room_id: str):
             rooms[room_id]["listeners"][lang].remove(websocket)
         except Exception:
             pass
+        if wants_audio:
+            drop_audio_listener(room_id, lang, audio_format.name, websocket)
         print(f"🚪 Oyente desconectado de sala {room_id}, idioma {lang}")
         if not rooms[room_id]["listeners"].get(lang):
             rooms[room_id]["listeners"].pop(lang, None)
+        publish_presence(room_id)
+
+
+# --- Traducción de texto por WebSocket ---
+text_translation = create_connection_manager()
+
+
+@app.websocket("/ws/translate")
+async def websocket_translate(websocket: WebSocket):
+    # varios mensajes en vuelo por socket (WS_PIPELINE_WINDOW); ver app.core.websocket_manager
+    await text_translation.connect(websocket)
+    await text_translation.serve(websocket)
 
 
 # --- Configuración sala ---
 @app.post("/configure/{room_id}")
 async def configure_room(room_id: str, request: Request):
     form_data = await request.form()
+    # cambia la sala de todos sus oyentes: pide el mismo ticket de orador que el WebSocket del orador
+    if room_tickets.enforced:
+        try:
+            room_tickets.verify(form_data.get("ticket") or request.query_params.get("ticket"), room_id, "speaker")
+        except TicketError as e:
+            print(f"⛔ /configure rechazado en sala {room_id}: {e}")
+            return JSONResponse({"detail": str(e)}, status_code=403)
+
+    if not node_directory.is_local(room_id):
+        # 307 conserva el método y el cuerpo del formulario (ticket incluido)
+        return RedirectResponse(f"{node_directory.owner_url(room_id)}/configure/{room_id}", status_code=307)
+
     action = form_data.get("action")
     input_lang = form_data.get("input_lang") or "en-US"
     storage_method = form_data.get("storage_method") or "NO_RECORD"
 
     ensure_room(room_id)
-    rooms[room_id]["input_lang"] = input_lang
-    rooms[room_id]["storage_method"] = storage_method
-    rooms[room_id]["start_time"] = time.time()
+    # doblaje en vivo: "1"/"0"; si no viene se mantiene el de la sala
+    live_tts = form_data.get("live_tts")
+    live_tts = rooms[room_id]["live_tts"] if live_tts is None else live_tts == "1"
+    # el worker que tiene al orador puede ser otro: la config viaja por el bus
+    await room_bus.publish(room_id, {
+        "type": "config",
+        "input_lang": input_lang,
+        "storage_method": storage_method,
+        "live_tts": live_tts,
+        "start_time": time.time()
+    })
+
+    return JSONResponse({"status": action, "room_id": room_id, "input_lang": input_lang, "storage_method": storage_method,
+                         "live_tts": live_tts})
+
+
+# --- Métricas Prometheus ---
+def _listener_counts():
+    counts = {}
+    for room_id, info in rooms.items():
+        for lang, clients in info["listeners"].items():
+            key = (room_label(room_id), lang_label(lang))
+            counts[key] = counts.get(key, 0) + len(clients)
+    return counts
+
+
+LISTENERS.set_function(_listener_counts)
+DECODE_QUEUE_DEPTH.set_function(lambda: {(): get_decode_pool()._work_queue.qsize()})
+
+
+@app.get("/traces")
+async def recent_traces(limit: int = 50):
+    """Últimas trazas muestreadas de este worker (resumen por tramo)."""
+    return JSONResponse(tracer.recent(limit))
 
-    return JSONResponse({"status": action, "room_id": room_id, "input_lang": input_lang, "storage_method": storage_method})
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
+# --- Nodo dueño de una sala ---
+@app.get("/cluster/owner/{room_id}")
+async def cluster_owner(room_id: str):
+    return JSONResponse({
+        "room_id": room_id,
+        "node": node_directory.owner(room_id),
+        "url": node_directory.owner_url(room_id),
+        "local": node_directory.is_local(room_id)
+    })
 
 
 # --- Endpoint estadísticas ---
 @app.get("/stats")
 async def stats():
-    now = time.time()
-    stats_data = []
-    for room_id, info in rooms.items():
-        oyentes_total = sum(len(clients) for clients in info["listeners"].values())
-        tiempo = int(now - info.get("start_time", now))
-        stats_data.append({
-            "sala": room_id,
-            "oradores": info.get("speaker_count", 0),
-            "oyentes": oyentes_total,
-            "tiempo_segundos": tiempo
-        })
-    return JSONResponse(stats_data)
+    return JSONResponse(stats_hub.snapshot())
+
+
+@app.websocket("/ws/stats")
+async def websocket_stats(websocket: WebSocket):
+    """Panel de operador: snapshot inicial y luego deltas por sala."""
+    await stats_hub.serve(websocket)
 
 
 # --- Export endpoints ---
@@ -245,9 +825,9 @@ async def export_original(room_id: str):
     if full_text == "":
         return JSONResponse({"room_id": room_id, "text": ""})
     # devolver como attachment txt
-    return Response(content=full_text, media_type="text/plain", headers={
-        "Content-Disposition": f"attachment; filename={room_id}_original.txt"
-    })
+    headers = {"Content-Disposition": f"attachment; filename={room_id}_original.txt"}
+    full_text = truncated_export(room_id, "original", full_text, headers)
+    return Response(content=full_text, media_type="text/plain", headers=headers)
 
 
 @app.get("/export/translation/{room_id}/{lang}")
@@ -256,9 +836,9 @@ async def export_translation(room_id: str, lang: str):
         return JSONResponse({"error": "Sala no encontrada"}, status_code=404)
     lang_list = rooms[room_id].get("translations", {}).get(lang, [])
     full_text = "\n".join(lang_list).strip()
-    return Response(content=full_text, media_type="text/plain", headers={
-        "Content-Disposition": f"attachment; filename={room_id}_translation_{lang}.txt"
-    })
+    headers = {"Content-Disposition": f"attachment; filename={room_id}_translation_{lang}.txt"}
+    full_text = truncated_export(room_id, lang, full_text, headers)
+    return Response(content=full_text, media_type="text/plain", headers=headers)
 
 
 # Util: mapear input_lang a voz por defecto (neural voices)
@@ -272,13 +852,61 @@ VOICE_MAP = {
     "zh-CN": "zh-CN-XiaoxiaoNeural"
 }
 
+# sintetizadores pre-conectados, compartidos por todas las síntesis de este proceso
+tts_pool = get_synthesizer_pool(SPEECH_KEY, SPEECH_REGION)
+# voces a conectar al arrancar (coma separadas, p. ej. "es-ES-AlvaroNeural,en-US-JennyNeural")
+TTS_WARM_VOICES = [v for v in os.getenv("TTS_POOL_WARM_VOICES", "").split(",") if v]
+
+def drop_audio_listener(room_id: str, lang: str, format_name: str, websocket):
+    """Saca al oyente del doblaje en vivo (sigue recibiendo el texto)."""
+    audio_listeners = rooms.get(room_id, {}).get("audio_listeners", {})
+    by_format = audio_listeners.get(lang, {})
+    try:
+        by_format[format_name].remove(websocket)
+    except Exception:
+        pass
+    if not by_format.get(format_name):
+        by_format.pop(format_name, None)
+    if not by_format:
+        audio_listeners.pop(lang, None)
+
+
+# doblaje en vivo de las salas (LIVE_TTS_*): una síntesis por frase e idioma con oyentes de audio;
+# los oyentes que fallan seguido salen del doblaje
+live_dubbing = live_dubbing_module.create_live_dubbing(
+    tts_pool, VOICE_MAP,
+    lambda room_id, lang, format_name: rooms.get(room_id, {}).get("audio_listeners", {}).get(lang, {}).get(format_name, ()),
+    on_drop=drop_audio_listener)
+
+
+@app.on_event("startup")
+async def warm_tts_pool():
+    if TTS_WARM_VOICES:
+        # en segundo plano: el arranque no espera los handshakes
+        app.state.tts_warmup = asyncio.create_task(asyncio.to_thread(tts_pool.warm, TTS_WARM_VOICES))
+
+
+@app.on_event("shutdown")
+async def close_tts_pool():
+    await live_dubbing.close()
+    tts_pool.close()
+
 
 @app.post("/export/audio/{room_id}")
-async def export_audio(room_id: str, voice_lang: str = Form(None)):
+async def export_audio(request: Request, room_id: str, voice_lang: str = Form(None), format: str = Form(None)):
     """
-    Genera un WAV con el texto original completo de la sala usando Azure TTS y lo devuelve.
-    voice_lang: opcional, si no se pasa se elige automáticamente desde input_lang de la sala.
+    Genera el audio del texto original completo de la sala usando Azure TTS y lo devuelve.
+    voice_lang: opcional, locale o voz de VOICE_MAP (otra cosa -> 400); si no se pasa se elige
+    automáticamente desde input_lang de la sala.
+    format: opcional (wav-16k, wav-8k, mp3, opus, ...); si no viene se usa la cabecera Accept y si no WAV.
     """
+    audio_format = negotiate_audio_format(format, request.headers.get("accept"))
+    if audio_format is None:
+        return JSONResponse({"error": f"Formato desconocido: {format}", "formats": sorted(AUDIO_FORMATS)},
+                            status_code=400)
+    # la voz es parte de la clave del pool: solo las de VOICE_MAP, por locale o por nombre
+    if voice_lang and voice_lang not in VOICE_MAP and voice_lang not in VOICE_MAP.values():
+        return JSONResponse({"error": f"Voz desconocida: {voice_lang}", "voices": VOICE_MAP}, status_code=400)
     if room_id not in rooms:
         return JSONResponse({"error": "Sala no encontrada"}, status_code=404)
     segments = rooms[room_id].get("transcript_original", [])
@@ -288,48 +916,34 @@ async def export_audio(room_id: str, voice_lang: str = Form(None)):
 
     chosen_voice = None
     if voice_lang:
-        chosen_voice = voice_lang
+        chosen_voice = VOICE_MAP.get(voice_lang, voice_lang)
     else:
         input_lang = rooms[room_id].get("input_lang", "en-US")
         chosen_voice = VOICE_MAP.get(input_lang, "en-US-JennyNeural")
 
-    # crear config de Azure TTS
     try:
-        speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-        # voz
-        # la propiedad 'speech_synthesis_voice_name' define la voz
-        speech_config.speech_synthesis_voice_name = chosen_voice
-
-        # temporal file
-        tmpfile = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        tmpfile_name = tmpfile.name
-        tmpfile.close()
-
-        audio_out = speechsdk.audio.AudioOutputConfig(filename=tmpfile_name)
-        synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=audio_out)
-
-        result = synthesizer.speak_text_async(full_text).get()
-        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
-            print("TTS failed:", result.reason)
-            return JSONResponse({"error": "Fallo en la síntesis de audio"}, status_code=500)
-
-        # leer bytes y devolver
-        def iterfile():
-            with open(tmpfile_name, "rb") as f:
-                while True:
-                    chunk = f.read(4096)
-                    if not chunk:
-                        break
-                    yield chunk
-
-        filename = f"{room_id}_original.wav"
-        headers = {
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
-        return StreamingResponse(iterfile(), media_type="audio/wav", headers=headers)
+        # sintetizador del pool (ya conectado), fuera del event loop
+        result = await asyncio.to_thread(tts_pool.synthesize, full_text, chosen_voice, audio_format.sdk_name)
+    except SynthesizerBusy:
+        return JSONResponse({"error": "Síntesis ocupada, reintentá en unos segundos"}, status_code=503,
+                            headers={"Retry-After": "5"})
     except Exception as e:
         print("Error generando audio:", e)
         return JSONResponse({"error": "Error al generar audio"}, status_code=500)
+    if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+        print("TTS failed:", result.reason)
+        return JSONResponse({"error": "Fallo en la síntesis de audio"}, status_code=500)
+
+    filename = f"{room_id}_original.{audio_format.extension}"
+    headers = {
+        "Content-Disposition": f"attachment; filename={filename}",
+        "Vary": "Accept"
+    }
+    # en el audio no hay dónde poner el aviso: solo la cabecera
+    dropped = rooms[room_id]["dropped_segments"].get("original", 0)
+    if dropped:
+        headers["X-Transcript-Truncated"] = str(dropped)
+    return Response(content=result.audio_data, media_type=audio_format.media_type, headers=headers)
 
 
 # --- Página principal (unchanged) ---
@@ -398,25 +1012,51 @@ def root():
             formData.append('action', action);
             formData.append('input_lang', input_lang);
             formData.append('storage_method', storage_method);
+            // ticket de orador de la sala (POST /api/rooms/{room_id}/tickets), si el servidor los exige
+            const ticket = new URLSearchParams(location.search).get('ticket');
+            if(ticket) formData.append('ticket', ticket);
 
             const res = await fetch(`/configure/${room_id}`, { method: 'POST', body: formData });
             const data = await res.json();
+            if(!res.ok){
+                document.getElementById('status').textContent = `Error: ${data.detail}`;
+                return;
+            }
             document.getElementById('status').textContent = `Estado: ${action.toUpperCase()} (Sala: ${room_id}, Idioma: ${input_lang})`;
             document.getElementById('status').className = action === 'start' ? 'status active' : 'status inactive';
         }
 
-        async function loadStats(){
-            const res = await fetch('/stats');
-            const data = await res.json();
+        // Estadísticas empujadas por el servidor (/ws/stats); el tiempo se cuenta localmente
+        const statsRooms = {};
+
+        function renderStats(){
+            const now = Date.now() / 1000;
             let html = '';
-            data.forEach(item => {
-                html += `<p><strong>Sala:</strong> ${item.sala} | <strong>Oradores:</strong> ${item.oradores} | <strong>Oyentes:</strong> ${item.oyentes} | <strong>Tiempo:</strong> ${item.tiempo_segundos} seg</p>`;
+            Object.values(statsRooms).forEach(item => {
+                const tiempo = Math.max(0, Math.floor(now - item.inicio));
+                html += `<p><strong>Sala:</strong> ${item.sala} | <strong>Oradores:</strong> ${item.oradores} | <strong>Oyentes:</strong> ${item.oyentes} | <strong>Tiempo:</strong> ${tiempo} seg</p>`;
             });
             if(html==='') html = 'Sin datos';
             document.getElementById('statsContent').innerHTML = html;
         }
 
-        setInterval(loadStats, 3000); // refresca cada 3 segundos
+        function connectStats(){
+            const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+            const ws = new WebSocket(`${proto}://${location.host}/ws/stats`);
+            ws.onmessage = (event) => {
+                const msg = JSON.parse(event.data);
+                if(msg.type === 'snapshot'){
+                    Object.keys(statsRooms).forEach(k => delete statsRooms[k]);
+                }
+                (msg.rooms || []).forEach(item => { statsRooms[item.sala] = item; });
+                (msg.removed || []).forEach(sala => { delete statsRooms[sala]; });
+                renderStats();
+            };
+            ws.onclose = () => setTimeout(connectStats, 3000); // reconectar
+        }
+
+        connectStats();
+        setInterval(renderStats, 1000); // solo redibuja el contador de tiempo
         </script>
       </body>
     </html>
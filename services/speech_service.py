@@ -1,13 +1,21 @@
 # backend/app/services/speech_service.py
 import asyncio
 import base64
+import itertools
+import os
 import threading
 import azure.cognitiveservices.speech as speechsdk
 from typing import Optional
 
+from app.core.audio_frames import pack_audio_frame
+from app.services.synthesizer_pool import get_synthesizer_pool
+
 SPEECH_KEY = None
 SPEECH_REGION = None
 
+# finals waiting for TTS; when full, the oldest pending utterance is dropped (its audio is stale anyway)
+TTS_MAX_PENDING = int(os.getenv("SESSION_TTS_MAX_PENDING", "8"))
+
 def init_azure(key: str, region: str):
     global SPEECH_KEY, SPEECH_REGION
     SPEECH_KEY = key
@@ -17,11 +25,24 @@ class SpeechSession:
     """
     Manage one session: PushAudioInputStream + TranslationRecognizer.
     Events send JSON to websocket via provided send_json coroutine.
+
+    Recognized finals are sent right away as text ("audio_pending": true) with
+    an utterance_id. TTS runs afterwards in an async stage with pre-connected
+    synthesizers from the shared pool, and its result is sent as a follow-up
+    {"type": "audio", "utterance_id": ...} message. The SDK callback never
+    waits for synthesis.
+
+    With send_bytes_coro the audio is streamed instead: every chunk the
+    synthesizer produces goes out right away as a binary frame
+    (app.core.audio_frames: utterance_id + seq header, FLAG_LAST on the final
+    frame), followed by {"type": "audio_end", "utterance_id", "chunks"}.
+    The listener starts playing after the first chunk, not the whole sentence.
     """
-    def __init__(self, send_json_coro, source_lang="en-US", target_lang="es"):
+    def __init__(self, send_json_coro, source_lang="en-US", target_lang="es", send_bytes_coro=None):
         if SPEECH_KEY is None:
             raise RuntimeError("Azure keys not initialized. Call init_azure() first.")
         self.send_json = send_json_coro  # async function to send JSON to client
+        self.send_bytes = send_bytes_coro  # optional: async function to send binary frames (streamed TTS)
         self.source_lang = source_lang
         self.target_lang = target_lang
 
@@ -50,11 +71,17 @@ class SpeechSession:
         self._running = False
         self._thread = None
 
+        # TTS stage: fed from the SDK thread, drained by one task on the loop
+        self._utterance_ids = itertools.count(1)
+        self._tts_queue = asyncio.Queue(maxsize=TTS_MAX_PENDING)
+        self._tts_task = None
+
     def start(self):
         """Start continuous recognition in a separate thread (non-blocking)."""
         if self._running:
             return
         self._running = True
+        self._tts_task = self._loop.create_task(self._tts_worker())
         def target():
             try:
                 # start continuous recognition (blocks until stop called)
@@ -78,6 +105,9 @@ class SpeechSession:
             self.push_stream.close()
         except Exception:
             pass
+        if self._tts_task is not None:
+            self._tts_task.cancel()
+            self._tts_task = None
 
     def push_audio(self, pcm_bytes: bytes):
         """
@@ -107,38 +137,33 @@ class SpeechSession:
             pass
 
     def _on_recognized(self, evt):
+        # runs on the SDK thread: only build the payload and hand it to the loop, never block here
         try:
             result = evt.result
             if result.reason == speechsdk.ResultReason.TranslatedSpeech:
-                original = result.text
+                utterance_id = next(self._utterance_ids)
                 translations = result.translations
                 # We will synthesize TTS for the first target language
-                tts_audio_b64 = None
-                try:
-                    # Synthesize using speech synthesizer (synchronous)
-                    speech_config = speechsdk.SpeechConfig(subscription=SPEECH_KEY, region=SPEECH_REGION)
-                    synthesizer = speechsdk.SpeechSynthesizer(speech_config=speech_config, audio_config=None)
-                    target_text = list(translations.values())[0]
-                    sres = synthesizer.speak_text_async(target_text).get()
-                    if sres.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-                        audio_bytes = sres.audio_data
-                        tts_audio_b64 = base64.b64encode(audio_bytes).decode("utf-8")
-                except Exception as e:
-                    tts_audio_b64 = None
-
+                target_lang, target_text = next(iter(translations.items()), (None, ""))
                 payload = {
                     "type": "recognized",
-                    "original": original,
+                    "utterance_id": utterance_id,
+                    "original": result.text,
                     "translations": translations,
-                    "audio_b64": tts_audio_b64
+                    "audio_b64": None,
+                    "audio_pending": bool(target_text)
                 }
                 asyncio.run_coroutine_threadsafe(self.send_json(payload), self._loop)
+                if target_text:
+                    self._loop.call_soon_threadsafe(self._enqueue_tts, utterance_id, target_lang, target_text)
             elif result.reason == speechsdk.ResultReason.RecognizedSpeech:
                 payload = {
                     "type": "recognized",
+                    "utterance_id": next(self._utterance_ids),
                     "original": result.text,
                     "translations": {},
-                    "audio_b64": None
+                    "audio_b64": None,
+                    "audio_pending": False
                 }
                 asyncio.run_coroutine_threadsafe(self.send_json(payload), self._loop)
             elif result.reason == speechsdk.ResultReason.NoMatch:
@@ -147,6 +172,62 @@ class SpeechSession:
         except Exception:
             pass
 
+    # TTS stage - runs on the event loop
+    def _enqueue_tts(self, utterance_id, lang, text):
+        if self._tts_queue.full():
+            stale_id, stale_lang, _ = self._tts_queue.get_nowait()
+            self._loop.create_task(self.send_json(
+                {"type": "audio", "utterance_id": stale_id, "lang": stale_lang, "audio_b64": None,
+                 "error": "dropped"}))
+        self._tts_queue.put_nowait((utterance_id, lang, text))
+
+    async def _tts_worker(self):
+        # one at a time, in recognition order: audio follow-ups arrive in the same order as the text
+        while True:
+            utterance_id, lang, text = await self._tts_queue.get()
+            if self.send_bytes is not None:
+                await self._stream_tts(utterance_id, lang, text)
+                continue
+            payload = {"type": "audio", "utterance_id": utterance_id, "lang": lang, "audio_b64": None}
+            try:
+                audio_bytes = await self._loop.run_in_executor(None, self._synthesize, text)
+                payload["audio_b64"] = base64.b64encode(audio_bytes).decode("utf-8")
+            except Exception as e:
+                payload["error"] = str(e)
+            await self.send_json(payload)
+
+    async def _stream_tts(self, utterance_id, lang, text):
+        chunks = asyncio.Queue()
+
+        def on_chunk(data):
+            # SDK thread -> loop; the synthesis result is delivered after the last chunk
+            self._loop.call_soon_threadsafe(chunks.put_nowait, data)
+
+        synthesis = self._loop.run_in_executor(None, self._synthesize, text, on_chunk)
+        synthesis.add_done_callback(lambda _: chunks.put_nowait(None))
+        seq = 0
+        while True:
+            data = await chunks.get()
+            if data is None:
+                break
+            if data:
+                await self.send_bytes(pack_audio_frame(utterance_id, seq, data))
+                seq += 1
+        await self.send_bytes(pack_audio_frame(utterance_id, seq, b"", last=True))
+        payload = {"type": "audio_end", "utterance_id": utterance_id, "lang": lang, "chunks": seq}
+        try:
+            synthesis.result()
+        except Exception as e:
+            payload["error"] = str(e)
+        await self.send_json(payload)
+
+    def _synthesize(self, text: str, on_chunk=None) -> bytes:
+        # pre-connected synthesizer shared with every other session: no connection setup per utterance
+        sres = get_synthesizer_pool(SPEECH_KEY, SPEECH_REGION).synthesize(text, on_chunk=on_chunk)
+        if sres.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise RuntimeError(f"Speech synthesis failed: {sres.reason}")
+        return sres.audio_data
+
     def _on_canceled(self, evt):
         payload = {
             "type": "canceled",